@@ -0,0 +1,109 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Optional
+
+from converter import api
+from converter.cache import ConversionCache, cache_key
+
+
+def _convert(parser_type: str, input_data: dict, deadline_time: Optional[float] = None) -> dict:
+    """
+    Parse and render the project, run in the executor (so it has to be picklable for process pools).
+    The conversion is aborted at `deadline_time`, a `time.time()` value, so it is the same in all processes.
+    """
+    timeout = deadline_time - time.time() if deadline_time is not None else None
+    return api.run_parser(api.get_parser_from_str(parser_type), input_data, timeout=timeout)
+
+
+def _cache_key(parser_type: str, input_data: dict) -> str:
+    """Key of the project in the cache, the same as used by `api.run_parser`."""
+    return cache_key(input_data, api.get_parser_from_str(parser_type).info["simulator"])
+
+
+class AsyncConverter:
+    """
+    Converts projects from asyncio code without blocking the event loop. Parsing and rendering run
+    in the `executor` (the default thread pool of the loop if None, pass ProcessPoolExecutor to use
+    many CPUs), at most `max_concurrent` conversions run at the same time, others wait for their turn.
+
+    Cancelled conversions which are still waiting never start. Conversions already running in the
+    executor can't be interrupted, so they finish in the background (still taking their turn),
+    but their files are not saved. Conversions given a timeout are aborted once it passes, whether
+    they are awaited or cancelled, so their turn ends then at the latest.
+
+    The cache is used by the process of the event loop, in threads of its default executor, so only
+    the project and the files are passed to the executor.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        executor: Optional[Executor] = None,
+        cache: Optional[ConversionCache] = None,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.executor = executor
+        self.cache = cache
+        # created on first use, so it belongs to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Semaphore limiting the number of conversions running at the same time."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    async def convert(
+        self,
+        parser_type: str,
+        input_data: dict,
+        output_dir: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ) -> dict:
+        """
+        Convert the project and return a dict representation of the config files,
+        same as `api.run_parser`. Files are saved in the output_dir if specified.
+        If the conversion doesn't finish in `timeout` seconds (including the time it waits for its turn),
+        it is aborted with `deadline.ConversionTimeout`.
+        """
+        loop = asyncio.get_running_loop()
+        deadline_time = time.time() + timeout if timeout is not None else None
+        entry_key = None
+        if self.cache is not None:
+            entry_key = await loop.run_in_executor(None, _cache_key, parser_type, input_data)
+            configs_json = await loop.run_in_executor(None, self.cache.get, entry_key)
+            if configs_json is not None:
+                if output_dir is not None:
+                    await self.save_configs(configs_json, output_dir)
+                return configs_json
+
+        semaphore = self._get_semaphore()
+        await semaphore.acquire()
+        try:
+            future = loop.run_in_executor(self.executor, _convert, parser_type, input_data, deadline_time)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(done: asyncio.Future) -> None:
+            """Free the slot once the executor is done, errors of cancelled conversions are not reported."""
+            semaphore.release()
+            if not done.cancelled():
+                done.exception()
+
+        # the slot is kept until the conversion finishes in the executor, even if this call is cancelled
+        future.add_done_callback(release)
+        configs_json = await asyncio.shield(future)
+
+        if self.cache is not None:
+            await loop.run_in_executor(None, self.cache.put, entry_key, configs_json)
+        if output_dir is not None:
+            await self.save_configs(configs_json, output_dir)
+        return configs_json
+
+    @staticmethod
+    async def save_configs(configs_json: dict, output_dir: Path) -> None:
+        """Save the files in a thread of the default executor, so the event loop isn't blocked by disk I/O."""
+        await asyncio.get_running_loop().run_in_executor(None, api.save_configs_json, configs_json, output_dir)
@@ -1,46 +1,275 @@
+import importlib
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Union
-from converter.shieldhit.parser import ShieldhitParser
-from converter.topas.parser import TopasParser
-from converter.common import Parser
-from converter.fluka.parser import FlukaParser
-from converter.geant4.parser import Geant4Parser
+from typing import BinaryIO, ContextManager, Iterator, Optional, Union
+from converter import deadline
+from converter.archive import write_archive
+from converter.cache import ConversionCache, cache_key
+from converter.common import ParsedProject, Parser
+from converter.diagnostics import Diagnostics, error
+from converter.estimate import Estimate, Limits, admit, estimate_project
+from converter.metrics import Metrics
+from converter.profiling import StageTimer
+from converter.singleflight import SingleFlight
+
+# parsers are imported only when requested, so using one simulator doesn't load the others
+PARSERS = {
+    "shieldhit": "converter.shieldhit.parser:ShieldhitParser",
+    "topas": "converter.topas.parser:TopasParser",
+    "fluka": "converter.fluka.parser:FlukaParser",
+    "geant4": "converter.geant4.parser:Geant4Parser",
+}
+
+# returned by `_observe` for parsers without metrics
+_NOT_OBSERVED = nullcontext()
+
+# entry point group used by other packages to provide parsers for more simulators, e.g. in pyproject.toml:
+# [project.entry-points."yaptide_converter.parsers"]
+# mcnp = "my_package.parser:McnpParser"
+PARSERS_ENTRY_POINT_GROUP = "yaptide_converter.parsers"
+
+
+def _parser_entry_points() -> dict:
+    """Parsers registered by other packages, keyed by lowercase name."""
+    # importlib.metadata takes a while to import and scan installed packages, so it's needed only for plugins
+    from importlib.metadata import entry_points  # skipcq: PYL-C0415
+
+    try:
+        group = entry_points(group=PARSERS_ENTRY_POINT_GROUP)
+    except TypeError:  # Python < 3.10
+        group = entry_points().get(PARSERS_ENTRY_POINT_GROUP, [])
+    return {entry_point.name.lower(): entry_point for entry_point in group}
+
+
+def available_parsers() -> list[str]:
+    """Names of the built-in parsers and of the parsers registered through entry points."""
+    return list(PARSERS) + [name for name in _parser_entry_points() if name not in PARSERS]
 
 
 def get_parser_from_str(parser_type: str) -> Parser:
     """Get a converter object based on the provided type."""
-    # This is temporary, suggestions on how to do this better appreciated.
-    if parser_type.lower() == "shieldhit":
-        return ShieldhitParser()
-    if parser_type.lower() == "topas":
-        return TopasParser()
-    if parser_type.lower() == "fluka":
-        return FlukaParser()
-    if parser_type.lower() == "geant4":
-        return Geant4Parser()
-
-    print(f'Invalid parser type "{parser_type}".')
+    name = parser_type.lower()
+    if name in PARSERS:
+        module_name, class_name = PARSERS[name].split(":")
+        parser_class = getattr(importlib.import_module(module_name), class_name)
+        return parser_class()
+
+    entry_points = _parser_entry_points()
+    if name in entry_points:
+        return entry_points[name].load()()
+
+    error(f'Invalid parser type "{parser_type}".')
+    if entry_points:
+        raise ValueError(f"Parser type must be one of: {', '.join(available_parsers())}.")
     raise ValueError("Parser type must be either 'shieldhit', 'topas', 'fluka' or 'geant4'.")
 
 
-def run_parser(parser: Parser, input_data: dict, output_dir: Union[Path, None] = None, silent: bool = True) -> dict:
+def run_parser(
+    parser: Parser,
+    input_data: Union[dict, ParsedProject],
+    output_dir: Union[Path, None] = None,
+    silent: bool = True,
+    cache: Optional[ConversionCache] = None,
+    limits: Optional[Limits] = None,
+    timeout: Optional[float] = None,
+    coalescer: Optional[SingleFlight] = None,
+) -> dict:
     """
     Convert the configs and return a dict representation of the config
     files. Can save them in the output_dir directory if specified.
+    If the cache is provided, files converted before for the same project and simulator
+    are taken from it without parsing the project (so no diagnostics are collected then).
+    If the limits are provided, the project is checked against them first (see `estimate.admit`).
+    If the conversion takes more than `timeout` seconds, it is aborted with `deadline.ConversionTimeout`
+    and nothing is saved.
+    If the coalescer is provided, a conversion of the same project and simulator already running
+    in another thread is waited for instead of converting the project again (like with the cache,
+    diagnostics are collected only by the parser which converts it).
+    If the parser has metrics set, the conversion is recorded in them (see `Metrics.conversion`).
     """
-    parser.parse_configs(input_data)
+    with _observe(parser, input_data), deadline.limit(timeout), _admit(parser, input_data, limits) as input_data:
+        project_json = input_data.json if isinstance(input_data, ParsedProject) else input_data
+        backend = parser.info["simulator"]
+        if parser.diagnostics is not None and parser.diagnostics.in_info:
+            # info.json differs when it holds the diagnostics
+            backend += "+diagnostics"
+        entry_key = cache_key(project_json, backend) if cache is not None or coalescer is not None else None
+        configs_json = cache.get(entry_key) if cache is not None else None
+
+        def convert() -> dict:
+            """Parse and render the project, storing the files in the cache."""
+            if isinstance(input_data, ParsedProject):
+                parser.parse_project(input_data)
+            else:
+                parser.parse_configs(input_data)
+            converted_json = parser.get_configs_json()
+            if cache is not None:
+                cache.put(entry_key, converted_json)
+            return converted_json
+
+        if configs_json is None:
+            if coalescer is not None:
+                configs_json, _ = coalescer.do(entry_key, convert)
+            else:
+                configs_json = convert()
 
     if not silent:
-        for key, value in parser.get_configs_json().items():
+        for key, value in configs_json.items():
             print(f"File {key}:")
             print(value)
 
     if output_dir:
-        if not output_dir.exists():
-            output_dir.mkdir(parents=True)
-        elif not output_dir.is_dir():
-            print(f"Output path {output_dir} is not a directory.")
-            raise NotADirectoryError(output_dir)
-        parser.save_configs(output_dir)
-
-    return parser.get_configs_json()
+        # files are already rendered (or taken from the cache), so they are written without rendering them again
+        with parser._stage("save"):
+            save_configs_json(configs_json, output_dir)
+
+    return configs_json
+
+
+def save_configs_json(configs_json: dict, output_dir: Path) -> None:
+    """Save files returned by `run_parser` in the output_dir, creating it if needed."""
+    _prepare_output_dir(output_dir)
+    for file_name, content in configs_json.items():
+        with open(Path(output_dir, file_name), "w") as conf_f:
+            conf_f.write(content)
+
+
+def save_parser_output(
+    parser: Parser,
+    input_data: Union[dict, ParsedProject],
+    output_dir: Path,
+    cache: Optional[ConversionCache] = None,
+    limits: Optional[Limits] = None,
+    timeout: Optional[float] = None,
+    coalescer: Optional[SingleFlight] = None,
+) -> list[str]:
+    """
+    Convert the configs and save them in the output_dir, returning names of the saved files.
+    Unlike `run_parser`, files are written piece by piece as they are rendered, so big files
+    are never kept in memory as a whole (unless they have to be stored in the cache or shared
+    with the conversions waiting for them through the coalescer).
+    Files appear in the output_dir only if the whole conversion succeeds, e.g. doesn't exceed the timeout.
+    """
+    with _observe(parser, input_data), deadline.limit(timeout), _admit(parser, input_data, limits) as input_data:
+        if cache is not None or coalescer is not None:
+            return list(run_parser(parser, input_data, output_dir, cache=cache, coalescer=coalescer))
+
+        if isinstance(input_data, ParsedProject):
+            parser.parse_project(input_data)
+        else:
+            parser.parse_configs(input_data)
+        _prepare_output_dir(output_dir)
+        return parser.save_configs(output_dir)
+
+
+def save_parser_archive(
+    parser: Parser,
+    input_data: Union[dict, ParsedProject],
+    destination: Union[Path, BinaryIO],
+    archive_format: str = "tar.gz",
+    cache: Optional[ConversionCache] = None,
+    limits: Optional[Limits] = None,
+    timeout: Optional[float] = None,
+) -> list[str]:
+    """
+    Convert the configs and pack them into a tar, tar.gz or zip archive (see `archive.write_archive`),
+    returning names of the packed files. The archive is filled straight from the rendered content,
+    destination may be a path or a binary stream, e.g. a pipe. Archive files are created only
+    if the conversion succeeds, a stream gets a truncated archive if the conversion fails midway.
+    """
+    with _observe(parser, input_data), deadline.limit(timeout), _admit(parser, input_data, limits) as input_data:
+        if cache is not None:
+            return write_archive(run_parser(parser, input_data, cache=cache).items(), destination, archive_format)
+
+        if isinstance(input_data, ParsedProject):
+            parser.parse_project(input_data)
+        else:
+            parser.parse_configs(input_data)
+        return write_archive(parser.iter_configs(), destination, archive_format)
+
+
+def estimate(input_data: dict, parser_types: Optional[list[str]] = None) -> Estimate:
+    """Estimate the output size and conversion time of the project for the parser types (all built-in by default)."""
+    return estimate_project(input_data, [parser_type.lower() for parser_type in parser_types or PARSERS])
+
+
+def _observe(parser: Parser, input_data: Union[dict, ParsedProject]) -> ContextManager:
+    """Record the conversion in the metrics of the parser, if it has them."""
+    if parser.metrics is None:
+        return _NOT_OBSERVED
+    return parser.metrics.conversion(parser, input_data.json if isinstance(input_data, ParsedProject) else input_data)
+
+
+@contextmanager
+def _admit(
+    parser: Parser, input_data: Union[dict, ParsedProject], limits: Optional[Limits]
+) -> Iterator[Union[dict, ParsedProject]]:
+    """
+    Check the project against the limits, yielding the (possibly downgraded) project to convert.
+    The world zone expansion of the parser is stopped at the limit of its sets inside the `with` block,
+    the limit of the parser itself is restored afterwards.
+    """
+    if limits is None:
+        yield input_data
+        return
+    project_json = input_data.json if isinstance(input_data, ParsedProject) else input_data
+    with parser._collect_diagnostics(), parser._stage("admit"):
+        admitted_json = admit(project_json, parser.info["simulator"], limits)
+    if admitted_json is not project_json:
+        input_data = ParsedProject(admitted_json) if isinstance(input_data, ParsedProject) else admitted_json
+
+    if limits.max_world_zone_sets is None or not hasattr(parser, "max_world_zone_sets"):
+        yield input_data
+        return
+    # the estimate counts the sets up to the limit, the expansion itself is stopped at the same limit as well
+    parser_limit = parser.max_world_zone_sets
+    parser.max_world_zone_sets = limits.max_world_zone_sets
+    try:
+        yield input_data
+    finally:
+        parser.max_world_zone_sets = parser_limit
+
+
+def _prepare_output_dir(output_dir: Path) -> None:
+    """Create the output directory if needed."""
+    if not output_dir.exists():
+        output_dir.mkdir(parents=True)
+    elif not output_dir.is_dir():
+        error(f"Output path {output_dir} is not a directory.")
+        raise NotADirectoryError(output_dir)
+
+
+def run_parsers(
+    parser_types: list[str],
+    input_data: dict,
+    output_dir: Union[Path, None] = None,
+    silent: bool = True,
+    cache: Optional[ConversionCache] = None,
+    profiler: Optional[StageTimer] = None,
+    diagnostics: Optional[Diagnostics] = None,
+    limits: Optional[Limits] = None,
+    timeout: Optional[float] = None,
+    metrics: Optional[Metrics] = None,
+) -> dict[str, dict]:
+    """
+    Convert the configs for many simulators at once, parsing parts shared by all of them
+    (e.g. figures) only once. Returns dict representations of the config files for each parser type.
+    If output_dir is specified, files of each parser type are saved in its own subdirectory.
+    If the profiler is provided, stages of each parser are measured under the parser type.
+    If the diagnostics collector is provided, all parsers collect into it, same for the metrics.
+    If the limits are provided, the project is checked against them for every parser type.
+    The timeout applies to each parser type separately.
+    """
+    # create all parsers first, so an invalid parser type is reported before any conversion
+    parsers = {parser_type: get_parser_from_str(parser_type) for parser_type in parser_types}
+    project = ParsedProject(input_data)
+    configs_jsons = {}
+    for parser_type, parser in parsers.items():
+        parser.profiler = profiler
+        parser.diagnostics = diagnostics
+        parser.metrics = metrics
+        target_dir = output_dir / parser_type.lower() if output_dir else None
+        with parser._stage(parser_type.lower()):
+            configs_jsons[parser_type] = run_parser(parser, project, target_dir, silent, cache, limits, timeout)
+
+    return configs_jsons
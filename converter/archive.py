@@ -0,0 +1,106 @@
+import io
+import itertools
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from operator import itemgetter
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+from converter.common import unique_file_names
+
+ARCHIVE_FORMATS = ("tar", "tar.gz", "zip")
+
+
+def archive_format_from_path(path: Union[str, Path]) -> Optional[str]:
+    """Guess the archive format from the file extension, None if it is not known."""
+    name = str(path).lower()
+    if name.endswith((".tar.gz", ".tgz")):
+        return "tar.gz"
+    if name.endswith(".tar"):
+        return "tar"
+    if name.endswith(".zip"):
+        return "zip"
+    return None
+
+
+@contextmanager
+def _open_destination(destination: Union[str, Path, BinaryIO]) -> Iterator[BinaryIO]:
+    """
+    Open the archive file, file objects (e.g. stdout) are used as they are and are not closed.
+    The file is written under a temporary name and renamed when it's complete, so it is never left half-written.
+    """
+    if isinstance(destination, (str, Path)):
+        destination = Path(destination)
+        temp_path = destination.with_name(f".{destination.name}.{uuid.uuid4().hex}.partial")
+        try:
+            with open(temp_path, "xb") as archive_f:
+                yield archive_f
+            os.replace(temp_path, destination)
+        finally:
+            temp_path.unlink(missing_ok=True)
+    else:
+        yield destination
+
+
+def _iter_files(chunks: Iterable[tuple[str, str]]) -> Iterator[tuple[str, bytes]]:
+    """Join consecutive chunks of each file, so only one file at a time is kept in memory."""
+    for file_name, file_chunks in itertools.groupby(chunks, key=itemgetter(0)):
+        yield file_name, "".join(chunk for _, chunk in file_chunks).encode("utf-8")
+
+
+def _write_tar(chunks: Iterable[tuple[str, str]], archive_f: BinaryIO, compress: bool) -> list[str]:
+    """Write tar archive in the stream mode, which doesn't need a seekable file."""
+    # imported only when needed, as it's slow to import
+    import tarfile  # skipcq: PYL-C0415
+
+    file_names = []
+    mtime = time.time()
+    with tarfile.open(fileobj=archive_f, mode="w|gz" if compress else "w|", format=tarfile.PAX_FORMAT) as tar_f:
+        for file_name, content in _iter_files(chunks):
+            # tar header holds the file size, so the whole file is needed before it can be written
+            tar_info = tarfile.TarInfo(file_name)
+            tar_info.size = len(content)
+            tar_info.mtime = mtime
+            tar_info.mode = 0o644
+            tar_f.addfile(tar_info, io.BytesIO(content))
+            file_names.append(file_name)
+    return file_names
+
+
+def _write_zip(chunks: Iterable[tuple[str, str]], archive_f: BinaryIO) -> list[str]:
+    """Write zip archive, chunk by chunk. Sizes are written after the data, so pipes are supported."""
+    # imported only when needed, as it's slow to import
+    import zipfile  # skipcq: PYL-C0415
+
+    file_names = []
+    with zipfile.ZipFile(archive_f, mode="w", compression=zipfile.ZIP_DEFLATED) as zip_f:
+        for file_name, file_chunks in itertools.groupby(chunks, key=itemgetter(0)):
+            zip_info = zipfile.ZipInfo(file_name, date_time=time.localtime()[:6])
+            zip_info.compress_type = zipfile.ZIP_DEFLATED
+            zip_info.external_attr = 0o644 << 16
+            with zip_f.open(zip_info, mode="w") as member_f:
+                for _, chunk in file_chunks:
+                    member_f.write(chunk.encode("utf-8"))
+            file_names.append(file_name)
+    return file_names
+
+
+def write_archive(
+    chunks: Iterable[tuple[str, str]], destination: Union[str, Path, BinaryIO], archive_format: str = "tar.gz"
+) -> list[str]:
+    """
+    Pack files, given as `(file name, chunk)` pairs like the ones yielded by `Parser.iter_configs`,
+    into a tar (optionally gzip-compressed) or zip archive and return names of the packed files.
+    Destination may be a path or a binary file object, which doesn't have to be seekable (e.g. a pipe).
+    Files with a name used by an earlier file are renamed, same as by `Parser.save_configs`.
+    """
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Archive format must be one of: {', '.join(ARCHIVE_FORMATS)}.")
+
+    chunks = unique_file_names(chunks)
+    with _open_destination(destination) as archive_f:
+        if archive_format == "zip":
+            return _write_zip(chunks, archive_f)
+        return _write_tar(chunks, archive_f, compress=archive_format == "tar.gz")
@@ -0,0 +1,159 @@
+import glob
+import json
+import os
+import time
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from converter import api
+from converter.diagnostics import Diagnostics
+from converter.pool import WarmPool
+
+REPORT_FILE_NAME = "batch_report.json"
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """Single conversion of a project file into its own output directory."""
+
+    input_file: Path
+    output_dir: Path
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a single BatchJob, used in the summary report."""
+
+    input_file: str
+    output_dir: str
+    succeeded: bool
+    error: Optional[str] = None
+    duration: float = 0.0
+    diagnostics: list[dict] = field(default_factory=list)
+
+
+def collect_input_files(source: Optional[str] = None, manifest: Optional[Path] = None) -> list[Path]:
+    """
+    Collect project files to convert. `source` may be a directory (all *.json files inside are taken)
+    or a glob pattern. `manifest` is a text file with one project path per line, relative paths are
+    resolved against the manifest location, empty lines and lines starting with '#' are skipped.
+    """
+    input_files = []
+    if source is not None:
+        if os.path.isdir(source):
+            input_files.extend(sorted(Path(source).glob("*.json")))
+        else:
+            input_files.extend(sorted(Path(path) for path in glob.glob(source, recursive=True)))
+
+    if manifest is not None:
+        with open(manifest, "r") as manifest_f:
+            for line in manifest_f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                path = Path(line)
+                input_files.append(path if path.is_absolute() else manifest.parent / path)
+
+    return input_files
+
+
+def plan_jobs(input_files: Iterable[Path], output_dir: Path) -> list[BatchJob]:
+    """Assign each input file its own output subdirectory named after the file."""
+    jobs = []
+    used_names = set()
+    for input_file in input_files:
+        name = input_file.stem
+        suffix = 1
+        while name in used_names:
+            suffix += 1
+            name = f"{input_file.stem}_{suffix}"
+        used_names.add(name)
+        jobs.append(BatchJob(input_file=input_file, output_dir=output_dir / name))
+    return jobs
+
+
+def convert_job(output_format: str, job: BatchJob, timeout: Optional[float] = None) -> BatchResult:
+    """
+    Convert a single project. Any error is reported in the result instead of being raised,
+    warnings and errors reported by the conversion are collected into the result as well.
+    Conversion taking more than `timeout` seconds is aborted and its files are not saved.
+    """
+    start = time.perf_counter()
+    collector = Diagnostics()
+    try:
+        with open(job.input_file, "r") as file:
+            input_data = json.load(file)
+        with collector.activate():
+            parser = api.get_parser_from_str(output_format)
+        parser.diagnostics = collector
+        api.save_parser_output(parser, input_data, job.output_dir, timeout=timeout)
+    except Exception as e:  # skipcq: PYL-W0703
+        return BatchResult(
+            input_file=str(job.input_file),
+            output_dir=str(job.output_dir),
+            succeeded=False,
+            error=f"{type(e).__name__}: {e}",
+            duration=time.perf_counter() - start,
+            diagnostics=collector.to_list(),
+        )
+
+    return BatchResult(
+        input_file=str(job.input_file),
+        output_dir=str(job.output_dir),
+        succeeded=True,
+        duration=time.perf_counter() - start,
+        diagnostics=collector.to_list(),
+    )
+
+
+def run_batch(
+    jobs: list[BatchJob],
+    output_format: str = "shieldhit",
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    max_jobs_per_worker: Optional[int] = None,
+    max_worker_rss_mb: Optional[float] = None,
+) -> list[BatchResult]:
+    """
+    Convert all jobs using a pool of `workers` warm processes (number of CPUs by default, see `WarmPool`).
+    With a single worker jobs are converted in the current process. Results are returned
+    in the order of jobs. Each job is aborted after `timeout` seconds, freeing the worker for the next ones.
+    Workers are replaced after `max_jobs_per_worker` jobs or once they take more than `max_worker_rss_mb` MB.
+    """
+    if workers == 1:
+        return [convert_job(output_format, job, timeout) for job in jobs]
+
+    results: dict[BatchJob, BatchResult] = {}
+    with WarmPool(workers, max_jobs=max_jobs_per_worker, max_rss_mb=max_worker_rss_mb) as executor:
+        futures = {executor.submit(convert_job, output_format, job, timeout): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                results[job] = future.result()
+            except BrokenProcessPool as e:
+                # worker died while converting the job (e.g. was killed because of memory limits)
+                results[job] = BatchResult(
+                    input_file=str(job.input_file),
+                    output_dir=str(job.output_dir),
+                    succeeded=False,
+                    error=f"{type(e).__name__}: {e}",
+                )
+
+    return [results[job] for job in jobs]
+
+
+def write_report(results: list[BatchResult], report_path: Path) -> dict:
+    """Write summary of the batch to a JSON file and return it."""
+    report = {
+        "total": len(results),
+        "succeeded": sum(result.succeeded for result in results),
+        "failed": sum(not result.succeeded for result in results),
+        "jobs": [asdict(result) for result in results],
+    }
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, "w") as report_f:
+        json.dump(report, report_f, indent=2)
+    return report
@@ -0,0 +1,329 @@
+"""Deterministic generator of synthetic editor projects of any size, used by the scaling benchmarks."""
+
+import math
+import random
+import uuid
+from copy import deepcopy
+from typing import Optional
+
+# (icru, sanitized name, name, density, geant4 name), all supported by every simulator
+MATERIALS = (
+    (276, "water_liquid", "WATER, LIQUID", 1.0, "G4_WATER"),
+    (104, "air_dry_near_sea_level", "AIR, DRY (NEAR SEA LEVEL)", 0.00120479, "G4_AIR"),
+    (223, "polymethyl_methacralate_lucite_perspex", "POLYMETHYL METHACRALATE", 1.19, "G4_PLEXIGLASS"),
+    (226, "polystyrene", "POLYSTYRENE", 1.06, "G4_POLYSTYRENE"),
+    (221, "polyethylene", "POLYETHYLENE", 0.94, "G4_POLYETHYLENE"),
+    (120, "bone_cortical_icrp", "BONE, CORTICAL (ICRP)", 1.85, "G4_BONE_CORTICAL_ICRP"),
+    (201, "muscle_skeletal_icrp", "MUSCLE, SKELETAL (ICRP)", 1.04, "G4_MUSCLE_SKELETAL_ICRP"),
+    (103, "adipose_tissue_icrp", "ADIPOSE TISSUE (ICRP)", 0.95, "G4_ADIPOSE_TISSUE_ICRP"),
+    (13, "aluminum", "ALUMINUM", 2.699, "G4_Al"),
+    (29, "copper", "COPPER", 8.96, "G4_Cu"),
+    (82, "lead", "LEAD", 11.35, "G4_Pb"),
+    (6, "carbon_amorphous", "CARBON, AMORPHOUS", 2.0, "G4_C"),
+)
+
+# side of the grid cell holding a single object (pair of nested figures)
+CELL_SIZE = 10.0
+
+
+def _manager(name: str, manager_type: str, manager_uuid: str, **fields) -> dict:
+    """Return a manager dict with the metadata the editor saves."""
+    return {
+        "uuid": manager_uuid,
+        "name": name,
+        "type": manager_type,
+        "metadata": {"version": "0.11", "type": "Manager", "generator": f"{manager_type}.toSerialized"},
+        **fields,
+    }
+
+
+def _geometry(geometry_type: str, position: list[float], parameters: dict) -> dict:
+    """Return geometry data of a figure, world zone or detector."""
+    return {
+        "geometryType": geometry_type,
+        "position": position,
+        "rotation": [0, 0, 0],
+        "parameters": parameters,
+    }
+
+
+class _ProjectGenerator:
+    """Builds the project, all random choices and uuids come from a single seeded generator."""
+
+    def __init__(self, size: int, seed: int, detectors: Optional[int]) -> None:
+        self.size = size
+        self.detectors = size // 5 + 1 if detectors is None else detectors
+        self.random = random.Random(seed)
+
+    def uuid(self) -> str:
+        """Return a random, but reproducible uuid."""
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+
+    def figure(self, name: str, shape: str, position: list[float], half_size: float, material: tuple) -> dict:
+        """Return a figure of the shape fitting in the sphere of radius `half_size` * sqrt(3)."""
+        if shape == "Box":
+            geometry = _geometry(
+                "BoxGeometry",
+                position,
+                {"width": 2 * half_size, "height": 2 * half_size, "depth": 2 * half_size},
+            )
+        elif shape == "Cylinder":
+            geometry = _geometry(
+                "HollowCylinderGeometry",
+                position,
+                {"innerRadius": 0, "radius": half_size, "depth": 2 * half_size},
+            )
+        else:
+            geometry = _geometry("SphereGeometry", position, {"radius": half_size})
+        return {
+            "name": name,
+            "type": f"{shape}Figure",
+            "uuid": self.uuid(),
+            "visible": True,
+            "geometryData": geometry,
+            "simulationMaterial": {"geant4_name": material[4]},
+            "colorHex": 0,
+            "children": [],
+        }
+
+    def zone(self, name: str, operations: list[tuple[str, str]], material_uuid: str) -> dict:
+        """Return a zone made of a single union of the (mode, figure uuid) operations."""
+        return {
+            "uuid": self.uuid(),
+            "name": name,
+            "type": "BooleanZone",
+            "visible": True,
+            "materialUuid": material_uuid,
+            "materialPropertiesOverrides": {},
+            "unionOperations": [[{"mode": mode, "objectUuid": figure_uuid} for mode, figure_uuid in operations]],
+            "subscribedObjects": {figure_uuid: 1 for _, figure_uuid in operations},
+        }
+
+    def generate(self) -> dict:
+        """Return the project dict."""
+        materials = [
+            {
+                "uuid": self.uuid(),
+                "sanitizedName": material[1],
+                "name": material[2],
+                "icru": material[0],
+                "density": material[3],
+            }
+            for material in MATERIALS
+        ]
+        material_uuids = {material["icru"]: material["uuid"] for material in materials}
+        air = MATERIALS[1]
+
+        # objects are placed in the cells of a cubic grid centered at the origin
+        grid = max(1, math.ceil(self.size ** (1 / 3)))
+        world_half_size = grid * CELL_SIZE / 2
+        cells = [
+            [
+                (index % grid + 0.5) * CELL_SIZE - world_half_size,
+                (index // grid % grid + 0.5) * CELL_SIZE - world_half_size,
+                (index // grid // grid + 0.5) * CELL_SIZE - world_half_size,
+            ]
+            for index in range(self.size)
+        ]
+
+        world = self.figure("World", "Box", [0, 0, 0], world_half_size, air)
+        figures = [world]
+        zones = []
+        world_operations = [("union", world["uuid"])]
+        for index, position in enumerate(cells):
+            outer_material = self.random.choice(MATERIALS)
+            inner_material = self.random.choice(MATERIALS)
+            outer_half_size = round(CELL_SIZE * self.random.uniform(0.25, 0.4) / math.sqrt(3), 3)
+            outer = self.figure(
+                f"Outer_{index}",
+                self.random.choice(("Box", "Cylinder", "Sphere")),
+                position,
+                outer_half_size,
+                outer_material,
+            )
+            # every figure contains the sphere of radius `half_size`, so the inner one fits inside the outer one
+            inner = self.figure(
+                f"Inner_{index}",
+                self.random.choice(("Box", "Cylinder", "Sphere")),
+                list(position),
+                round(outer_half_size * self.random.uniform(0.3, 0.55), 3),
+                inner_material,
+            )
+            figures.extend((outer, inner))
+            world_operations.append(("subtraction", outer["uuid"]))
+            zones.append(
+                self.zone(
+                    f"Shell_{index}",
+                    [("union", outer["uuid"]), ("subtraction", inner["uuid"])],
+                    material_uuids[outer_material[0]],
+                )
+            )
+            zones.append(self.zone(f"Core_{index}", [("union", inner["uuid"])], material_uuids[inner_material[0]]))
+
+            # Geant4 takes the tree of figures, positions of children are relative to their parents
+            outer_node = deepcopy(outer)
+            inner_node = deepcopy(inner)
+            inner_node["geometryData"]["position"] = [0, 0, 0]
+            outer_node["children"].append(inner_node)
+            world["children"].append(outer_node)
+        zones.insert(0, self.zone("World", world_operations, material_uuids[air[0]]))
+
+        world_zone = {
+            "uuid": self.uuid(),
+            "type": "WorldZone",
+            "name": "World Zone",
+            "marginMultiplier": 1.1,
+            "autoCalculate": True,
+            "materialUuid": material_uuids[air[0]],
+            "visible": False,
+            "geometryData": _geometry(
+                "BoxGeometry",
+                [0, 0, 0],
+                {"width": 2.2 * world_half_size, "height": 2.2 * world_half_size, "depth": 2.2 * world_half_size},
+            ),
+        }
+
+        filters = [
+            {
+                "uuid": self.uuid(),
+                "name": name,
+                "type": "Filter",
+                "rules": [
+                    {"uuid": self.uuid(), "keyword": keyword, "operator": "==", "value": value}
+                    for keyword, value in rules
+                ],
+            }
+            for name, rules in (("Protons", (("Z", 1), ("A", 1))), ("Helium", (("Z", 2),)), ("Hydrogen", (("Z", 1),)))
+        ]
+
+        detectors = []
+        outputs = []
+        for index in range(self.detectors):
+            position = cells[index % len(cells)] if cells else [0, 0, 0]
+            if index % 2 == 0:
+                geometry = _geometry(
+                    "Mesh",
+                    list(position),
+                    {
+                        "width": CELL_SIZE,
+                        "height": CELL_SIZE,
+                        "depth": CELL_SIZE,
+                        "xSegments": 10,
+                        "ySegments": 10,
+                        "zSegments": 10,
+                    },
+                )
+            else:
+                geometry = _geometry(
+                    "Cyl",
+                    list(position),
+                    {
+                        "innerRadius": 0,
+                        "radius": CELL_SIZE / 2,
+                        "depth": CELL_SIZE,
+                        "radialSegments": 10,
+                        "zSegments": 10,
+                    },
+                )
+            detector = {
+                "name": f"Detector_{index}",
+                "type": "Detector",
+                "uuid": self.uuid(),
+                "visible": True,
+                "colorHex": 65535,
+                "geometryData": geometry,
+            }
+            detectors.append(detector)
+            scoring_filter = filters[index % len(filters)]
+            outputs.append(
+                {
+                    "name": f"Output_{index}",
+                    "type": "Output",
+                    "uuid": self.uuid(),
+                    "quantities": [
+                        {
+                            "uuid": self.uuid(),
+                            "name": "Dose",
+                            "type": "Quantity",
+                            "visible": True,
+                            "keyword": "Dose",
+                            "modifiers": [],
+                        },
+                        {
+                            "uuid": self.uuid(),
+                            "name": f"Fluence_{scoring_filter['name']}",
+                            "type": "Quantity",
+                            "visible": True,
+                            "filter": scoring_filter["uuid"],
+                            "keyword": "Fluence",
+                            "modifiers": [],
+                        },
+                    ],
+                    "detectorUuid": detector["uuid"],
+                    "trace": False,
+                }
+            )
+
+        return {
+            "metadata": {"version": "0.11", "type": "Editor", "generator": "YaptideEditor.toSerialized"},
+            "project": {
+                "title": f"synthetic_{self.size}",
+                "description": f"Synthetic project with {self.size} objects made of two nested figures.",
+            },
+            "figureManager": _manager("Figure Manager", "FigureManager", self.uuid(), figures=figures),
+            "zoneManager": _manager("Zone Manager", "ZoneManager", self.uuid(), zones=zones, worldZone=world_zone),
+            "detectorManager": _manager("Detector Manager", "DetectorManager", self.uuid(), detectors=detectors),
+            "specialComponentsManager": _manager("Special Components", "SpecialComponentManager", self.uuid()),
+            "materialManager": _manager(
+                "Material Manager",
+                "MaterialManager",
+                self.uuid(),
+                materials=materials,
+                selectedMaterials={material["uuid"]: 1 for material in materials},
+            ),
+            "scoringManager": _manager(
+                "Scoring Manager", "ScoringManager", self.uuid(), outputs=outputs, filters=filters
+            ),
+            "beam": {
+                "name": "Beam",
+                "type": "Beam",
+                "uuid": self.uuid(),
+                "position": [0, 0, -1.05 * world_half_size],
+                "direction": [0, 0, 1],
+                "energyUnit": "MeV",
+                "energy": 150,
+                "energySpread": 1.5,
+                "energyLowCutoff": 0,
+                "energyHighCutoff": 1000,
+                "sigma": {"type": "Gaussian", "x": 0.5, "y": 0.5},
+                "sad": {"type": "none", "x": 0, "y": 0},
+                "divergence": {"x": 0, "y": 0, "distanceToFocal": 0},
+                "particle": {"id": 2, "a": 1, "z": 1},
+                "colorHex": 16776960,
+                "numberOfParticles": 10000,
+                "sourceFile": {"value": "", "name": ""},
+                "sourceType": "simple",
+            },
+            "physic": {
+                "energyLoss": 0.03,
+                "enableNuclearReactions": True,
+                "energyModelStraggling": "Vavilov",
+                "multipleScattering": "Moliere",
+                "stoppingPowerTable": "ICRU91",
+            },
+        }
+
+
+def generate_project(size: int, seed: int = 0, detectors: Optional[int] = None) -> dict:
+    """
+    Return a valid editor project with `size` objects placed in a cubic grid. Each object is made of
+    two nested figures (boxes, cylinders or spheres) and two zones, the outer zone subtracts the inner
+    figure and the world zone subtracts all outer figures. There are `detectors` mesh and cylinder
+    detectors (size // 5 + 1 by default), each with an output scoring dose and filtered fluence.
+
+    The same arguments always give the same project. Figures are listed flat for SHIELD-HIT12A and
+    FLUKA, and the first one (World) also holds them as its children for Geant4.
+    """
+    if size < 0:
+        raise ValueError("Size of the project can't be negative")
+    return _ProjectGenerator(size, seed, detectors).generate()
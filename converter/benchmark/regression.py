@@ -0,0 +1,156 @@
+"""
+Compares benchmark results with a stored baseline to catch performance regressions. Times of the baseline
+are scaled by the ratio of calibration loops of both reports (see `runner.calibrate`), so a baseline saved
+on another machine (normally in calibration units, see `runner.normalize`) is compared as if measured in
+the same run.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from converter.benchmark.runner import run_benchmarks
+
+# relative slowdown treated as a regression, on a busy machine short stages differ by up to ~70% between runs
+DEFAULT_THRESHOLD = 1.0
+# differences smaller than that (in seconds) are timer noise, whatever the relative change is
+DEFAULT_MIN_DELTA = 0.02
+
+
+@dataclass
+class StageDiff:
+    """Time of a single stage of a benchmark in the baseline and in the current run."""
+
+    benchmark: str
+    stage: str
+    baseline: Optional[float]
+    current: Optional[float]
+
+    @property
+    def change(self) -> Optional[float]:
+        """Relative change of the time, positive if it is slower now."""
+        if not self.baseline or self.current is None:
+            return None
+        return self.current / self.baseline - 1
+
+    def is_regression(self, threshold: float = DEFAULT_THRESHOLD, min_delta: float = DEFAULT_MIN_DELTA) -> bool:
+        """Check if the stage got slower by more than both the relative threshold and the absolute noise floor."""
+        if self.baseline is None or self.current is None:
+            return False
+        return self.current - self.baseline > max(min_delta, threshold * self.baseline)
+
+
+def stage_times(report: dict) -> dict[tuple[str, str], float]:
+    """Return times of all stages of the report, keyed by (benchmark, stage)."""
+    times = {}
+    for result in report["results"]:
+        benchmark = f"{result['backend']}/{result['size']}"
+        times[(benchmark, "total")] = result["seconds"]
+        for path, stage in result["stages"].items():
+            times[(benchmark, path)] = stage["seconds"]
+    for name, seconds in report.get("micro", {}).items():
+        times[("micro", name)] = seconds
+    return times
+
+
+def calibration_ratio(baseline: dict, current: dict) -> float:
+    """Return how many times faster the baseline machine was, 1 if any of the reports lacks the calibration."""
+    if not baseline.get("calibration") or not current.get("calibration"):
+        return 1.0
+    return current["calibration"] / baseline["calibration"]
+
+
+def compare(baseline: dict, current: dict) -> list[StageDiff]:
+    """
+    Pair the stages of both reports, stages missing in one of them have None as the time.
+    Times of the baseline are scaled to the speed of the machine of the current report.
+    """
+    ratio = calibration_ratio(baseline, current)
+    baseline_times = {key: seconds * ratio for key, seconds in stage_times(baseline).items()}
+    current_times = stage_times(current)
+    keys = list(baseline_times) + [key for key in current_times if key not in baseline_times]
+    return [StageDiff(*key, baseline_times.get(key), current_times.get(key)) for key in keys]
+
+
+def merge_best(report: dict, other: dict) -> dict:
+    """Return the report with the shortest time of every stage from both reports of the same matrix."""
+    other_times = stage_times(other)
+    merged = {**report, "results": []}
+    for result in report["results"]:
+        benchmark = f"{result['backend']}/{result['size']}"
+        stages = {
+            path: {**stage, "seconds": min(stage["seconds"], other_times.get((benchmark, path), stage["seconds"]))}
+            for path, stage in result["stages"].items()
+        }
+        seconds = min(result["seconds"], other_times.get((benchmark, "total"), result["seconds"]))
+        merged["results"].append({**result, "seconds": seconds, "stages": stages})
+    if "micro" in report:
+        merged["micro"] = {
+            name: min(seconds, other_times.get(("micro", name), seconds)) for name, seconds in report["micro"].items()
+        }
+    if "calibration" in report:
+        merged["calibration"] = min(report["calibration"], other.get("calibration", report["calibration"]))
+    return merged
+
+
+def check_regressions(
+    baseline: dict,
+    threshold: float = DEFAULT_THRESHOLD,
+    min_delta: float = DEFAULT_MIN_DELTA,
+    retries: int = 1,
+    verbose: bool = False,
+) -> tuple[list[StageDiff], dict]:
+    """
+    Run the benchmark matrix of the baseline (same backends, sizes, seed and repeats) and compare it
+    with the baseline. A slowdown is often a hiccup of the machine, so while there are regressions,
+    the matrix is run again up to `retries` times, keeping the shortest time of every stage.
+
+    Returns the differences of all stages and the current report.
+    """
+    backends = list(dict.fromkeys(result["backend"] for result in baseline["results"]))
+    sizes = list(dict.fromkeys(result["size"] for result in baseline["results"]))
+    micro = "micro" in baseline
+
+    def run() -> dict:
+        """Run the benchmark matrix once."""
+        return run_benchmarks(backends, sizes, baseline["repeats"], baseline["seed"], verbose=verbose, micro=micro)
+
+    current = run()
+    diffs = compare(baseline, current)
+    for _ in range(retries):
+        if not any(diff.is_regression(threshold, min_delta) for diff in diffs):
+            break
+        current = merge_best(current, run())
+        diffs = compare(baseline, current)
+    return diffs, current
+
+
+def format_diff_table(
+    diffs: list[StageDiff], threshold: float = DEFAULT_THRESHOLD, min_delta: float = DEFAULT_MIN_DELTA
+) -> str:
+    """Return a text table with the baseline and current time of every stage."""
+
+    def seconds(value: Optional[float]) -> str:
+        """Format time in milliseconds, or '-' if it is missing."""
+        return "-" if value is None else f"{value * 1000:.3f}"
+
+    rows = [("benchmark", "stage", "baseline ms", "current ms", "change", "")]
+    for diff in diffs:
+        if diff.is_regression(threshold, min_delta):
+            status = "REGRESSION"
+        elif diff.baseline is None:
+            status = "new"
+        elif diff.current is None:
+            status = "missing"
+        else:
+            status = ""
+        change = "-" if diff.change is None else f"{diff.change:+.1%}"
+        rows.append((diff.benchmark, diff.stage, seconds(diff.baseline), seconds(diff.current), change, status))
+
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(
+            cell.rjust(width) if 2 <= column < 5 else cell.ljust(width)
+            for column, (cell, width) in enumerate(zip(row, widths))
+        ).rstrip()
+        for row in rows
+    )
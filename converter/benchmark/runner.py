@@ -0,0 +1,276 @@
+"""Measures conversion time and memory of every backend for synthetic projects of growing size."""
+
+import json
+import platform
+import random
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from converter import api
+from converter.benchmark.generator import generate_project
+from converter.common import _FORMAT_FLOAT_MEMO, format_float
+from converter.cache import converter_version
+from converter.profiling import StageTimer
+
+BACKENDS = tuple(api.PARSERS)
+
+# world zone of SHIELD-HIT12A grows fast with the number of zones, so bigger sizes take minutes
+DEFAULT_SIZES = (10, 50, 250)
+
+# number of objects of the project used by the micro benchmarks of the hot paths
+MICRO_SIZE = 100
+FORMAT_FLOAT_CALLS = 20000
+
+# number of instances created to measure the memory taken by a single one
+OBJECTS_COUNT = 10000
+
+# iterations of the calibration loop, which takes a few tens of milliseconds
+CALIBRATION_ITERATIONS = 100000
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements of converting a single project with a single backend."""
+
+    backend: str
+    size: int
+    seconds: float
+    peak_memory: int
+    output_bytes: int
+    stages: dict = field(default_factory=dict)
+
+
+def measure(backend: str, project: dict, size: int, repeats: int = 3) -> BenchmarkResult:
+    """
+    Convert the project `repeats` times and take the shortest wall time and the shortest time of every
+    stage, then convert it once more under tracemalloc to get the peak memory allocated by the conversion.
+    """
+    best_seconds = None
+    best_stages = {}
+    for _ in range(max(1, repeats)):
+        parser = api.get_parser_from_str(backend)
+        parser.profiler = StageTimer()
+        start = time.perf_counter()
+        configs_json = api.run_parser(parser, project)
+        seconds = time.perf_counter() - start
+        if best_seconds is None or seconds < best_seconds:
+            best_seconds = seconds
+        for path, stage in parser.profiler.report()["stages"].items():
+            if path not in best_stages or stage["seconds"] < best_stages[path]["seconds"]:
+                best_stages[path] = stage
+
+    # tracemalloc slows down the conversion a lot, so it is not used while measuring time
+    tracemalloc.start()
+    try:
+        api.run_parser(api.get_parser_from_str(backend), project)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return BenchmarkResult(
+        backend=backend,
+        size=size,
+        seconds=round(best_seconds, 6),
+        peak_memory=peak_memory,
+        output_bytes=sum(len(content.encode("utf-8")) for content in configs_json.values()),
+        stages=best_stages,
+    )
+
+
+def _best_time(function: Callable[[], object], repeats: int) -> float:
+    """Return the shortest wall time of calling the function `repeats` times."""
+    best_seconds = None
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        if best_seconds is None or seconds < best_seconds:
+            best_seconds = seconds
+    return round(best_seconds, 6)
+
+
+def calibrate(repeats: int = 3) -> float:
+    """
+    Return the shortest time of a fixed pure Python loop, doing the kind of string, dict and set operations
+    the conversion does. Reports keep it, so their times can be compared between machines (see `normalize`).
+    """
+
+    def loop() -> None:
+        """Count formatted keys and sort them."""
+        counts: dict[str, int] = {}
+        for index in range(CALIBRATION_ITERATIONS):
+            key = f"{index % 1000:8.3f}"
+            counts[key] = counts.get(key, 0) + 1
+        sorted(set(counts))
+
+    return _best_time(loop, repeats)
+
+
+def scale_times(report: dict, factor: float, digits: Optional[int] = None) -> dict:
+    """
+    Return copy of the report with all times (including the calibration) multiplied by the factor
+    and rounded to `digits` significant digits, if given.
+    """
+
+    def scale(seconds: float) -> float:
+        """Scale and round a single time."""
+        return seconds * factor if digits is None else float(f"{seconds * factor:.{digits}g}")
+
+    report = json.loads(json.dumps(report))
+    for result in report["results"]:
+        result["seconds"] = scale(result["seconds"])
+        for stage in result["stages"].values():
+            stage["seconds"] = scale(stage["seconds"])
+    if "micro" in report:
+        report["micro"] = {name: scale(seconds) for name, seconds in report["micro"].items()}
+    if "calibration" in report:
+        report["calibration"] = scale(report["calibration"])
+    return report
+
+
+def normalize(report: dict, digits: int = 3) -> dict:
+    """
+    Return copy of the report with times in units of its calibration loop, so a baseline saved that way
+    doesn't depend on the speed of the machine it was measured on and doesn't change with timer noise
+    below `digits` significant digits.
+    """
+    if not report.get("calibration"):
+        return report
+    return scale_times(report, 1 / report["calibration"], digits)
+
+
+def measure_micro(repeats: int = 3, seed: int = 0) -> dict[str, float]:
+    """
+    Measure the hot paths on their own: `format_float` on many numbers, CSG processing of the SHIELD-HIT12A
+    world zone and rendering geo.dat, the last two for a project of MICRO_SIZE objects.
+    """
+    from converter.shieldhit.world_zone import calculate_world_zone_operations  # skipcq: PYL-C0415
+
+    # coordinates and dimensions of figures repeat a lot, so the numbers are drawn from a smaller pool
+    numbers_random = random.Random(seed)
+    widths = numbers_random.choices((8, 10, 16), k=FORMAT_FLOAT_CALLS // 10)
+    # '-999.' takes 5 characters, so the digits after it fit the width and numbers are never truncated
+    pool = [(round(numbers_random.uniform(-999, 999), numbers_random.randint(0, width - 5)), width) for width in widths]
+    numbers = numbers_random.choices(pool, k=FORMAT_FLOAT_CALLS)
+
+    def format_one_by_one() -> None:
+        """Format all numbers."""
+        _FORMAT_FLOAT_MEMO.clear()
+        for number, width in numbers:
+            format_float(number, width)
+
+    parser = api.get_parser_from_str("shieldhit")
+    parser.parse_configs(generate_project(MICRO_SIZE, seed=seed))
+    zones = [operators for zone in parser.geo_mat_config.zones for operators in zone.figures_operators]
+    world_zone_figure = len(parser.geo_mat_config.figures)
+
+    return {
+        "format_float": _best_time(format_one_by_one, repeats),
+        "world_zone": _best_time(lambda: calculate_world_zone_operations(zones, world_zone_figure), repeats),
+        "geo.dat": _best_time(lambda: "".join(parser.geo_mat_config.iter_geo_chunks()), repeats),
+    }
+
+
+def measure_object_memory(count: int = OBJECTS_COUNT) -> dict[str, float]:
+    """
+    Measure the average memory (in bytes) taken by an instance of each class created for every figure,
+    zone or detector of a project, so the footprint of big projects can be compared between versions.
+    """
+    from converter.fluka.helper_parsers.figure_parser import FlukaBox, FlukaCylinder  # skipcq: PYL-C0415
+    from converter.fluka.helper_parsers.region_parser import FlukaRegion  # skipcq: PYL-C0415
+    from converter.shieldhit.detectors import ScoringMesh  # skipcq: PYL-C0415
+    from converter.shieldhit.geo import Material, Zone  # skipcq: PYL-C0415
+    from converter.solid_figures import BoxFigure, CylinderFigure, SphereFigure  # skipcq: PYL-C0415
+
+    factories: dict[str, Callable[[int], object]] = {
+        "BoxFigure": lambda index: BoxFigure(uuid=str(index), name=f"Box_{index}", x_edge_length=float(index)),
+        "CylinderFigure": lambda index: CylinderFigure(uuid=str(index), name=f"Cyl_{index}", height=float(index)),
+        "SphereFigure": lambda index: SphereFigure(uuid=str(index), name=f"Sphere_{index}", radius=float(index)),
+        "Zone": lambda index: Zone(uuid=str(index), id=index, figures_operators=[{index}]),
+        "Material": lambda index: Material(f"Material_{index}", f"material_{index}", str(index), index),
+        "FlukaBox": lambda index: FlukaBox(name=f"fig{index}", uuid=str(index), x_max=float(index)),
+        "FlukaCylinder": lambda index: FlukaCylinder(name=f"fig{index}", uuid=str(index), radius=float(index)),
+        "FlukaRegion": lambda index: FlukaRegion(name=f"region{index}"),
+        "ScoringMesh": lambda index: ScoringMesh(str(index), f"Mesh_{index}", x_max=float(index)),
+    }
+    # arguments are created before measuring, so only the instances themselves are counted
+    arguments = list(range(1, count + 1))
+    memory = {}
+    for name, factory in factories.items():
+        tracemalloc.start()
+        try:
+            start, _ = tracemalloc.get_traced_memory()
+            instances = [factory(index) for index in arguments]
+            end, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        memory[name] = round((end - start) / len(instances), 1)
+    return memory
+
+
+def run_benchmarks(
+    backends: Iterable[str] = BACKENDS,
+    sizes: Iterable[int] = DEFAULT_SIZES,
+    repeats: int = 3,
+    seed: int = 0,
+    verbose: bool = False,
+    micro: bool = True,
+) -> dict:
+    """
+    Measure every backend for projects of every size (and the hot paths if `micro` is True)
+    and return the report, ready to be saved as a baseline.
+    """
+    backends = list(backends)
+    calibration = calibrate(repeats)
+    results = []
+    for size in sizes:
+        project = generate_project(size, seed=seed)
+        for backend in backends:
+            result = measure(backend, project, size, repeats)
+            if verbose:
+                print(
+                    f"{backend:>10} {size:>6} objects: {result.seconds:10.4f} s, "
+                    f"{result.peak_memory / 2**20:8.2f} MiB peak, {result.output_bytes} bytes of output"
+                )
+            results.append(result)
+
+    report = {
+        "converter": converter_version(),
+        "python": platform.python_version(),
+        "seed": seed,
+        "repeats": repeats,
+        # measured before and after the benchmarks, the shorter time is the one least disturbed by the machine
+        "calibration": min(calibration, calibrate(repeats)),
+        "results": [asdict(result) for result in results],
+    }
+    if micro:
+        report["micro"] = measure_micro(repeats, seed)
+        report["object_memory"] = measure_object_memory()
+        if verbose:
+            for name, seconds in report["micro"].items():
+                print(f"{name:>17}: {seconds:10.4f} s")
+            for name, size in report["object_memory"].items():
+                print(f"{name:>17}: {size:10.1f} bytes per object")
+    return report
+
+
+def save_baseline(report: dict, path: Path) -> None:
+    """Save the report as a JSON baseline."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as baseline_f:
+        json.dump(report, baseline_f, indent=2)
+
+
+def load_baseline(path: Path) -> dict:
+    """Load the JSON baseline saved by `save_baseline`."""
+    with open(path, "r") as baseline_f:
+        return json.load(baseline_f)
+
+
+def save_project(size: int, path: Path, seed: int = 0) -> None:
+    """Save the generated project, so it can be converted or opened in the editor."""
+    with open(path, "w") as project_f:
+        json.dump(generate_project(size, seed=seed), project_f)
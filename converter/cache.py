@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union
+
+# bump when the layout of cache entries changes, so old entries are not read
+CACHE_FORMAT_VERSION = 1
+# file in the cache directory with the totals shared by all processes using it (see `ConversionCache`)
+TOTALS_FILE_NAME = ".totals.json"
+
+
+@lru_cache(maxsize=None)
+def converter_version() -> str:
+    """Version of the installed converter package, part of every cache key."""
+    # imported here, as importlib.metadata is slow to import and is needed only when the cache is used
+    from importlib.metadata import PackageNotFoundError, version  # skipcq: PYL-C0415
+
+    try:
+        return version("yaptide-converter")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def cache_key(input_data: dict, backend: str, converter: Optional[str] = None) -> str:
+    """
+    Hash of the project JSON, the backend name and the converter version. The JSON is canonicalized
+    (sorted keys, no whitespace), so the same project gives the same key however it was serialized.
+    """
+    canonical_json = json.dumps(input_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    digest = hashlib.sha256()
+    for part in (str(CACHE_FORMAT_VERSION), backend.lower(), converter or converter_version(), canonical_json):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@contextmanager
+def _locked(file: IO) -> Iterator[None]:
+    """Lock the file against other processes, and other open files of this process, inside the `with` block."""
+    try:
+        import fcntl  # skipcq: PYL-C0415
+    except ImportError:  # Windows
+        import msvcrt  # skipcq: PYL-C0415
+
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+
+    fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+@dataclass
+class CacheStats:
+    """Counters of a single ConversionCache object."""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+
+class ConversionCache:
+    """
+    On-disk cache of converted files, shared by many processes. Each entry is a single JSON file
+    named after its key (see `cache_key`) holding the dict returned by `Parser.get_configs_json`.
+
+    Entries are written to a temporary file and renamed, so readers never see partial entries.
+    Reading an entry updates its modification time, which is used for LRU eviction:
+    entries older than `max_age` seconds are dropped and then the least recently used ones
+    are dropped until the cache takes at most `max_bytes`.
+
+    Eviction scans all entries, so it runs only when the oldest entry may have expired or when the total
+    size exceeds `max_bytes`. The total size and the expiry time are shared by all processes using
+    the directory: they are kept in its `TOTALS_FILE_NAME` file, which is locked while they are updated
+    by each store and set by each scan, so the budget holds for all processes together.
+    """
+
+    def __init__(
+        self, directory: Union[str, Path], max_bytes: Optional[int] = None, max_age: Optional[float] = None
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stats = CacheStats()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # guards the stats, the cache is used by many threads of the server
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        """Pickle the cache without its lock, e.g. to pass it to a process pool."""
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore the pickled cache with a new lock."""
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _entry_path(self, key: str) -> Path:
+        """Entries are split into subdirectories to keep directories small."""
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return cached files or None if the entry is missing, expired or unreadable."""
+        entry_path = self._entry_path(key)
+        try:
+            if self.max_age is not None and time.time() - entry_path.stat().st_mtime > self.max_age:
+                entry_path.unlink(missing_ok=True)
+                raise FileNotFoundError(entry_path)
+            with open(entry_path, "r", encoding="utf-8") as entry_f:
+                configs_json = json.load(entry_f)
+        except (OSError, ValueError):
+            # entry may be removed by another process at any moment, treat it as a miss
+            with self._lock:
+                self.stats.misses += 1
+            return None
+
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self.stats.hits += 1
+        return configs_json
+
+    def put(self, key: str, configs_json: dict) -> None:
+        """Store the files atomically and evict old entries if the cache is too big."""
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=entry_path.parent, prefix=f".{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_f:
+                json.dump(configs_json, tmp_f, ensure_ascii=False)
+            # the entry is replaced while the totals are locked, so an eviction can't remove the replaced entry
+            # after its size was taken, which would leave the total below the actual size
+            # totals are needed only to know when to evict entries
+            limited = self.max_age is not None or self.max_bytes is not None
+            no_totals = {"size": None, "next_expiry": None}
+            with self._shared_totals() if limited else nullcontext(no_totals) as totals:
+                if totals["size"] is not None:
+                    totals["size"] += os.stat(tmp_name).st_size
+                    try:
+                        totals["size"] -= entry_path.stat().st_size
+                    except FileNotFoundError:
+                        pass
+                os.replace(tmp_name, entry_path)
+                size, next_expiry = totals["size"], totals["next_expiry"]
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            self.stats.stores += 1
+        if (self.max_bytes is not None and (size is None or size > self.max_bytes)) or (
+            self.max_age is not None and (next_expiry is None or time.time() > next_expiry)
+        ):
+            self.evict()
+
+    @contextmanager
+    def _shared_totals(self) -> Iterator[dict]:
+        """
+        Total size of the entries and the time the oldest of them expires (None if unknown, e.g. before
+        the first scan), locked inside the `with` block and saved after it.
+        """
+        with open(self.directory / TOTALS_FILE_NAME, "a+", encoding="utf-8") as totals_f, _locked(totals_f):
+            totals_f.seek(0)
+            try:
+                saved = json.loads(totals_f.read())
+                totals = {"size": saved["size"], "next_expiry": saved["next_expiry"]}
+            except (ValueError, KeyError, TypeError):
+                totals = {"size": None, "next_expiry": None}
+            yield totals
+            # the file is opened for appending, which writes at its end, so it is emptied first
+            totals_f.seek(0)
+            totals_f.truncate()
+            json.dump(totals, totals_f)
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        """Modification time, size and path of all entries, entries removed meanwhile are skipped."""
+        entries = []
+        for entry_path in self.directory.glob("*/*.json"):
+            try:
+                entry_stat = entry_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((entry_stat.st_mtime, entry_stat.st_size, entry_path))
+        return entries
+
+    def evict(self) -> int:
+        """Remove expired entries, then least recently used ones above the size limit. Returns number of removed."""
+        if self.max_age is None and self.max_bytes is None:
+            return 0
+
+        with self._shared_totals() as totals:
+            removed = self._evict(totals)
+        with self._lock:
+            self.stats.evictions += removed
+        return removed
+
+    def _evict(self, totals: dict) -> int:
+        """Evict the entries and set the shared totals, while they are locked."""
+        entries = sorted(self._entries())
+        to_remove = []
+        if self.max_age is not None:
+            now = time.time()
+            to_remove = [entry for entry in entries if now - entry[0] > self.max_age]
+            entries = entries[len(to_remove) :]
+        total_size = sum(size for _, size, _ in entries)
+        # least recently used entries come first
+        oldest_kept = 0
+        if self.max_bytes is not None:
+            while oldest_kept < len(entries) and total_size > self.max_bytes:
+                total_size -= entries[oldest_kept][1]
+                oldest_kept += 1
+        to_remove += entries[:oldest_kept]
+        entries = entries[oldest_kept:]
+
+        for _, _, entry_path in to_remove:
+            entry_path.unlink(missing_ok=True)
+        totals["size"] = total_size
+        totals["next_expiry"] = entries[0][0] + self.max_age if entries and self.max_age is not None else None
+        return len(to_remove)
+
+    def size(self) -> int:
+        """Total size of all entries in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._shared_totals() as totals:
+            for _, _, entry_path in self._entries():
+                entry_path.unlink(missing_ok=True)
+            totals.update(size=0, next_expiry=None)
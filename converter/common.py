@@ -1,10 +1,87 @@
+import functools
+import os
+import shutil
+import tempfile
+from contextlib import nullcontext
 from pathlib import Path
 from math import log10, ceil, isclose, sin, cos, radians
-from typing import Literal
+from string import Formatter
+from typing import ContextManager, Iterable, Iterator, Literal, Optional
+
+from converter import deadline
+from converter.diagnostics import Diagnostics, warn
+from converter.metrics import Metrics
+from converter.profiling import StageTimer
+from converter.solid_figures import SolidFigure, parse_figure
+
+# returned by `Parser._stage` when profiling is disabled, so disabled hooks cost a single attribute check
+_NO_STAGE = nullcontext()
+
+
+def _dropping_rendered_configs(method):
+    """Wrap the parsing method of a Parser, so the files rendered for the previous project are dropped first."""
+
+    @functools.wraps(method)
+    def parse(self, *args, **kwargs):
+        self._configs_json = None
+        self.project = None
+        return method(self, *args, **kwargs)
+
+    parse.drops_rendered_configs = True
+    return parse
+
+
+class ParsedProject:
+    """
+    Parts of the project JSON which are the same for every simulator. They are parsed lazily and
+    at most once, so a single ParsedProject can be used by many parsers (see `Parser.parse_project`).
+    Returned objects are shared between parsers, so they must not be modified (copy them first).
+    """
+
+    def __init__(self, json: dict) -> None:
+        self.json = json
+        self._figures: Optional[list[SolidFigure]] = None
+        self._world_figure: Optional[SolidFigure] = None
+        self._beam_energies: dict[tuple, tuple[float, str, float]] = {}
+
+    @property
+    def figures(self) -> list[SolidFigure]:
+        """Figures from the figureManager, in the same order as in JSON."""
+        if self._figures is None:
+            self._figures = [parse_figure(figure_dict) for figure_dict in self.json["figureManager"].get("figures")]
+        return self._figures
+
+    @property
+    def world_figure(self) -> SolidFigure:
+        """Figure bounding the world zone."""
+        if self._world_figure is None:
+            self._world_figure = parse_figure(self.json["zoneManager"]["worldZone"])
+        return self._world_figure
+
+    def convert_beam_energy(
+        self, particles_dict, particle_id, a, energy, energy_unit
+    ) -> (float, Literal["MeV", "MeV/nucl"], float):
+        """Memoized `convert_beam_energy`, particle dictionaries are compared by identity."""
+        key = (id(particles_dict), particle_id, a, energy, energy_unit)
+        if key not in self._beam_energies:
+            self._beam_energies[key] = convert_beam_energy(particles_dict, particle_id, a, energy, energy_unit)
+        return self._beam_energies[key]
 
 
 class Parser:
-    """Abstract parser, the template for implementing other parsers."""
+    """
+    Abstract parser, the template for implementing other parsers. Parsers implement `_parse_configs`,
+    parsers overriding `parse_configs` or `parse_project` (even without calling them) still get their
+    rendered files dropped before each project is parsed.
+    """
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        """Wrap `parse_configs` and `parse_project` overridden by the subclass, see `_dropping_rendered_configs`."""
+        super().__init_subclass__(**kwargs)
+        for name in ("parse_configs", "parse_project"):
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, "drops_rendered_configs", False):
+                setattr(cls, name, _dropping_rendered_configs(method))
 
     def __init__(self) -> None:
         self.info = {
@@ -12,56 +89,260 @@ class Parser:
             "label": "",
             "simulator": "",
         }
+        # project being converted, set by `parse_project`
+        self.project: Optional[ParsedProject] = None
+        # files rendered by `get_configs_json`, dropped whenever `parse_configs` runs again
+        self._configs_json: Optional[dict] = None
+        # set to measure time of the conversion stages
+        self.profiler: Optional[StageTimer] = None
+        # set to collect warnings and errors of the conversion instead of printing them
+        self.diagnostics: Optional[Diagnostics] = None
+        # set to record conversion metrics, e.g. sizes of the rendered files
+        self.metrics: Optional[Metrics] = None
+
+    def _stage(self, name: str) -> ContextManager:
+        """Measure time of a conversion stage if profiling is enabled, e.g. `with self._stage("beam"): ...`"""
+        if self.profiler is None:
+            return _NO_STAGE
+        return self.profiler.stage(name)
+
+    def _collect_diagnostics(self) -> ContextManager:
+        """Collect diagnostics reported inside the `with` block if the collector is set."""
+        if self.diagnostics is None:
+            return _NO_STAGE
+        return self.diagnostics.activate(simulator=self.info["simulator"])
 
     def parse_configs(self, json: dict) -> None:
         """Convert the json dict to the 4 config dataclasses."""
+        self.parse_project(ParsedProject(json))
+
+    def parse_project(self, project: ParsedProject) -> None:
+        """Same as `parse_configs`, but reuses parts of the project already parsed by other parsers."""
+        self._configs_json = None
+        self.project = project
+        with self._collect_diagnostics(), self._stage("parse"):
+            self._parse_configs(project.json)
+
+    def _parse_configs(self, json: dict) -> None:
+        """Convert the json dict to the config dataclasses. Implemented by each parser."""
         raise NotImplementedError
 
-    def save_configs(self, target_dir: str):
+    def save_configs(self, target_dir: str) -> list[str]:
         """
-        Save the configs as text files in the target_dir.
+        Save the configs as text files in the target_dir and return their names.
         The files are: beam.dat, mat.dat, detect.dat and geo.dat.
+
+        Files which were not rendered yet are written chunk by chunk as they are rendered,
+        so whole files are not kept in memory. They are written into a temporary directory and moved
+        to the target_dir when all of them are done, so a failed (e.g. timed out) conversion leaves no partial files.
         """
         if not Path(target_dir).exists():
             raise ValueError("Target directory does not exist.")
 
-        for file_name, content in self.get_configs_json().items():
-            with open(Path(target_dir, file_name), "w") as conf_f:
-                conf_f.write(content)
+        conf_f = None
+        current_file_name = None
+        file_names = []
+        temp_dir = tempfile.mkdtemp(prefix=".converting-", dir=target_dir)
+        try:
+            with self._stage("save"):
+                try:
+                    for file_name, chunk in self.iter_configs():
+                        if file_name != current_file_name:
+                            if conf_f is not None:
+                                conf_f.close()
+                            conf_f = open(Path(temp_dir, file_name), "w")  # skipcq: PTC-W6004
+                            current_file_name = file_name
+                            file_names.append(file_name)
+                        conf_f.write(chunk)
+                finally:
+                    if conf_f is not None:
+                        conf_f.close()
+                for file_name in file_names:
+                    os.replace(Path(temp_dir, file_name), Path(target_dir, file_name))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return file_names
 
     def get_configs_json(self) -> dict:
         """
         Return a dict representation of the config files. Each element has
         the config files name as key and its content as value.
+
+        Files are rendered only once after each `parse_configs` call, following calls
+        return the same content.
+        """
+        if self._configs_json is None:
+            chunks: dict[str, list[str]] = {}
+            with self._stage("render"):
+                for file_name, chunk in self._render_chunks():
+                    chunks.setdefault(file_name, []).append(chunk)
+            self._configs_json = {file_name: "".join(file_chunks) for file_name, file_chunks in chunks.items()}
+        return dict(self._configs_json)
+
+    def iter_configs(self) -> Iterator[tuple[str, str]]:
+        """
+        Render the config files piece by piece, yielding `(file name, chunk)` pairs. Chunks of each file
+        are yielded one after another, the content of the file is the concatenation of its chunks.
+        If the files were already rendered by `get_configs_json`, whole files are yielded.
+        """
+        if self._configs_json is not None:
+            yield from self._configs_json.items()
+        else:
+            yield from self._render_chunks()
+
+    def _render_chunks(self) -> Iterator[tuple[str, str]]:
+        """
+        Chunks yielded by `_iter_configs`, rendering of each file is measured if profiling is enabled
+        and sizes of the files are recorded if metrics are.
+        Files with a name used by an earlier file are renamed (see `unique_file_names`).
+        If the conversion has a deadline, it is checked after each chunk.
+        If diagnostics are collected into info.json, the file is rendered last, when all of them are known.
+        """
+        chunks = unique_file_names(self._iter_configs())
+        if deadline.remaining() is not None:
+            chunks = _check_deadline(chunks)
+        if self.diagnostics is not None:
+            chunks = self.diagnostics.iter_collecting(chunks, simulator=self.info["simulator"])
+            if self.diagnostics.in_info:
+                chunks = self._info_last(chunks)
+        if self.metrics is not None:
+            chunks = self.metrics.count_bytes(chunks, self.info["simulator"])
+        if self.profiler is None:
+            return chunks
+        return self.profiler.time_chunks(chunks)
+
+    def _info_last(self, chunks: Iterator[tuple[str, str]]) -> Iterator[tuple[str, str]]:
+        """Yield the chunks without info.json, then info.json with the collected diagnostics."""
+        for file_name, chunk in chunks:
+            if file_name != "info.json":
+                yield file_name, chunk
+        info = {**self.info, "diagnostics": self.diagnostics.to_list(simulator=self.info["simulator"])}
+        yield "info.json", str(info)
+
+    def _iter_configs(self) -> Iterator[tuple[str, str]]:
         """
+        Render the config files chunk by chunk. Parsers may extend this generator to stream
+        big files, by default files returned by `_render_configs` are yielded whole.
+        """
+        yield from self._render_configs().items()
+
+    def _render_configs(self) -> dict:
+        """Render the config files. Parsers extend the dict returned by this method with their files."""
         configs_json = {
             "info.json": str(self.info),
         }
         return configs_json
 
 
-def format_float(number: float, n: int) -> float:
+def _check_deadline(chunks: Iterator[tuple[str, str]]) -> Iterator[tuple[str, str]]:
+    """Check the deadline of the conversion after each rendered chunk."""
+    for file_name, chunk in chunks:
+        deadline.check()
+        yield file_name, chunk
+
+
+def iter_file_chunks(file_name: str, chunks: Iterable[str]) -> Iterator[tuple[str, str]]:
+    """Pair chunks with the file name, files without any chunks get an empty one, so they are still created."""
+    empty = True
+    for chunk in chunks:
+        empty = False
+        yield file_name, chunk
+    if empty:
+        yield file_name, ""
+
+
+def unique_file_names(chunks: Iterable[tuple[str, str]]) -> Iterator[tuple[str, str]]:
     """
-    Format float to be up to n characters wide, as precise as possible and as short
-    as possible (in descending priority). so for example given 12.333 for n=5 you will
-    get 12.33, n=7 will be 12.333
+    Rename files whose name was already used by an earlier file, e.g. a custom stopping power file named
+    like one of the config files. Consecutive chunks with the same name form a single file, a file with
+    a used name gets `_2` (`_3`, ...) added before its extension, e.g. `beam_2.dat`.
+    All ways of writing the files (`save_configs`, `get_configs_json`, archives) use this rule.
     """
-    result = number
-    # If number is zero we just want to get 0.0 (it would mess up the log10 operation below)
-    if isclose(result, 0.0, rel_tol=1e-9):
-        return 0.0
-
-    length = n
+    used_names: set[str] = set()
+    previous_name = None
+    unique_name = None
+    for file_name, chunk in chunks:
+        if file_name != previous_name:
+            previous_name = unique_name = file_name
+            if unique_name in used_names:
+                stem, dot, extension = file_name.partition(".")
+                number = 2
+                while unique_name in used_names:
+                    unique_name = f"{stem}_{number}{dot}{extension}"
+                    number += 1
+            used_names.add(unique_name)
+        yield unique_name, chunk
+
+
+def iter_template(template: str, fields: dict) -> Iterator[str]:
+    """
+    Same as `template.format(**fields)`, but yields the result piece by piece. Field values which are
+    iterators of strings are rendered lazily: their chunks are yielded as they are produced.
+    """
+    for literal_text, field_name, format_spec, conversion in Formatter().parse(template):
+        if literal_text:
+            yield literal_text
+        if field_name is None:
+            continue
+        value = fields[field_name]
+        if isinstance(value, Iterator):
+            yield from value
+            continue
+        if conversion == "r":
+            value = repr(value)
+        elif conversion == "s":
+            value = str(value)
+        yield format(value, format_spec)
+
+
+def partial_template(template: str, fields: dict) -> str:
+    """
+    Return the template with the given fields already rendered, the other fields are left to be formatted
+    later. Entries sharing most of their fields can be rendered from such template with less work.
+    """
+    parts = []
+    for literal_text, field_name, format_spec, conversion in Formatter().parse(template):
+        parts.append(literal_text.replace("{", "{{").replace("}", "}}"))
+        if field_name is None:
+            continue
+        if field_name not in fields:
+            conversion = f"!{conversion}" if conversion else ""
+            format_spec = f":{format_spec}" if format_spec else ""
+            parts.append(f"{{{field_name}{conversion}{format_spec}}}")
+            continue
+        value = fields[field_name]
+        if conversion == "r":
+            value = repr(value)
+        elif conversion == "s":
+            value = str(value)
+        parts.append(format(value, format_spec).replace("{", "{{").replace("}", "}}"))
+    return "".join(parts)
+
+
+# results of `_format_float` for (number, width) pairs, figures share many coordinates and dimensions
+_FORMAT_FLOAT_MEMO: dict[tuple[float, int], tuple[float, Optional[float]]] = {}
+# the table is cleared when it gets that big, so converting a huge project doesn't keep all numbers
+FORMAT_FLOAT_MEMO_SIZE = 65536
+
+
+def _format_float(number: float, n: int) -> tuple[float, Optional[float]]:
+    """
+    Return the number formatted by `format_float` and the rounded number to show in the warning
+    if it was truncated (None otherwise).
+    """
+    # isclose(number, 0.0, rel_tol=1e-9) is true only for zero, it would mess up the log10 operation below
+    if number == 0:
+        return 0.0, None
 
     # Adjust length for decimal separator ('.')
-    length -= 1
+    length = n - 1
 
     # Sign messes up the log10 we use do determine how long the number is. We use
     # abs() to fix that, but we need to remember the sign and update `n` accordingly
     sign = 1
-
+    result = number
     if number < 0:
-        result = abs(number)
+        result = -number
         sign = -1
         # Adjust length for the sign
         length -= 1
@@ -79,20 +360,37 @@ requested length: {n}"
     # than 1, for other values it returns nonpositive numbers, but we would like 1
     # to be returned. We solve that by taking the greater value between the returned and
     # and 1.
-    length -= max(whole_length, 1)
+    length -= whole_length if whole_length > 1 else 1
 
     result = float(sign * round(result, length))
-
-    # Check if the round function truncated the number, warn the user if it did.
-    if not isclose(result, number):
-        print(f"WARN: number was truncated when converting: {number} -> {result}")
+    truncated = None if result == number or isclose(result, number) else result
 
     # Formatting negative numbers smaller than the desired precision could result in -0.0 or 0.0 randomly.
     # To avoid this we catch -0.0 and return 0.0.
-    if isclose(result, 0.0, rel_tol=1e-9):
-        return 0.0
+    if result == 0:
+        return 0.0, truncated
 
-    return result
+    return result, truncated
+
+
+def format_float(number: float, n: int) -> float:
+    """
+    Format float to be up to n characters wide, as precise as possible and as short
+    as possible (in descending priority). so for example given 12.333 for n=5 you will
+    get 12.33, n=7 will be 12.333
+    """
+    key = (number, n)
+    formatted = _FORMAT_FLOAT_MEMO.get(key)
+    if formatted is None:
+        formatted = _format_float(number, n)
+        if len(_FORMAT_FLOAT_MEMO) >= FORMAT_FLOAT_MEMO_SIZE:
+            _FORMAT_FLOAT_MEMO.clear()
+        _FORMAT_FLOAT_MEMO[key] = formatted
+
+    # Check if the round function truncated the number, warn the user if it did.
+    if formatted[1] is not None:
+        warn(f"number was truncated when converting: {number} -> {formatted[1]}")
+    return formatted[0]
 
 
 def convert_beam_energy(
@@ -130,6 +428,32 @@ def convert_beam_energy(
     return energy * energy_scale_factor, energy_unit, energy_scale_factor
 
 
+# sines and cosines of (angles, degrees) rotations, most figures of a project share a few rotations
+_ROTATION_MEMO: dict[tuple, tuple[float, float, float, float, float, float]] = {}
+# the table is cleared when it gets that big, like the one of `format_float`
+ROTATION_MEMO_SIZE = 4096
+
+
+def _rotation(angles: Iterable[float], degrees: bool) -> tuple[float, float, float, float, float, float]:
+    """Return cosines and sines of the rotation around X, Y and Z axes, computed once for each rotation."""
+    key = (*angles, degrees)
+    rotation = _ROTATION_MEMO.get(key)
+    if rotation is None:
+        rad_angles = [radians(angle) for angle in key[:3]] if degrees else key[:3]
+        rotation = (
+            cos(rad_angles[0]),
+            sin(rad_angles[0]),
+            cos(rad_angles[1]),
+            sin(rad_angles[1]),
+            cos(rad_angles[2]),
+            sin(rad_angles[2]),
+        )
+        if len(_ROTATION_MEMO) >= ROTATION_MEMO_SIZE:
+            _ROTATION_MEMO.clear()
+        _ROTATION_MEMO[key] = rotation
+    return rotation
+
+
 def rotate(vector: list[float], angles: list[float], degrees: bool = True) -> list[float]:
     """
     Rotate a vector in 3D around XYZ axes, assuming Euler angles.
@@ -141,26 +465,30 @@ def rotate(vector: list[float], angles: list[float], degrees: bool = True) -> li
 
     If degrees is True, then the given angle are assumed to be in degrees. Otherwise radians are used.
     """
-    # Convert angles to radians if degrees is True
+    return _rotate_with(vector, _rotation(angles, degrees))
 
-    rad_angles = [radians(angle) for angle in angles] if degrees else angles
 
+def _rotate_with(vector: Iterable[float], rotation: tuple[float, float, float, float, float, float]) -> list[float]:
+    """Rotate the vector by the cosines and sines returned by `_rotation`."""
+    cos_x, sin_x, cos_y, sin_y, cos_z, sin_z = rotation
     x, y, z = vector
-    new_x, new_y, new_z = 0, 0, 0
 
     # Rotation around x-axis
-    new_x = x
-    new_y = y * cos(rad_angles[0]) - z * sin(rad_angles[0])
-    new_z = y * sin(rad_angles[0]) + z * cos(rad_angles[0])
+    new_y = y * cos_x - z * sin_x
+    new_z = y * sin_x + z * cos_x
 
     # Rotation around y-axis
-    new_x2 = new_x * cos(rad_angles[1]) + new_z * sin(rad_angles[1])
-    new_y2 = new_y
-    new_z2 = -new_x * sin(rad_angles[1]) + new_z * cos(rad_angles[1])
+    new_x2 = x * cos_y + new_z * sin_y
+    new_z2 = -x * sin_y + new_z * cos_y
 
     # Rotation around z-axis
-    new_x3 = new_x2 * cos(rad_angles[2]) - new_y2 * sin(rad_angles[2])
-    new_y3 = new_x2 * sin(rad_angles[2]) + new_y2 * cos(rad_angles[2])
-    new_z3 = new_z2
+    new_x3 = new_x2 * cos_z - new_y * sin_z
+    new_y3 = new_x2 * sin_z + new_y * cos_z
+
+    return [new_x3, new_y3, new_z2]
+
 
-    return [new_x3, new_y3, new_z3]
+def rotate_vectors(vectors: Iterable[Iterable[float]], angles: list[float], degrees: bool = True) -> list[list[float]]:
+    """Rotate all vectors by the same angles, e.g. all edges of a box. Same as `rotate` called for each of them."""
+    rotation = _rotation(angles, degrees)
+    return [_rotate_with(vector, rotation) for vector in vectors]
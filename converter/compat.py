@@ -0,0 +1,7 @@
+"""Helpers for features missing in the oldest supported Python version."""
+
+import sys
+
+# keyword arguments of `dataclass` making instances use __slots__ instead of __dict__, which saves memory
+# in projects with many figures or zones; `slots` is supported since Python 3.10, before that they are empty
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
@@ -0,0 +1,60 @@
+"""
+Deadline of a conversion. Long loops (CSG processing, world zone expansion, rendering) call `check`,
+which raises ConversionTimeout once the deadline set by `limit` has passed, so a pathological project
+stops the conversion instead of keeping the worker busy. Without a deadline `check` costs next to nothing.
+"""
+
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Optional
+
+# time.monotonic() value after which the conversion is aborted, None if there is no deadline
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("conversion_deadline", default=None)
+
+# returned by `limit` without a timeout
+_NO_LIMIT = nullcontext()
+
+
+class ConversionTimeout(TimeoutError):
+    """Raised when the conversion takes longer than its timeout."""
+
+
+class _Limit:
+    """Sets the deadline inside the `with` block, an earlier deadline of an outer block is kept."""
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self._tokens: list = []
+
+    def __enter__(self) -> None:
+        deadline = time.monotonic() + self.seconds
+        outer_deadline = _DEADLINE.get()
+        if outer_deadline is not None:
+            deadline = min(deadline, outer_deadline)
+        self._tokens.append(_DEADLINE.set(deadline))
+
+    def __exit__(self, *exc_info) -> None:
+        _DEADLINE.reset(self._tokens.pop())
+
+
+def limit(seconds: Optional[float]) -> ContextManager:
+    """Abort the conversion inside the `with` block after that many seconds, None means no limit."""
+    if seconds is None:
+        return _NO_LIMIT
+    return _Limit(seconds)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the deadline (negative if it has passed), None if there is no deadline."""
+    deadline = _DEADLINE.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check() -> None:
+    """Raise ConversionTimeout if the deadline has passed."""
+    deadline = _DEADLINE.get()
+    if deadline is not None and time.monotonic() > deadline:
+        raise ConversionTimeout("Conversion took longer than its timeout.")
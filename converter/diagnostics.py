@@ -0,0 +1,165 @@
+"""
+Warnings and errors reported during a conversion. Without an active collector they are printed,
+as they always were. Daemons and batch jobs activate a `Diagnostics` collector instead, so
+the messages are gathered (with the figure, card etc. they concern) and returned with the files.
+"""
+
+from contextlib import nullcontext
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import ContextManager, Iterable, Iterator, Optional, TypeVar
+
+WARNING = "warning"
+ERROR = "error"
+
+# unique diagnostics kept by a collector, following ones are only counted in `Diagnostics.dropped`
+DEFAULT_MAX_ENTRIES = 1000
+
+_COLLECTOR: ContextVar[Optional["Diagnostics"]] = ContextVar("diagnostics_collector", default=None)
+# (key, value) pairs describing where the diagnostics come from, e.g. (("figure", "Box"),)
+_CONTEXT: ContextVar[tuple] = ContextVar("diagnostics_context", default=())
+
+# returned by `context` when nothing is collected, so marking the location costs next to nothing
+_NO_CONTEXT = nullcontext()
+
+T = TypeVar("T")
+
+
+@dataclass
+class Diagnostic:
+    """Single warning or error, `count` tells how many times it was reported."""
+
+    level: str
+    message: str
+    context: dict = field(default_factory=dict)
+    count: int = 1
+
+
+class _Activation:
+    """Makes the collector current and adds the context, restoring previous ones on exit."""
+
+    def __init__(self, collector: "Diagnostics", context: tuple) -> None:
+        self.collector = collector
+        self.context = context
+        self._tokens: list = []
+
+    def __enter__(self) -> "Diagnostics":
+        self._tokens.append((_COLLECTOR.set(self.collector), _CONTEXT.set(_CONTEXT.get() + self.context)))
+        return self.collector
+
+    def __exit__(self, *exc_info) -> None:
+        collector_token, context_token = self._tokens.pop()
+        _CONTEXT.reset(context_token)
+        _COLLECTOR.reset(collector_token)
+
+
+class _Context:
+    """Adds (key, value) pairs to the context of diagnostics reported inside the `with` block."""
+
+    def __init__(self, context: tuple) -> None:
+        self.context = context
+        self._tokens: list = []
+
+    def __enter__(self) -> None:
+        self._tokens.append(_CONTEXT.set(_CONTEXT.get() + self.context))
+
+    def __exit__(self, *exc_info) -> None:
+        _CONTEXT.reset(self._tokens.pop())
+
+
+class Diagnostics:
+    """
+    Collects diagnostics reported while it is active (see `activate`). Repeated diagnostics, with
+    the same level, message and context, are kept once with their count. Parsers collect into the
+    object set as their `diagnostics` attribute, with `in_info` set it is also written into info.json.
+    """
+
+    def __init__(self, in_info: bool = False, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.in_info = in_info
+        self.max_entries = max_entries
+        self.dropped = 0
+        self._entries: dict[tuple, Diagnostic] = {}
+
+    def add(self, level: str, message: str, context: tuple = (), count: int = 1) -> None:
+        """Add the diagnostic, or increase the count of the same one added before."""
+        key = (level, message, context)
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.count += count
+        elif len(self._entries) < self.max_entries:
+            self._entries[key] = Diagnostic(level, message, dict(context), count)
+        else:
+            self.dropped += count
+
+    def extend(self, entries: Iterable[dict]) -> None:
+        """Add diagnostics returned by `to_list` of another collector, e.g. one used in a worker process."""
+        for entry in entries:
+            self.add(entry["level"], entry["message"], tuple(entry["context"].items()), entry["count"])
+
+    @property
+    def entries(self) -> list[Diagnostic]:
+        """Collected diagnostics, in order of their first occurrence."""
+        return list(self._entries.values())
+
+    @property
+    def warnings(self) -> list[Diagnostic]:
+        """Collected warnings."""
+        return [entry for entry in self._entries.values() if entry.level == WARNING]
+
+    @property
+    def errors(self) -> list[Diagnostic]:
+        """Collected errors."""
+        return [entry for entry in self._entries.values() if entry.level == ERROR]
+
+    def to_list(self, **context) -> list[dict]:
+        """Return JSON serializable diagnostics, only the ones with matching context if any is given."""
+        return [
+            asdict(entry)
+            for entry in self._entries.values()
+            if all(entry.context.get(key) == value for key, value in context.items())
+        ]
+
+    def activate(self, **context) -> ContextManager["Diagnostics"]:
+        """Collect diagnostics reported inside the `with` block, adding the context to each of them."""
+        return _Activation(self, tuple(context.items()))
+
+    def iter_collecting(self, items: Iterator[T], **context) -> Iterator[T]:
+        """Collect diagnostics reported while the items are produced, e.g. by a generator rendering files."""
+        activation = self.activate(**context)
+        while True:
+            with activation:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+            yield item
+
+
+def current() -> Optional[Diagnostics]:
+    """Return the active collector, None if diagnostics are printed."""
+    return _COLLECTOR.get()
+
+
+def context(**fields) -> ContextManager:
+    """Describe where the diagnostics reported inside the `with` block come from, e.g. `context(figure=name)`."""
+    if _COLLECTOR.get() is None:
+        return _NO_CONTEXT
+    return _Context(tuple(fields.items()))
+
+
+def warn(message: str, **fields) -> None:
+    """Report a warning, printed with the WARN prefix if no collector is active."""
+    collector = _COLLECTOR.get()
+    if collector is None:
+        print(f"WARN: {message}")
+        return
+    collector.add(WARNING, message, _CONTEXT.get() + tuple(fields.items()))
+
+
+def error(message: str, **fields) -> None:
+    """Report an error (usually just before raising an exception), printed if no collector is active."""
+    collector = _COLLECTOR.get()
+    if collector is None:
+        print(message)
+        return
+    collector.add(ERROR, message, _CONTEXT.get() + tuple(fields.items()))
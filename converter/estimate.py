@@ -0,0 +1,249 @@
+"""
+Cheap estimate of how demanding the conversion of a project is, made straight from the project JSON
+(without parsing figures, the world zone is expanded only as long as it stays within its limit).
+`admit` uses it to reject projects exceeding the `Limits`, or to downgrade their scoring meshes,
+before any time is spent on the conversion.
+"""
+
+import copy
+import math
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, Optional
+
+from converter.diagnostics import error, warn
+from converter.shieldhit.world_zone import DEFAULT_MAX_WORLD_ZONE_SETS, iter_world_zone_expansion
+
+REJECT = "reject"
+DOWNGRADE = "downgrade"
+
+# world zone sets are counted up to that, so the bound of absurdly complex geometries stays a sane number
+MAX_COUNTED_WORLD_ZONE_SETS = 10**15
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """Linear model of the output size and conversion time of a backend."""
+
+    base_bytes: float
+    figure_bytes: float
+    zone_bytes: float
+    detector_bytes: float
+    base_seconds: float
+    object_seconds: float
+    # SHIELD-HIT12A world zone: bytes of a single figure set and time per (sets * subtracted sets) of expansion
+    world_zone_set_bytes: float = 0
+    world_zone_seconds: float = 0
+
+
+# fitted to conversions of generated projects (see `converter.benchmark`) of 10 to 150 objects,
+# they are meant to tell a project of seconds from a project of hours, not to be precise
+COST_MODELS = {
+    "shieldhit": CostModel(1570, 240, 30, 180, 5e-4, 2e-5, world_zone_set_bytes=40, world_zone_seconds=4e-7),
+    "topas": CostModel(2140, 0, 0, 0, 1e-4, 0),
+    "fluka": CostModel(1600, 210, 35, 380, 5e-4, 4e-5),
+    "geant4": CostModel(900, 380, 0, 375, 5e-4, 8e-5),
+}
+# used for parsers registered by other packages
+DEFAULT_COST_MODEL = CostModel(1600, 380, 35, 380, 5e-4, 8e-5)
+
+
+class ProjectTooComplexError(ValueError):
+    """Raised when the estimate of the project exceeds the limits."""
+
+
+@dataclass
+class Estimate:
+    """Size of the project and expected output size (in bytes) and conversion time (in seconds) of each backend."""
+
+    figures: int
+    zones: int
+    detectors: int
+    # largest number of figure sets kept while expanding the SHIELD-HIT12A world zone (see `world_zone_sets`)
+    world_zone_sets: int
+    scoring_bins: int
+    output_bytes: dict[str, int] = field(default_factory=dict)
+    seconds: dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        """Return JSON serializable estimate."""
+        return asdict(self)
+
+
+@dataclass
+class Limits:
+    """
+    Limits of the estimate accepted by `admit`, None means no limit. Projects exceeding them are rejected,
+    or with the DOWNGRADE action, their scoring meshes get fewer bins to fit in `max_scoring_bins`
+    (projects exceeding other limits are still rejected).
+    """
+
+    max_world_zone_sets: Optional[int] = None
+    max_scoring_bins: Optional[int] = None
+    max_output_bytes: Optional[int] = None
+    max_seconds: Optional[float] = None
+    action: str = REJECT
+
+    def __post_init__(self) -> None:
+        if self.action not in (REJECT, DOWNGRADE):
+            raise ValueError(f'Limits action must be either "{REJECT}" or "{DOWNGRADE}".')
+
+    def violations(self, estimate: Estimate, backend: str) -> list[str]:
+        """Return descriptions of the limits exceeded by the estimate for the backend."""
+        checks = [("scoring bins", estimate.scoring_bins, self.max_scoring_bins)]
+        if backend == "shieldhit":
+            checks.append(("world zone figure sets", estimate.world_zone_sets, self.max_world_zone_sets))
+        checks.append(("bytes of output", estimate.output_bytes.get(backend), self.max_output_bytes))
+        checks.append(("seconds of conversion", estimate.seconds.get(backend), self.max_seconds))
+        return [
+            f"{name}: {value:.6g} estimated, {limit} allowed"
+            for name, value, limit in checks
+            if limit is not None and value is not None and value > limit
+        ]
+
+
+def world_zone_sets(zones: list[dict], max_sets: int = DEFAULT_MAX_WORLD_ZONE_SETS) -> int:
+    """
+    Largest number of figure sets kept while expanding the world zone of SHIELD-HIT12A, which is what
+    its limit is checked against (see `calculate_world_zone_operations`). The zones are expanded the same way
+    as by the parser, which is quick as long as there are at most `max_sets` sets. Once there are more,
+    the expansion stops and an upper bound is returned: every subtracted set multiplies the number of sets
+    by the number of its figures which may be negated (figures of single-figure zones are always subtracted,
+    so they are not counted).
+    """
+    figure_ids: dict[str, int] = {}
+    figure_sets = []
+    for zone in zones:
+        for operations in zone.get("unionOperations", []):
+            for operation in operations:
+                figure_id = figure_ids.setdefault(operation["objectUuid"], len(figure_ids) + 1)
+                if operation["mode"] == "union":
+                    figure_sets.append({figure_id})
+                elif figure_sets:
+                    figure_sets[-1].add(-figure_id if operation["mode"] == "subtraction" else figure_id)
+
+    sets = 1
+    for world_zone in iter_world_zone_expansion(figure_sets, len(figure_ids) + 1):
+        sets = max(sets, len(world_zone))
+        if sets > max_sets:
+            break
+    else:
+        return sets
+
+    always_subtracted = {next(iter(figure_set)) for figure_set in figure_sets if len(figure_set) == 1}
+    sets = 1
+    for figure_set in figure_sets:
+        # a subtracted figure gets negated back, which is skipped if the figure is always subtracted
+        negated = sum(1 for figure in figure_set if -figure not in always_subtracted)
+        sets = min(sets * max(negated, 1), MAX_COUNTED_WORLD_ZONE_SETS)
+    return max(sets, max_sets + 1)
+
+
+def detector_bins(detector: dict) -> int:
+    """Number of bins of the detector, zone and global detectors have a single one."""
+    geometry = detector.get("geometryData", {})
+    parameters = geometry.get("parameters", {})
+    geometry_type = geometry.get("geometryType")
+    if geometry_type == "Mesh":
+        return parameters["xSegments"] * parameters["ySegments"] * parameters["zSegments"]
+    if geometry_type == "Cyl":
+        return parameters["radialSegments"] * parameters["zSegments"]
+    return 1
+
+
+def scoring_bins(project: dict) -> int:
+    """Total number of bins scored by all outputs, every quantity scores all bins of its detector."""
+    bins_by_uuid = {
+        detector["uuid"]: detector_bins(detector) for detector in project["detectorManager"].get("detectors", [])
+    }
+    return sum(
+        bins_by_uuid.get(output.get("detectorUuid"), 0) * len(output.get("quantities", []))
+        for output in project.get("scoringManager", {}).get("outputs", [])
+    )
+
+
+def estimate_project(
+    project: dict,
+    backends: Iterable[str] = tuple(COST_MODELS),
+    max_world_zone_sets: int = DEFAULT_MAX_WORLD_ZONE_SETS,
+) -> Estimate:
+    """
+    Estimate the conversion of the project with each of the backends, without parsing it.
+    World zone sets are counted exactly up to `max_world_zone_sets` (see `world_zone_sets`).
+    """
+    zones = project["zoneManager"].get("zones", [])
+    estimate = Estimate(
+        figures=len(project["figureManager"].get("figures", [])),
+        zones=len(zones),
+        detectors=len(project["detectorManager"].get("detectors", [])),
+        world_zone_sets=world_zone_sets(zones, max_world_zone_sets) if "worldZone" in project["zoneManager"] else 0,
+        scoring_bins=scoring_bins(project),
+    )
+    subtracted_sets = sum(len(zone.get("unionOperations", [])) for zone in zones)
+    for backend in backends:
+        model = COST_MODELS.get(backend, DEFAULT_COST_MODEL)
+        estimate.output_bytes[backend] = round(
+            model.base_bytes
+            + model.figure_bytes * estimate.figures
+            + model.zone_bytes * estimate.zones
+            + model.detector_bytes * estimate.detectors
+            + model.world_zone_set_bytes * estimate.world_zone_sets
+        )
+        estimate.seconds[backend] = round(
+            model.base_seconds
+            + model.object_seconds * (estimate.figures + estimate.zones + estimate.detectors)
+            + model.world_zone_seconds * estimate.world_zone_sets * subtracted_sets,
+            6,
+        )
+    return estimate
+
+
+def downgrade_scoring(project: dict, max_bins: int) -> dict:
+    """
+    Return copy of the project with segments of mesh and cylinder detectors reduced proportionally
+    in every dimension, so the scoring bins fit in `max_bins` (if single bins of every detector do).
+    """
+    factor = max_bins / scoring_bins(project)
+    project = copy.deepcopy(project)
+    for detector in project["detectorManager"].get("detectors", []):
+        parameters = detector.get("geometryData", {}).get("parameters", {})
+        geometry_type = detector.get("geometryData", {}).get("geometryType")
+        if geometry_type == "Mesh":
+            keys = ("xSegments", "ySegments", "zSegments")
+        elif geometry_type == "Cyl":
+            keys = ("radialSegments", "zSegments")
+        else:
+            continue
+        # each dimension is scaled by the same root of the factor, rounding down keeps the total under the limit
+        scale = factor ** (1 / len(keys))
+        for key in keys:
+            parameters[key] = max(1, math.floor(parameters[key] * scale))
+    return project
+
+
+def admit(project: dict, backend: str, limits: Limits) -> dict:
+    """
+    Check the estimate of converting the project with the backend against the limits. Returns the project,
+    or its copy with fewer scoring bins if downgraded. Raises ProjectTooComplexError if it exceeds the limits.
+    """
+    max_world_zone_sets = limits.max_world_zone_sets
+    estimate = estimate_project(
+        project, [backend], max_world_zone_sets if max_world_zone_sets is not None else DEFAULT_MAX_WORLD_ZONE_SETS
+    )
+    if (
+        limits.action == DOWNGRADE
+        and limits.max_scoring_bins is not None
+        and estimate.scoring_bins > limits.max_scoring_bins
+    ):
+        project = downgrade_scoring(project, limits.max_scoring_bins)
+        downgraded_bins = scoring_bins(project)
+        warn(
+            f"Scoring bins reduced from {estimate.scoring_bins} to {downgraded_bins} "
+            f"to fit the limit of {limits.max_scoring_bins}."
+        )
+        estimate.scoring_bins = downgraded_bins
+
+    violations = limits.violations(estimate, backend)
+    if violations:
+        error(f"Project is too complex to convert for {backend} ({'; '.join(violations)}).")
+        raise ProjectTooComplexError(f"Project exceeds the limits of the conversion: {'; '.join(violations)}.")
+    return project
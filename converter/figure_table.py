@@ -0,0 +1,161 @@
+"""
+Figures stored column by column instead of as SolidFigure objects. Projects with tens of thousands of
+figures (e.g. voxel phantoms) take less memory this way and backends can render them in bulk, sharing
+the work between figures of the same shape (see `FigureTable.shape`).
+"""
+
+from array import array
+from typing import Iterable
+
+from converter.diagnostics import error
+from converter.solid_figures import BoxFigure, CylinderFigure, SolidFigure, SphereFigure
+
+# values of the `kinds` column
+BOX = 0
+CYLINDER = 1
+SPHERE = 2
+
+_KIND_BY_GEOMETRY_TYPE = {
+    "CyliderGeometry": CYLINDER,
+    "HollowCylinderGeometry": CYLINDER,
+    "BoxGeometry": BOX,
+    "SphereGeometry": SPHERE,
+}
+
+
+class FigureTable:
+    """
+    Figures in the same order as in the project, each one is a row of the columns:
+
+    - `kinds`: BOX, CYLINDER or SPHERE,
+    - `uuids` and `names`,
+    - `x`, `y`, `z`: position of the center,
+    - `rotation_ids`: index of the rotation in `rotations`, figures share a few distinct rotations,
+    - `size1`, `size2`, `size3`: X, Y and Z edge length of a box; top radius, bottom radius and height
+      of a cylinder; radius of a sphere (other sizes of a sphere are 0).
+
+    Numbers are stored as doubles, rotations keep the values from the project (they are printed as given).
+    """
+
+    def __init__(self) -> None:
+        self.kinds = array("B")
+        self.uuids: list[str] = []
+        self.names: list[str] = []
+        self.x = array("d")
+        self.y = array("d")
+        self.z = array("d")
+        self.rotation_ids = array("L")
+        self.rotations: list[tuple] = []
+        self.size1 = array("d")
+        self.size2 = array("d")
+        self.size3 = array("d")
+        self._rotation_ids: dict[tuple, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def append(
+        self,
+        kind: int,
+        uuid: str,
+        name: str,
+        position: Iterable[float],
+        rotation: Iterable[float],
+        sizes: tuple[float, float, float],
+    ) -> None:
+        """Add the figure as the last row."""
+        rotation = tuple(rotation)
+        rotation_id = self._rotation_ids.get(rotation)
+        if rotation_id is None:
+            rotation_id = self._rotation_ids[rotation] = len(self.rotations)
+            self.rotations.append(rotation)
+        x, y, z = position
+        self.kinds.append(kind)
+        self.uuids.append(uuid)
+        self.names.append(name)
+        self.x.append(x)
+        self.y.append(y)
+        self.z.append(z)
+        self.rotation_ids.append(rotation_id)
+        self.size1.append(sizes[0])
+        self.size2.append(sizes[1])
+        self.size3.append(sizes[2])
+
+    @classmethod
+    def from_json(cls, figures_json: Iterable[dict]) -> "FigureTable":
+        """Build the table from `figureManager.figures` of the project, like `solid_figures.parse_figure` does."""
+        table = cls()
+        for figure_dict in figures_json:
+            geometry = figure_dict["geometryData"]
+            kind = _KIND_BY_GEOMETRY_TYPE.get(geometry.get("geometryType"))
+            parameters = geometry["parameters"] if kind is not None else {}
+            if kind == CYLINDER:
+                sizes = (parameters["radius"], parameters["radius"], parameters["depth"])
+            elif kind == BOX:
+                sizes = (parameters["width"], parameters["height"], parameters["depth"])
+            elif kind == SPHERE:
+                sizes = (parameters["radius"], 0.0, 0.0)
+            else:
+                error(
+                    f'Invalid geometry of type "{geometry.get("geometryType")}" in figure "{figure_dict.get("name")}".'
+                )
+                raise ValueError(
+                    "Geometry type must be either 'HollowCylinderGeometry', 'CylinderGeometry', 'BoxGeometry', "
+                    "or 'SphereGeometry'"
+                )
+            table.append(
+                kind, figure_dict["uuid"], figure_dict["name"], geometry["position"], geometry["rotation"], sizes
+            )
+        return table
+
+    @classmethod
+    def from_figures(cls, figures: Iterable[SolidFigure]) -> "FigureTable":
+        """Build the table from already parsed figures."""
+        table = cls()
+        for figure in figures:
+            if type(figure) is BoxFigure:
+                kind, sizes = BOX, (figure.x_edge_length, figure.y_edge_length, figure.z_edge_length)
+            elif type(figure) is CylinderFigure:
+                kind, sizes = CYLINDER, (figure.radius_top, figure.radius_bottom, figure.height)
+            elif type(figure) is SphereFigure:
+                kind, sizes = SPHERE, (figure.radius, 0.0, 0.0)
+            else:
+                raise ValueError(f"Unexpected solid figure type: {figure}")
+            table.append(kind, figure.uuid, figure.name, figure.position, figure.rotation, sizes)
+        return table
+
+    def figure(self, index: int) -> SolidFigure:
+        """Return the row as a SolidFigure."""
+        common = {
+            "uuid": self.uuids[index],
+            "name": self.names[index],
+            "position": (self.x[index], self.y[index], self.z[index]),
+            "rotation": self.rotations[self.rotation_ids[index]],
+        }
+        kind = self.kinds[index]
+        if kind == BOX:
+            return BoxFigure(
+                **common,
+                x_edge_length=self.size1[index],
+                y_edge_length=self.size2[index],
+                z_edge_length=self.size3[index],
+            )
+        if kind == CYLINDER:
+            return CylinderFigure(
+                **common, radius_top=self.size1[index], radius_bottom=self.size2[index], height=self.size3[index]
+            )
+        return SphereFigure(**common, radius=self.size1[index])
+
+    def to_figures(self) -> list[SolidFigure]:
+        """Return all rows as SolidFigures."""
+        return [self.figure(index) for index in range(len(self))]
+
+    def shape(self, index: int) -> tuple[int, int, float, float, float]:
+        """Return what the figure shares with figures of the same shape (differing only by position and name)."""
+        return (
+            self.kinds[index],
+            self.rotation_ids[index],
+            self.size1[index],
+            self.size2[index],
+            self.size3[index],
+        )
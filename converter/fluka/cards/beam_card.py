@@ -1,4 +1,5 @@
 from dataclasses import dataclass, field
+from converter import diagnostics
 from converter.common import format_float
 from converter.fluka.cards.card import Card
 from converter.fluka.helper_parsers.beam_parser import BeamShape, FlukaBeam
@@ -27,9 +28,10 @@ class BeamCard:
         # we store energy in FlukaBeam object as positive number,
         # so we need to multiply it by -1
         # we also divide it by 1000 to convert from MeV to GeV
-        momentum_or_energy = format_float(-self.data.energy_MeV / 1000, 10)
-        shape_x = format_float(self.data.shape_x * x_y_multiplier, 10)
-        shape_y = format_float(self.data.shape_y * x_y_multiplier, 10)
+        with diagnostics.context(card="BEAM"):
+            momentum_or_energy = format_float(-self.data.energy_MeV / 1000, 10)
+            shape_x = format_float(self.data.shape_x * x_y_multiplier, 10)
+            shape_y = format_float(self.data.shape_y * x_y_multiplier, 10)
         if self.data.shape == BeamShape.CIRCULAR:
             # swap x and y if beam is circular
             # as circular beam is defined maximum and minimum radius in that order
@@ -50,11 +52,12 @@ class BeamCard:
         else:
             z_sdum = ""
 
-        pos_x = format_float(self.data.beam_pos[0], 10)
-        pos_y = format_float(self.data.beam_pos[1], 10)
-        pos_z = format_float(self.data.beam_pos[2], 10)
-        dir_x = format_float(self.data.beam_dir[0], 10)
-        dir_y = format_float(self.data.beam_dir[1], 10)
+        with diagnostics.context(card="BEAMPOS"):
+            pos_x = format_float(self.data.beam_pos[0], 10)
+            pos_y = format_float(self.data.beam_pos[1], 10)
+            pos_z = format_float(self.data.beam_pos[2], 10)
+            dir_x = format_float(self.data.beam_dir[0], 10)
+            dir_y = format_float(self.data.beam_dir[1], 10)
         beamposition_card.what = [pos_x, pos_y, pos_z, dir_x, dir_y, 0]
         beamposition_card.sdum = z_sdum
 
@@ -1,9 +1,149 @@
 from dataclasses import dataclass, field
-from converter.common import format_float
+from typing import Iterator
+
+from converter import deadline, diagnostics
+from converter.common import format_float, rotate
+from converter.figure_table import BOX, CYLINDER, FigureTable
 
 from converter.fluka.helper_parsers.figure_parser import FlukaBox, FlukaCylinder, FlukaFigure, FlukaSphere
 
 
+def box_entry(
+    name: str,
+    x_min: float,
+    x_max: float,
+    y_min: float,
+    y_max: float,
+    z_min: float,
+    z_max: float,
+    figure_type: str = "RPP",
+) -> str:
+    """Return the RPP body of the box."""
+    x_min, x_max, y_min, y_max, z_min, z_max, x_length, y_length, z_length = [
+        format_float(number, 16)
+        for number in (
+            x_min,
+            x_max,
+            y_min,
+            y_max,
+            z_min,
+            z_max,
+            x_max - x_min,
+            y_max - y_min,
+            z_max - z_min,
+        )
+    ]
+    return (
+        f"* box {name}\n"
+        f"* X range {x_min:+#}, {x_max:+#}\n"
+        f"* Y range {y_min:+#}, {y_max:+#}\n"
+        f"* Z range {z_min:+#}, {z_max:+#}\n"
+        f"* X, Y, Z side lengths:"
+        f" {x_length:+#}, {y_length:+#}, {z_length:+#}\n"
+        f"{figure_type} {name}"
+        f" {x_min:+#}"
+        f" {x_max:+#}"
+        f" {y_min:+#}"
+        f" {y_max:+#}"
+        f" {z_min:+#}"
+        f" {z_max:+#}"
+    )
+
+
+def cylinder_entry(
+    name: str,
+    coordinates: tuple,
+    height_vector: tuple,
+    radius: float,
+    height: float,
+    rotation: tuple,
+    figure_type: str = "RCC",
+) -> str:
+    """Return the RCC body of the cylinder with the bottom base center at the coordinates."""
+    x, y, z, vector_x, vector_y, vector_z, top_x, top_y, top_z, radius, height = [
+        format_float(number, 16)
+        for number in (
+            *coordinates,
+            *height_vector,
+            coordinates[0] + height_vector[0],
+            coordinates[1] + height_vector[1],
+            coordinates[2] + height_vector[2],
+            radius,
+            height,
+        )
+    ]
+    return (
+        f"* cylinder {name}\n"
+        f"* bottom center ({x:+#}, {y:+#}, {z:+#}),"
+        f" top center ({top_x:+#}, {top_y:+#}, {top_z:+#})\n"
+        f"* spanning vector ({vector_x:+#}, {vector_y:+#}, {vector_z:+#})\n"
+        f"* radius {radius:+#}, height {height:+#} cm\n"
+        f"* rotation angles: {rotation[0]}*, "
+        f"{rotation[1]}*, {rotation[2]}*\n"
+        f"{figure_type} {name}"
+        f" {x:+#}"
+        f" {y:+#}"
+        f" {z:+#}"
+        f" {vector_x:+#}"
+        f" {vector_y:+#}\n"
+        f"{vector_z:+#}"
+        f" {radius:+#}"
+    )
+
+
+def sphere_entry(name: str, coordinates: tuple, radius: float, figure_type: str = "SPH") -> str:
+    """Return the SPH body of the sphere."""
+    x, y, z, radius = [format_float(number, 16) for number in (*coordinates, radius)]
+    return (
+        f"* sphere {name}\n"
+        f"* center ({x:+#}, {y:+#}, {z:+#}),"
+        f" radius {radius:+#}\n"
+        f"{figure_type} {name}"
+        f" {x:+#}"
+        f" {y:+#}"
+        f" {z:+#}"
+        f" {radius:+#}"
+    )
+
+
+def iter_table_entries(table: FigureTable, first_index: int = 0) -> Iterator[str]:
+    """
+    Return bodies of all figures of the table, the same as converting them to FlukaFigures named
+    `fig{index}` (see `convert_figures`) and rendering them by FiguresCard, but without the objects.
+    """
+    for index, name in enumerate(table.names):
+        deadline.check()
+        fluka_name = f"fig{first_index + index}"
+        kind = table.kinds[index]
+        rotation = table.rotations[table.rotation_ids[index]]
+        with diagnostics.context(card="FIGURES", figure=fluka_name):
+            if kind == BOX:
+                if rotation[0] != 0 or rotation[1] != 0 or rotation[2] != 0:
+                    raise ValueError("Rotation of box is not supported for Fluka")
+                x, y, z = table.x[index], table.y[index], table.z[index]
+                x_edge_length, y_edge_length, z_edge_length = table.size1[index], table.size2[index], table.size3[index]
+                yield box_entry(
+                    fluka_name,
+                    x - x_edge_length / 2,
+                    x + x_edge_length / 2,
+                    y - y_edge_length / 2,
+                    y + y_edge_length / 2,
+                    z - z_edge_length / 2,
+                    z + z_edge_length / 2,
+                )
+            elif kind == CYLINDER:
+                height = table.size3[index]
+                height_vector = rotate((0, 0, height), rotation)
+                coordinates = (
+                    table.x[index] - height_vector[0] / 2,
+                    table.y[index] - height_vector[1] / 2,
+                    table.z[index] - height_vector[2] / 2,
+                )
+                yield cylinder_entry(fluka_name, coordinates, height_vector, table.size1[index], height, rotation)
+            else:
+                yield sphere_entry(fluka_name, (table.x[index], table.y[index], table.z[index]), table.size1[index])
+
+
 @dataclass
 class FiguresCard:
     """Class representing description of figures in Fluka input"""
@@ -14,81 +154,37 @@ class FiguresCard:
         """Return the card as a string."""
         result = ""
         for index, figure in enumerate(self.data):
+            deadline.check()
             if index == 0:
                 line = ""
             else:
                 line = "\n"
-            if type(figure) is FlukaBox:
-                x_min = format_float(figure.x_min, n=16)
-                x_max = format_float(figure.x_max, n=16)
-                y_min = format_float(figure.y_min, n=16)
-                y_max = format_float(figure.y_max, n=16)
-                z_min = format_float(figure.z_min, n=16)
-                z_max = format_float(figure.z_max, n=16)
-                x_length = format_float(figure.x_max - figure.x_min, n=16)
-                y_length = format_float(figure.y_max - figure.y_min, n=16)
-                z_length = format_float(figure.z_max - figure.z_min, n=16)
-                line += (
-                    f"* box {figure.name}\n"
-                    f"* X range {x_min:+#}, {x_max:+#}\n"
-                    f"* Y range {y_min:+#}, {y_max:+#}\n"
-                    f"* Z range {z_min:+#}, {z_max:+#}\n"
-                    f"* X, Y, Z side lengths:"
-                    f" {x_length:+#}, {y_length:+#}, {z_length:+#}\n"
-                    f"{figure.figure_type} {figure.name}"
-                    f" {x_min:+#}"
-                    f" {x_max:+#}"
-                    f" {y_min:+#}"
-                    f" {y_max:+#}"
-                    f" {z_min:+#}"
-                    f" {z_max:+#}"
-                )
-            elif type(figure) is FlukaCylinder:
-                x = format_float(figure.coordinates[0], n=16)
-                y = format_float(figure.coordinates[1], n=16)
-                z = format_float(figure.coordinates[2], n=16)
-                vector_x = format_float(figure.height_vector[0], n=16)
-                vector_y = format_float(figure.height_vector[1], n=16)
-                vector_z = format_float(figure.height_vector[2], n=16)
-                top_x = format_float(figure.coordinates[0] + figure.height_vector[0], n=16)
-                top_y = format_float(figure.coordinates[1] + figure.height_vector[1], n=16)
-                top_z = format_float(figure.coordinates[2] + figure.height_vector[2], n=16)
-                radius = format_float(figure.radius, n=16)
-                height = format_float(figure.height, n=16)
-                line += (
-                    f"* cylinder {figure.name}\n"
-                    f"* bottom center ({x:+#}, {y:+#}, {z:+#}),"
-                    f" top center ({top_x:+#}, {top_y:+#}, {top_z:+#})\n"
-                    f"* spanning vector ({vector_x:+#}, {vector_y:+#}, {vector_z:+#})\n"
-                    f"* radius {radius:+#}, height {height:+#} cm\n"
-                    f"* rotation angles: {figure.rotation[0]}*, "
-                    f"{figure.rotation[1]}*, {figure.rotation[2]}*\n"
-                    f"{figure.figure_type} {figure.name}"
-                    f" {x:+#}"
-                    f" {y:+#}"
-                    f" {z:+#}"
-                    f" {vector_x:+#}"
-                    f" {vector_y:+#}\n"
-                    f"{vector_z:+#}"
-                    f" {radius:+#}"
-                )
-            elif type(figure) is FlukaSphere:
-                x = format_float(figure.coordinates[0], n=16)
-                y = format_float(figure.coordinates[1], n=16)
-                z = format_float(figure.coordinates[2], n=16)
-                radius = format_float(figure.radius, n=16)
-                line += (
-                    f"* sphere {figure.name}\n"
-                    f"* center ({x:+#}, {y:+#}, {z:+#}),"
-                    f" radius {radius:+#}\n"
-                    f"{figure.figure_type} {figure.name}"
-                    f" {x:+#}"
-                    f" {y:+#}"
-                    f" {z:+#}"
-                    f" {radius:+#}"
-                )
-            else:
-                raise ValueError(f"Unexpected figure type: {figure}")
+            with diagnostics.context(card="FIGURES", figure=figure.name):
+                if type(figure) is FlukaBox:
+                    line += box_entry(
+                        figure.name,
+                        figure.x_min,
+                        figure.x_max,
+                        figure.y_min,
+                        figure.y_max,
+                        figure.z_min,
+                        figure.z_max,
+                        figure.figure_type,
+                    )
+                elif type(figure) is FlukaCylinder:
+                    line += cylinder_entry(
+                        figure.name,
+                        figure.coordinates,
+                        figure.height_vector,
+                        figure.radius,
+                        figure.height,
+                        figure.rotation,
+                        figure.figure_type,
+                    )
+                elif type(figure) is FlukaSphere:
+                    line += sphere_entry(figure.name, figure.coordinates, figure.radius, figure.figure_type)
+                else:
+                    raise ValueError(f"Unexpected figure type: {figure}")
 
             result += line
 
@@ -1,4 +1,6 @@
 from dataclasses import dataclass, field
+
+from converter import deadline
 from converter.fluka.helper_parsers.region_parser import BoolOperation, FlukaRegion
 
 
@@ -12,6 +14,7 @@ class RegionsCard:
         """Return the card as a string."""
         result = ""
         for index, region in enumerate(self.data):
+            deadline.check()
             if index == 0:
                 line = ""
             else:
@@ -1,7 +1,8 @@
 from math import cos, atan, pi
 from dataclasses import dataclass
 from enum import Enum
-from converter.common import convert_beam_energy
+from typing import Optional
+from converter.common import ParsedProject, convert_beam_energy
 
 
 class BeamShape(Enum):
@@ -66,11 +67,12 @@ PARTICLE_DICT = {
 }
 
 
-def convert_energy(beam_json: dict) -> float:
+def convert_energy(beam_json: dict, project: Optional[ParsedProject] = None) -> float:
     """
     Extract energy from beam JSON and provide it in Fluka convention.
     HEAVYION is a special case which requires that energy to be in MeV/u
     (MeV/nucl is taken as an approximation).
+    If `project` is provided, conversion already done for it is reused.
     For more details see:
     https://flukafiles.web.cern.ch/manual/chapters/description_input/description_options/beam.html#beam.
     """
@@ -79,7 +81,8 @@ def convert_energy(beam_json: dict) -> float:
     input_energy = beam_json["energy"]
     a = beam_json["particle"].get("a", 1)
 
-    energy, _, _ = convert_beam_energy(PARTICLE_DICT, particle_id, a, input_energy, input_energy_unit)
+    convert = project.convert_beam_energy if project is not None else convert_beam_energy
+    energy, _, _ = convert(PARTICLE_DICT, particle_id, a, input_energy, input_energy_unit)
 
     return energy
 
@@ -120,10 +123,10 @@ def cartesian_to_spherical(coords: tuple[float, float, float]):
     return cos(theta), cos(phi)
 
 
-def parse_beam(beam_json: dict) -> FlukaBeam:
+def parse_beam(beam_json: dict, project: Optional[ParsedProject] = None) -> FlukaBeam:
     """Parse beam from JSON to FLUKA beam."""
     fluka_beam = FlukaBeam()
-    fluka_beam.energy_MeV = convert_energy(beam_json)
+    fluka_beam.energy_MeV = convert_energy(beam_json, project)
     fluka_beam.particle_name = parse_particle_name(beam_json["particle"])
     if fluka_beam.particle_name == "HEAVYION":
         fluka_beam.heavy_ion_a = beam_json["particle"]["a"]
@@ -2,9 +2,10 @@ from dataclasses import dataclass, field
 from converter import solid_figures
 from converter.solid_figures import BoxFigure, CylinderFigure, SolidFigure, SphereFigure
 from converter.common import rotate
+from converter.compat import DATACLASS_SLOTS
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, **DATACLASS_SLOTS)
 class FlukaFigure:
     """Abstract class representing Fluka figure"""
 
@@ -13,7 +14,7 @@ class FlukaFigure:
     uuid: str = ""
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, **DATACLASS_SLOTS)
 class FlukaBox(FlukaFigure):
     """Class representing Fluka box"""
 
@@ -26,7 +27,7 @@ class FlukaBox(FlukaFigure):
     z_max: float = 0
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, **DATACLASS_SLOTS)
 class FlukaCylinder(FlukaFigure):
     """Class representing Fluka cylinder"""
 
@@ -38,7 +39,7 @@ class FlukaCylinder(FlukaFigure):
     height: float = 0
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, **DATACLASS_SLOTS)
 class FlukaSphere(FlukaFigure):
     """Class representing Fluka sphere"""
 
@@ -112,8 +113,11 @@ def parse_fluka_figure(figure: SolidFigure) -> FlukaFigure:
 
 def parse_figures(figures_json) -> list[FlukaFigure]:
     """Parse figures data from JSON to figures data used by Fluka"""
-    raw_figures = [solid_figures.parse_figure(figure_dict) for figure_dict in figures_json]
+    return convert_figures([solid_figures.parse_figure(figure_dict) for figure_dict in figures_json])
 
+
+def convert_figures(raw_figures: list[SolidFigure]) -> list[FlukaFigure]:
+    """Convert already parsed figures to figures data used by Fluka"""
     fluka_figures = []
     figure_name = "fig{}"
 
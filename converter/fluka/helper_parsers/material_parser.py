@@ -6,6 +6,7 @@ from converter.fluka.predefined_materials import (
 )
 from converter.fluka.helper_parsers.region_parser import FlukaRegion
 from copy import deepcopy
+from functools import lru_cache
 
 BLACK_HOLE_ICRU = 0
 VACUUM_ICRU = 1000
@@ -68,6 +69,7 @@ class IonisationPotential:
     ionisation_potential: float = 0
 
 
+@lru_cache(maxsize=None)
 def load_predefined_materials() -> (
     dict[str, FlukaMaterial],
     dict[str, FlukaCompound],
@@ -76,6 +78,7 @@ def load_predefined_materials() -> (
     """
     Convert list of dicts of predefined materials and compounds to lists of
     FlukaMaterial and FlukaCompound objects. Also create a dict of icru -> fluka_name.
+    Tables are built once and shared by all conversions, so they must not be modified.
     """
     predefined_materials = {material["icru"]: FlukaMaterial(**material) for material in PREDEFINED_MATERIALS}
     predefined_compounds = {compound["icru"]: FlukaCompound(**compound) for compound in PREDEFINED_COMPOUNDS}
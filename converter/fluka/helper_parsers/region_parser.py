@@ -1,8 +1,11 @@
 import copy
 from dataclasses import dataclass, field
 from enum import Enum
+from typing import Optional
 
-from converter import solid_figures
+from converter import deadline, solid_figures
+from converter.compat import DATACLASS_SLOTS
+from converter.solid_figures import SolidFigure
 from converter.fluka.helper_parsers.figure_parser import (
     FlukaFigure,
     get_figure_name_by_uuid,
@@ -17,7 +20,7 @@ class BoolOperation(Enum):
     SUBTRACTION = 2
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, **DATACLASS_SLOTS)
 class FlukaRegion:
     """Dataclass mapping for Fluka regions."""
 
@@ -25,10 +28,13 @@ class FlukaRegion:
     figures_operators: list[list[tuple[BoolOperation, str]]] = field(default_factory=lambda: [])
 
 
-def parse_regions(zones_json: dict, figures: list[FlukaFigure]) -> (list[FlukaRegion], list[FlukaFigure]):
+def parse_regions(
+    zones_json: dict, figures: list[FlukaFigure], world_figure: Optional[SolidFigure] = None
+) -> (list[FlukaRegion], list[FlukaFigure]):
     """
     Parse zones from JSON to Fluka regions.
     Returns list of regions and list of additional figures generated by parsing world zone.
+    Already parsed `world_figure` can be provided, otherwise it is parsed from the world zone JSON.
     """
     # Naming is different in Fluka - Fluka zones consist of figures joined by subtractions and intersections
     # Fluka regions consist of zones joined by unions
@@ -41,22 +47,26 @@ def parse_regions(zones_json: dict, figures: list[FlukaFigure]) -> (list[FlukaRe
             figures_operators=parse_csg_operations(zone["unionOperations"], figures),
         )
     if "worldZone" in zones_json:
-        world_region, boundary_region, world_figure, world_boundary = parse_world_zone(zones_json, figures)
+        world_region, boundary_region, world_figure, world_boundary = parse_world_zone(
+            zones_json, figures, world_figure
+        )
         regions[zones_json["worldZone"]["uuid"]] = world_region
         regions[zones_json["worldZone"]["uuid"] + "boundary"] = boundary_region
 
     return regions, [world_figure, world_boundary]
 
 
-def parse_world_zone(zones_json: dict, figures: list[FlukaFigure]) -> (FlukaRegion, FlukaFigure, FlukaFigure):
+def parse_world_zone(
+    zones_json: dict, figures: list[FlukaFigure], world_figure: Optional[SolidFigure] = None
+) -> (FlukaRegion, FlukaFigure, FlukaFigure):
     """
     Parse the world zone.
     Returns tuple consisting of world region, boundary region and the two figures of which they consist.
     """
     # Parse the world figure, then create boundary figure by expanding it
     # The boundary will have the black hole material
-    world_zone_json = zones_json["worldZone"]
-    world_figure = solid_figures.parse_figure(world_zone_json)
+    if world_figure is None:
+        world_figure = solid_figures.parse_figure(zones_json["worldZone"])
     world_boundary = copy.deepcopy(world_figure)
     world_boundary.expand(10)
 
@@ -102,6 +112,7 @@ def parse_csg_operations(operations: list[list[dict]], figures: list[FlukaFigure
     for zone in zones_json:
         operations_list = []
         for operation in zone:
+            deadline.check()
             figure_name = get_figure_name_by_uuid(figures, operation["objectUuid"])
             if figure_name is None:
                 raise ValueError(f"Cant find figure of uuid {operation['objectUuid']}")
@@ -1,4 +1,6 @@
 from dataclasses import dataclass, field
+from typing import Iterator
+from converter.common import iter_template
 from converter.fluka.cards.beam_card import BeamCard
 from converter.fluka.cards.card import Card
 from converter.fluka.cards.figure_card import FiguresCard
@@ -56,17 +58,24 @@ RANDOMIZ                   137
 STOP
 """
 
+    def iter_chunks(self) -> Iterator[str]:
+        """Return fluka input file piece by piece, one card at a time"""
+        return iter_template(
+            self.template,
+            dict(
+                START=Card(codewd="START", what=[str(self.number_of_particles)]),
+                BEAM=BeamCard(data=self.beam),
+                FIGURES=FiguresCard(data=self.figures),
+                REGIONS=RegionsCard(data=self.regions),
+                SCORINGS=ScoringsCard(data=self.scorings),
+                MATERIALS=MaterialsCard(data=self.materials),
+                LOWMATS=LowMatsCard(data=self.lowmats),
+                COMPOUNDS=CompoundsCard(data=self.compounds),
+                ASSIGNMATS=AssignmatsCard(data=self.assignmats),
+                MATPROPS=MatPropsCard(data=self.matprops),
+            ),
+        )
+
     def __str__(self):
         """Return fluka input file as string"""
-        return self.template.format(
-            START=Card(codewd="START", what=[str(self.number_of_particles)]),
-            BEAM=BeamCard(data=self.beam),
-            FIGURES=FiguresCard(data=self.figures),
-            REGIONS=RegionsCard(data=self.regions),
-            SCORINGS=ScoringsCard(data=self.scorings),
-            MATERIALS=MaterialsCard(data=self.materials),
-            LOWMATS=LowMatsCard(data=self.lowmats),
-            COMPOUNDS=CompoundsCard(data=self.compounds),
-            ASSIGNMATS=AssignmatsCard(data=self.assignmats),
-            MATPROPS=MatPropsCard(data=self.matprops),
-        )
+        return "".join(self.iter_chunks())
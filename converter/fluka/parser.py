@@ -1,6 +1,8 @@
-from converter.common import Parser
+from typing import Iterator
+
+from converter.common import Parser, iter_file_chunks
 from converter.fluka.helper_parsers.beam_parser import parse_beam
-from converter.fluka.helper_parsers.figure_parser import parse_figures
+from converter.fluka.helper_parsers.figure_parser import convert_figures
 from converter.fluka.helper_parsers.region_parser import parse_regions
 from converter.fluka.helper_parsers.scoring_parser import parse_scorings
 from converter.fluka.helper_parsers.material_parser import (
@@ -23,33 +25,36 @@ class FlukaParser(Parser):
         self.info["version"] = "unknown"
         self.input = Input()
 
-    def parse_configs(self, json: dict) -> None:
+    def _parse_configs(self, json: dict) -> None:
         """Parse energy and number of particles from json."""
         self.input.number_of_particles = json["beam"]["numberOfParticles"]
-        self.input.figures = parse_figures(json["figureManager"].get("figures"))
-        regions, world_figures = parse_regions(json["zoneManager"], self.input.figures)
-        self.input.scorings = parse_scorings(json["detectorManager"], json["scoringManager"])
+        with self._stage("figures"):
+            self.input.figures = convert_figures(self.project.figures)
+        with self._stage("regions"):
+            world_figure = self.project.world_figure if "worldZone" in json["zoneManager"] else None
+            regions, world_figures = parse_regions(json["zoneManager"], self.input.figures, world_figure)
+        with self._stage("scorings"):
+            self.input.scorings = parse_scorings(json["detectorManager"], json["scoringManager"])
         self.input.regions = list(regions.values())
         self.input.figures.extend(world_figures)
-        materials, compounds, self.input.lowmats = parse_materials(
-            json["materialManager"]["materials"], json["zoneManager"]
-        )
-        self.input.materials = [
-            material for material in materials.values() if material.fluka_name.startswith(("MAT", "COM"))
-        ]
-        self.input.compounds = [compound for compound in compounds.values() if compound.fluka_name.startswith("COM")]
-        self.input.assignmats = assign_materials_to_regions(materials, regions, json["zoneManager"])
-        self.input.matprops = set_custom_ionisation_potential(
-            materials, json["zoneManager"], json["materialManager"]["materials"]
-        )
-        self.input.beam = parse_beam(json["beam"])
-
-    def get_configs_json(self) -> dict:
-        """
-        Return a dict representation of the config files. Each element has
-        the config files name as key and its content as value.
-        """
-        configs_json = super().get_configs_json()
-        configs_json["fl_sim.inp"] = str(self.input)
+        with self._stage("materials"):
+            materials, compounds, self.input.lowmats = parse_materials(
+                json["materialManager"]["materials"], json["zoneManager"]
+            )
+            self.input.materials = [
+                material for material in materials.values() if material.fluka_name.startswith(("MAT", "COM"))
+            ]
+            self.input.compounds = [
+                compound for compound in compounds.values() if compound.fluka_name.startswith("COM")
+            ]
+            self.input.assignmats = assign_materials_to_regions(materials, regions, json["zoneManager"])
+            self.input.matprops = set_custom_ionisation_potential(
+                materials, json["zoneManager"], json["materialManager"]["materials"]
+            )
+        with self._stage("beam"):
+            self.input.beam = parse_beam(json["beam"], self.project)
 
-        return configs_json
+    def _iter_configs(self) -> Iterator[tuple[str, str]]:
+        """Return the config files piece by piece, the input file is rendered one card at a time."""
+        yield from super()._iter_configs()
+        yield from iter_file_chunks("fl_sim.inp", self.input.iter_chunks())
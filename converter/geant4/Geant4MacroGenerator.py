@@ -1,6 +1,6 @@
 import converter.geant4.utils as utils
-from typing import Dict, Any, List
-from converter.common import convert_beam_energy
+from typing import Dict, Any, List, Optional
+from converter.common import ParsedProject, convert_beam_energy
 
 # skipcq: PYL-W0511
 # TODO geantino names needs better mapping or handling
@@ -34,9 +34,10 @@ GEANT4_QUANTITY_MAP = {
 class Geant4MacroGenerator:
     """Generate Geant4 mac (beam + scoring + run)."""
 
-    def __init__(self, data: Dict[str, Any]) -> None:
-        """Initialize with JSON data."""
+    def __init__(self, data: Dict[str, Any], project: Optional[ParsedProject] = None) -> None:
+        """Initialize with JSON data. If `project` is provided, beam energy conversion done for it is reused."""
         self.data = data
+        self.project = project
         self.lines: List[str] = []
         self.probe_histograms: List[Dict[str, Any]] = []
         self.probe_counter = 0
@@ -62,9 +63,8 @@ class Geant4MacroGenerator:
         z = particle.get("z", a)
         input_energy = beam["energy"]
         input_energy_unit = beam.get("energyUnit", "MeV")
-        energy, _, energy_scale_factor = convert_beam_energy(
-            GEANT4_PARTICLE_MAP, particle_id, a, input_energy, input_energy_unit
-        )
+        convert = self.project.convert_beam_energy if self.project is not None else convert_beam_energy
+        energy, _, energy_scale_factor = convert(GEANT4_PARTICLE_MAP, particle_id, a, input_energy, input_energy_unit)
         sigma = beam.get("energySpread", 0) * energy_scale_factor
         energy_high = beam.get("energyHighCutoff", 1000) * energy_scale_factor
         energy_min = beam.get("energyLowCutoff", 0) * energy_scale_factor
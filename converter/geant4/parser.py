@@ -18,25 +18,27 @@ class Geant4Parser(Parser):
         self._gdml_content: str = ""
         self._macro_content: str = ""
 
-    def parse_configs(self, json_data: dict) -> None:
+    def _parse_configs(self, json_data: dict) -> None:
         """Parse the provided JSON configuration and generate GDML content."""
-        if "figureManager" in json_data and json_data["figureManager"]["figures"]:
-            # we assume that first figure in json is always World (the root of our tree)
-            world_figure_json = json_data["figureManager"]["figures"][0]
-            self._gdml_content = self._generate_gdml(world_figure_json)
-        else:
-            self._gdml_content = self._generate_empty_gdml()
+        with self._stage("gdml"):
+            if "figureManager" in json_data and json_data["figureManager"]["figures"]:
+                # we assume that first figure in json is always World (the root of our tree)
+                world_figure_json = json_data["figureManager"]["figures"][0]
+                self._gdml_content = self._generate_gdml(world_figure_json)
+            else:
+                self._gdml_content = self._generate_empty_gdml()
 
-        self._initialize_macro(json_data)
+        with self._stage("macro"):
+            self._initialize_macro(json_data)
 
     def _initialize_macro(self, json_data: dict) -> None:
         """Initialize macro content from JSON data."""
-        macro_gen = Geant4MacroGenerator(json_data)
+        macro_gen = Geant4MacroGenerator(json_data, self.project)
         self._macro_content = macro_gen.generate()
 
-    def get_configs_json(self) -> dict:
+    def _render_configs(self) -> dict:
         """Return dictionary from gdml content"""
-        configs_json = super().get_configs_json()
+        configs_json = super()._render_configs()
         configs_json.update(
             {
                 "geometry.gdml": self._gdml_content,
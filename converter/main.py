@@ -1,9 +1,20 @@
 from pathlib import Path
+from typing import Optional
 import sys
 import json
 import argparse
+import contextlib
 import os
+import signal
+import threading
 from converter import api
+from converter.archive import ARCHIVE_FORMATS, archive_format_from_path
+from converter.cache import ConversionCache
+from converter.deadline import ConversionTimeout
+from converter.diagnostics import WARNING, Diagnostics
+from converter.estimate import DOWNGRADE, REJECT, Limits, ProjectTooComplexError
+from converter.metrics import Metrics
+from converter.profiling import MemoryProfiler, StageTimer
 
 
 def dir_path(path: str):
@@ -13,38 +24,515 @@ def dir_path(path: str):
     raise NotADirectoryError(path)
 
 
-def convert(output_format: str, json_file: Path, output_dir: Path, silent: bool):
+def load_json(json_file: Path) -> dict:
+    """Load the project file."""
+    if not json_file.exists():
+        print(f"File {json_file} does not exist.")
+        raise FileNotFoundError(json_file)
+    with open(json_file, "r") as file:
+        return json.load(file)
+
+
+def add_cache_arguments(arg_parser: argparse.ArgumentParser) -> None:
+    """Add options of the conversion cache."""
+    arg_parser.add_argument("--cache", type=Path, default=None, metavar="DIR", help="reuse files converted before")
+    arg_parser.add_argument("--cache-max-size", type=int, default=None, metavar="BYTES", help="maximal cache size")
+    arg_parser.add_argument("--cache-max-age", type=float, default=None, metavar="SECONDS", help="cache entries expiry")
+
+
+def create_cache(parsed_args: argparse.Namespace) -> Optional[ConversionCache]:
+    """Create the conversion cache if requested by the options added by `add_cache_arguments`."""
+    if parsed_args.cache is None:
+        return None
+    return ConversionCache(parsed_args.cache, max_bytes=parsed_args.cache_max_size, max_age=parsed_args.cache_max_age)
+
+
+def add_pool_arguments(arg_parser: argparse.ArgumentParser) -> None:
+    """Add options recycling worker processes (see `converter.pool`)."""
+    arg_parser.add_argument(
+        "--max-jobs-per-worker", type=int, default=None, metavar="N", help="replace workers after N conversions"
+    )
+    arg_parser.add_argument(
+        "--max-worker-rss", type=float, default=None, metavar="MB", help="replace workers taking more memory"
+    )
+
+
+def add_limit_arguments(arg_parser: argparse.ArgumentParser) -> None:
+    """Add limits of the estimated complexity of the project (see `converter.estimate`)."""
+    arg_parser.add_argument(
+        "--max-world-zone-sets",
+        type=int,
+        default=None,
+        metavar="N",
+        help="SHIELD-HIT12A only, sets are counted by expanding the world zone until it exceeds the limit, "
+        "the conversion itself is also stopped at this limit",
+    )
+    arg_parser.add_argument("--max-scoring-bins", type=int, default=None, metavar="N", help="bins of all outputs")
+    arg_parser.add_argument("--max-output-bytes", type=int, default=None, metavar="BYTES", help="size of all files")
+    arg_parser.add_argument("--max-seconds", type=float, default=None, metavar="SECONDS", help="conversion time")
+    arg_parser.add_argument(
+        "--on-limit",
+        choices=(REJECT, DOWNGRADE),
+        default=REJECT,
+        help=f"'{DOWNGRADE}' reduces bins of meshes exceeding --max-scoring-bins instead of failing",
+    )
+
+
+def create_limits(parsed_args: argparse.Namespace) -> Optional[Limits]:
+    """Create the limits if any of them is set by the options added by `add_limit_arguments`."""
+    values = {
+        "max_world_zone_sets": parsed_args.max_world_zone_sets,
+        "max_scoring_bins": parsed_args.max_scoring_bins,
+        "max_output_bytes": parsed_args.max_output_bytes,
+        "max_seconds": parsed_args.max_seconds,
+    }
+    if all(value is None for value in values.values()):
+        return None
+    return Limits(**values, action=parsed_args.on_limit)
+
+
+def print_diagnostics(diagnostics: Diagnostics) -> None:
+    """Print the collected diagnostics once each, with their context and number of repeats."""
+    for entry in diagnostics.entries:
+        prefix = "WARN: " if entry.level == WARNING else ""
+        context = ", ".join(f"{key}={value}" for key, value in entry.context.items())
+        repeats = f" (x{entry.count})" if entry.count > 1 else ""
+        print(f"{prefix}{entry.message}{f' [{context}]' if context else ''}{repeats}")
+    if diagnostics.dropped:
+        print(f"WARN: {diagnostics.dropped} more diagnostics were not kept")
+
+
+def convert(
+    output_format: str,
+    json_file: Path,
+    output_dir: Path,
+    silent: bool,
+    cache: Optional[ConversionCache] = None,
+    profiler: Optional[StageTimer] = None,
+    diagnostics: Optional[Diagnostics] = None,
+    limits: Optional[Limits] = None,
+    timeout: Optional[float] = None,
+    metrics: Optional[Metrics] = None,
+):
     """Run conversion and save output to output dir."""
     json_parser = api.get_parser_from_str(output_format)
+    json_parser.profiler = profiler
+    json_parser.diagnostics = diagnostics
+    json_parser.metrics = metrics
     try:
-        input_data = {}
-        if not json_file.exists():
-            print(f"File {json_file} does not exist.")
-            raise FileNotFoundError(json_file)
-        with open(json_file, "r") as file:
-            input_data = json.load(file)
-        api.run_parser(json_parser, input_data, output_dir, silent=silent)
+        input_data = load_json(json_file)
+        if silent:
+            # files don't have to be printed, so they are written without keeping them in memory
+            api.save_parser_output(json_parser, input_data, output_dir, cache=cache, limits=limits, timeout=timeout)
+        else:
+            api.run_parser(
+                json_parser, input_data, output_dir, silent=silent, cache=cache, limits=limits, timeout=timeout
+            )
     except NotADirectoryError as e:
         print(f"Invalid output directory: {e}")
         sys.exit(1)
 
 
+def convert_to_archive(
+    output_format: str,
+    json_file: Path,
+    archive: Path,
+    archive_format: Optional[str],
+    cache: Optional[ConversionCache] = None,
+    profiler: Optional[StageTimer] = None,
+    diagnostics: Optional[Diagnostics] = None,
+    limits: Optional[Limits] = None,
+    timeout: Optional[float] = None,
+    metrics: Optional[Metrics] = None,
+):
+    """Run conversion and pack output into the archive, '-' means the standard output."""
+    json_parser = api.get_parser_from_str(output_format)
+    json_parser.profiler = profiler
+    json_parser.diagnostics = diagnostics
+    json_parser.metrics = metrics
+    archive_format = archive_format or archive_format_from_path(archive) or "tar.gz"
+    input_data = load_json(json_file)
+    if str(archive) == "-":
+        stdout = sys.stdout.buffer
+        # messages go to stderr, so they don't get mixed with the archive
+        with contextlib.redirect_stdout(sys.stderr):
+            api.save_parser_archive(json_parser, input_data, stdout, archive_format, cache, limits, timeout)
+        stdout.flush()
+    else:
+        api.save_parser_archive(json_parser, input_data, archive, archive_format, cache, limits, timeout)
+
+
+def convert_targets(
+    targets: list[str],
+    json_file: Path,
+    output_dir: Path,
+    silent: bool,
+    cache: Optional[ConversionCache] = None,
+    profiler: Optional[StageTimer] = None,
+    diagnostics: Optional[Diagnostics] = None,
+    limits: Optional[Limits] = None,
+    timeout: Optional[float] = None,
+    metrics: Optional[Metrics] = None,
+):
+    """Run conversion for many simulators and save output of each one to its subdirectory of output dir."""
+    try:
+        input_data = load_json(json_file)
+        api.run_parsers(
+            targets,
+            input_data,
+            output_dir,
+            silent=silent,
+            cache=cache,
+            profiler=profiler,
+            diagnostics=diagnostics,
+            limits=limits,
+            timeout=timeout,
+            metrics=metrics,
+        )
+    except NotADirectoryError as e:
+        print(f"Invalid output directory: {e}")
+        sys.exit(1)
+
+
+def main_batch(args: list[str]) -> int:
+    """Convert many project files in parallel, as the `batch` subcommand."""
+    from converter import batch  # skipcq: PYL-C0415
+
+    arg_parser = argparse.ArgumentParser(
+        prog="yaptide-converter batch",
+        description="Convert many json files in parallel, each into its own subdirectory of output_dir.",
+    )
+    arg_parser.add_argument("output_dir", type=Path)
+    arg_parser.add_argument("output_format", nargs="?", default="shieldhit", type=str)
+    input_group = arg_parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument(
+        "-i", "--input", dest="source", metavar="SOURCE", help="directory with json files or a glob pattern"
+    )
+    input_group.add_argument("-m", "--manifest", type=Path, help="file with list of json files, one per line")
+    arg_parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes")
+    arg_parser.add_argument("--timeout", type=float, default=None, metavar="SECONDS", help="timeout of each file")
+    add_pool_arguments(arg_parser)
+    arg_parser.add_argument(
+        "-r", "--report", type=Path, default=None, help=f"summary report path (output_dir/{batch.REPORT_FILE_NAME})"
+    )
+    parsed_args = arg_parser.parse_args(args)
+
+    input_files = batch.collect_input_files(parsed_args.source, parsed_args.manifest)
+    if not input_files:
+        print(f"No input files found in {parsed_args.source or parsed_args.manifest}")
+        return 1
+    jobs = batch.plan_jobs(input_files, parsed_args.output_dir)
+    results = batch.run_batch(
+        jobs,
+        parsed_args.output_format,
+        workers=parsed_args.workers,
+        timeout=parsed_args.timeout,
+        max_jobs_per_worker=parsed_args.max_jobs_per_worker,
+        max_worker_rss_mb=parsed_args.max_worker_rss,
+    )
+    report_path = parsed_args.report or parsed_args.output_dir / batch.REPORT_FILE_NAME
+    report = batch.write_report(results, report_path)
+
+    print(f"Converted {report['succeeded']} of {report['total']} files, report saved to {report_path}")
+    for result in results:
+        if not result.succeeded:
+            print(f"Failed to convert {result.input_file}: {result.error}")
+
+    return 1 if report["failed"] else 0
+
+
+def main_serve(args: list[str]) -> int:
+    """Run the conversion server until it is interrupted, as the `serve` subcommand."""
+    from converter import server  # skipcq: PYL-C0415
+
+    arg_parser = argparse.ArgumentParser(
+        prog="yaptide-converter serve",
+        description="Keep the converter loaded and convert projects sent over localhost HTTP or a unix socket.",
+    )
+    arg_parser.add_argument("--host", default=server.DEFAULT_HOST)
+    arg_parser.add_argument("--port", type=int, default=server.DEFAULT_PORT)
+    arg_parser.add_argument("--socket", type=Path, default=None, help="listen on the unix socket instead of TCP")
+    arg_parser.add_argument("-j", "--max-concurrent", type=int, default=4, help="maximal number of conversions")
+    arg_parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    arg_parser.add_argument("--timeout", type=float, default=None, metavar="SECONDS", help="timeout of a conversion")
+    arg_parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="convert in that many worker processes instead of threads"
+    )
+    add_pool_arguments(arg_parser)
+    add_cache_arguments(arg_parser)
+    parsed_args = arg_parser.parse_args(args)
+
+    pool = None
+    if parsed_args.workers is not None:
+        from converter.pool import WarmPool  # skipcq: PYL-C0415
+
+        # workers are started before the server, so their first conversions are not delayed
+        pool = WarmPool(
+            parsed_args.workers, max_jobs=parsed_args.max_jobs_per_worker, max_rss_mb=parsed_args.max_worker_rss
+        )
+
+    conversion_server = server.create_server(
+        host=parsed_args.host,
+        port=parsed_args.port,
+        socket_path=parsed_args.socket,
+        max_concurrent=parsed_args.max_concurrent,
+        verbose=parsed_args.verbose,
+        cache=create_cache(parsed_args),
+        conversion_timeout=parsed_args.timeout,
+        pool=pool,
+    )
+
+    def stop(signum, _frame):
+        """Stop accepting requests, `server_close` below waits for the ones in progress."""
+        print(f"Received signal {signum}, shutting down.")
+        # shutdown() waits for serve_forever() to return, so it can't be called from the serving thread
+        threading.Thread(target=conversion_server.shutdown).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"Listening on {parsed_args.socket or f'{parsed_args.host}:{conversion_server.server_address[1]}'}")
+    try:
+        conversion_server.serve_forever()
+    finally:
+        conversion_server.server_close()
+        if pool is not None:
+            pool.shutdown()
+    return 0
+
+
+def main_benchmark(args: list[str]) -> int:
+    """Measure conversion of synthetic projects of growing size, as the `benchmark` subcommand."""
+    from converter.benchmark import regression, runner  # skipcq: PYL-C0415
+
+    arg_parser = argparse.ArgumentParser(
+        prog="yaptide-converter benchmark",
+        description="Measure time and peak memory of converting generated projects with each simulator.",
+        epilog="With --check the benchmarks of the baseline are run again and the command fails "
+        "if any stage got slower by more than both thresholds. Times of the baseline are scaled "
+        "to the speed of this machine, measured with a calibration loop.",
+    )
+    arg_parser.add_argument(
+        "--sizes", nargs="+", type=int, default=runner.DEFAULT_SIZES, help="numbers of objects in the projects"
+    )
+    arg_parser.add_argument("--backends", nargs="+", default=runner.BACKENDS, metavar="FORMAT")
+    arg_parser.add_argument("--repeats", type=int, default=3, help="the shortest time of that many runs is taken")
+    arg_parser.add_argument("--seed", type=int, default=0, help="seed of the project generator")
+    arg_parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=None,
+        help="save results as a JSON baseline, in units of a calibration loop",
+    )
+    arg_parser.add_argument("--save-projects", type=Path, default=None, metavar="DIR", help="save generated projects")
+    arg_parser.add_argument("--check", type=Path, default=None, metavar="BASELINE", help="compare with the baseline")
+    arg_parser.add_argument(
+        "--threshold", type=float, default=regression.DEFAULT_THRESHOLD, help="relative slowdown of a stage"
+    )
+    arg_parser.add_argument(
+        "--min-delta", type=float, default=regression.DEFAULT_MIN_DELTA, metavar="SECONDS", help="ignored slowdown"
+    )
+    arg_parser.add_argument("--retries", type=int, default=1, help="runs repeated to rule out noise")
+    parsed_args = arg_parser.parse_args(args)
+
+    if parsed_args.check is not None:
+        diffs, report = regression.check_regressions(
+            runner.load_baseline(parsed_args.check),
+            parsed_args.threshold,
+            parsed_args.min_delta,
+            parsed_args.retries,
+        )
+        print(regression.format_diff_table(diffs, parsed_args.threshold, parsed_args.min_delta))
+        if parsed_args.output is not None:
+            runner.save_baseline(runner.normalize(report), parsed_args.output)
+        regressions = [diff for diff in diffs if diff.is_regression(parsed_args.threshold, parsed_args.min_delta)]
+        if regressions:
+            print(f"{len(regressions)} stages slower than in {parsed_args.check}")
+            return 1
+        print(f"No regressions compared to {parsed_args.check}")
+        return 0
+
+    if parsed_args.save_projects is not None:
+        parsed_args.save_projects.mkdir(parents=True, exist_ok=True)
+        for size in parsed_args.sizes:
+            runner.save_project(size, parsed_args.save_projects / f"synthetic_{size}.json", parsed_args.seed)
+
+    report = runner.run_benchmarks(
+        parsed_args.backends, parsed_args.sizes, parsed_args.repeats, parsed_args.seed, verbose=True
+    )
+    if parsed_args.output is not None:
+        runner.save_baseline(runner.normalize(report), parsed_args.output)
+        print(f"Results saved to {parsed_args.output}")
+    return 0
+
+
 def main(args=None):
     """Function for running parser as a script."""
     if args is None:
         args = sys.argv[1:]
-    arg_parser = argparse.ArgumentParser(description="Parse a json file and return MC simulator input files.")
+    if args and args[0] == "batch":
+        return main_batch(args[1:])
+    if args and args[0] == "serve":
+        return main_serve(args[1:])
+    if args and args[0] == "benchmark":
+        return main_benchmark(args[1:])
+    arg_parser = argparse.ArgumentParser(
+        description="Parse a json file and return MC simulator input files.",
+        epilog="Use 'batch' as the first argument to convert many files at once (see 'batch -h'), "
+        "'serve' to run the conversion server (see 'serve -h') or 'benchmark' to measure performance "
+        "(see 'benchmark -h').",
+    )
     arg_parser.add_argument("input_json_file", type=Path)
     arg_parser.add_argument("output_dir", nargs="?", default=Path.cwd(), type=Path)
     arg_parser.add_argument("output_format", nargs="?", default="shieldhit", type=str)
     arg_parser.add_argument("-s", "--silent", action="store_true")
+    arg_parser.add_argument(
+        "-t",
+        "--targets",
+        nargs="+",
+        metavar="FORMAT",
+        help="convert for many simulators at once, each to its own subdirectory of output_dir",
+    )
+    arg_parser.add_argument(
+        "-a",
+        "--archive",
+        type=Path,
+        metavar="PATH",
+        help="pack files into the archive instead of output_dir, '-' writes it to the standard output",
+    )
+    arg_parser.add_argument(
+        "--archive-format", choices=ARCHIVE_FORMATS, help="archive format (guessed from the extension by default)"
+    )
+    arg_parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="PATH",
+        help="save JSON report with time of each conversion stage, '-' prints it",
+    )
+    arg_parser.add_argument(
+        "--memory-profile",
+        type=Path,
+        metavar="PATH",
+        help="like --profile, adding peak memory and top allocating lines of each stage (much slower)",
+    )
+    arg_parser.add_argument("--cprofile", type=Path, metavar="PATH", help="save cProfile statistics of the conversion")
+    arg_parser.add_argument(
+        "--metrics",
+        type=Path,
+        metavar="PATH",
+        help="save metrics of the conversion in the Prometheus text format, '-' prints them",
+    )
+    arg_parser.add_argument(
+        "--diagnostics-in-info",
+        action="store_true",
+        help="write warnings of the conversion into info.json, they are printed once each at the end",
+    )
+    arg_parser.add_argument(
+        "--timeout", type=float, metavar="SECONDS", help="abort the conversion after that many seconds"
+    )
+    arg_parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="print JSON estimate of the output size and conversion time instead of converting",
+    )
+    add_cache_arguments(arg_parser)
+    add_limit_arguments(arg_parser)
     parsed_args = arg_parser.parse_args(args)
+    if parsed_args.archive and parsed_args.targets:
+        arg_parser.error("--archive can't be used with --targets")
+    if parsed_args.profile and parsed_args.memory_profile:
+        arg_parser.error("--profile can't be used with --memory-profile")
+    if parsed_args.estimate:
+        try:
+            input_data = load_json(parsed_args.input_json_file)
+        except FileNotFoundError:
+            sys.exit(1)
+        estimate = api.estimate(input_data, parsed_args.targets or [parsed_args.output_format])
+        print(json.dumps(estimate.to_dict(), indent=2))
+        return 0
+    limits = create_limits(parsed_args)
+    cache = create_cache(parsed_args)
+    profiler = StageTimer() if parsed_args.profile else None
+    if parsed_args.memory_profile:
+        profiler = MemoryProfiler()
+    diagnostics = Diagnostics(in_info=True) if parsed_args.diagnostics_in_info else None
+    metrics = None
+    if parsed_args.metrics:
+        metrics = Metrics()
+        if cache is not None:
+            metrics.add_stats("cache", cache.stats)
+    cprofile = None
+    if parsed_args.cprofile:
+        import cProfile  # skipcq: PYL-C0415
+
+        cprofile = cProfile.Profile()
+        cprofile.enable()
 
     try:
-        convert(parsed_args.output_format, parsed_args.input_json_file, parsed_args.output_dir, parsed_args.silent)
+        if parsed_args.archive:
+            convert_to_archive(
+                parsed_args.output_format,
+                parsed_args.input_json_file,
+                parsed_args.archive,
+                parsed_args.archive_format,
+                cache,
+                profiler,
+                diagnostics,
+                limits,
+                parsed_args.timeout,
+                metrics,
+            )
+        elif parsed_args.targets:
+            convert_targets(
+                parsed_args.targets,
+                parsed_args.input_json_file,
+                parsed_args.output_dir,
+                parsed_args.silent,
+                cache,
+                profiler,
+                diagnostics,
+                limits,
+                parsed_args.timeout,
+                metrics,
+            )
+        else:
+            convert(
+                parsed_args.output_format,
+                parsed_args.input_json_file,
+                parsed_args.output_dir,
+                parsed_args.silent,
+                cache,
+                profiler,
+                diagnostics,
+                limits,
+                parsed_args.timeout,
+                metrics,
+            )
     except FileNotFoundError as e:
         print(f"File {e} does not exist.")
         sys.exit(1)
+    except ProjectTooComplexError:
+        # the exceeded limits are already reported
+        sys.exit(1)
+    except ConversionTimeout:
+        print(f"Conversion aborted after {parsed_args.timeout} seconds.")
+        sys.exit(1)
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+            cprofile.dump_stats(parsed_args.cprofile)
+        # reports can't be printed to the standard output if the archive is written there
+        with contextlib.redirect_stdout(sys.stderr if str(parsed_args.archive) == "-" else sys.stdout):
+            if diagnostics is not None:
+                print_diagnostics(diagnostics)
+            if isinstance(profiler, MemoryProfiler):
+                profiler.stop()
+                profiler.save_report(parsed_args.memory_profile)
+            elif profiler is not None:
+                profiler.save_report(parsed_args.profile)
+            if metrics is not None:
+                metrics.save(parsed_args.metrics)
 
 
 if __name__ == "__main__":
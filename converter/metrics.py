@@ -0,0 +1,278 @@
+"""
+Metrics of the conversions done by the process: counters and histograms of conversion and stage time
+per backend, sizes of the rendered files, figure, zone and world zone set counts of the projects, and
+counters of the cache, coalescing and worker pool. `Metrics.render` dumps them in the Prometheus text
+format, served by `GET /metrics` of the conversion server and saved by the `--metrics` CLI option.
+Parsers record them only if a Metrics object is set as their `metrics` attribute.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import fields
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Union
+
+from converter.deadline import ConversionTimeout
+from converter.profiling import StageTimer
+
+# Content-Type of the text format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+COUNT_BUCKETS = (1, 10, 100, 1000, 10000, 100000)
+
+# parser whose conversion is recorded, so conversions calling others (e.g. `api.run_parser`) are recorded once
+_OBSERVED: ContextVar[Optional[Any]] = ContextVar("observed_parser", default=None)
+
+
+def _escape(value: str) -> str:
+    """Escape the label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    """Format labels as `{name="value",...}`, empty if there are none."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format the sample value, integers without the fraction."""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Metric with a separate value kept for each combination of the label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        """Label values in order of the label names."""
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> Iterator[str]:
+        """Lines with the values."""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Counter, which only goes up."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Increase the counter of the label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Current value for the label values."""
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        """Lines with the values."""
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Histogram with cumulative buckets (upper bounds `buckets`), sum and count of the observed values."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = SECONDS_BUCKETS) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # values of the label values are [observations in each bucket (not cumulative), above the last bucket, sum]
+
+    def observe(self, value: float, **labels) -> None:
+        """Add the value observed for the label values."""
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def count(self, **labels) -> int:
+        """Number of values observed for the label values."""
+        counts = self._values.get(self._key(labels))
+        return sum(counts[:-1]) if counts is not None else 0
+
+    def sum(self, **labels) -> float:
+        """Sum of values observed for the label values."""
+        counts = self._values.get(self._key(labels))
+        return counts[-1] if counts is not None else 0.0
+
+    def samples(self) -> Iterator[str]:
+        """Lines with the buckets, sum and count."""
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                labels = _format_labels((*self.labels, "le"), (*key, _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, key)
+            yield f"{self.name}_sum{labels} {_format_value(counts[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Metrics:
+    """
+    Registry of the conversion metrics, safe to use from many threads. Besides its own metrics it exports
+    counters of stats objects (e.g. `ConversionCache.stats`) and gauges read when the metrics are rendered.
+    """
+
+    def __init__(self) -> None:
+        self.conversions = Counter(
+            "converter_conversions_total", "Conversions by outcome (ok, error, timeout).", ("backend", "outcome")
+        )
+        self.conversion_seconds = Histogram(
+            "converter_conversion_seconds", "Wall time of conversions, including cached ones.", ("backend",)
+        )
+        self.stage_seconds = Histogram(
+            "converter_stage_seconds",
+            "Wall time of conversion stages, summed in each conversion.",
+            ("backend", "stage"),
+        )
+        self.rendered_bytes = Histogram(
+            "converter_rendered_bytes", "Size of rendered files.", ("backend", "file"), BYTES_BUCKETS
+        )
+        self.figures = Histogram(
+            "converter_project_figures", "Figures of converted projects.", ("backend",), COUNT_BUCKETS
+        )
+        self.zones = Histogram("converter_project_zones", "Zones of converted projects.", ("backend",), COUNT_BUCKETS)
+        self.world_zone_sets = Histogram(
+            "converter_world_zone_sets", "Figure sets the world zone is split into.", ("backend",), COUNT_BUCKETS
+        )
+        self._metrics = [
+            self.conversions,
+            self.conversion_seconds,
+            self.stage_seconds,
+            self.rendered_bytes,
+            self.figures,
+            self.zones,
+            self.world_zone_sets,
+        ]
+        self._stats: list[tuple[str, Any]] = []
+        self._gauges: list[tuple[str, str, Callable[[], float]]] = []
+
+    def add_stats(self, name: str, stats: Any) -> None:
+        """Export fields of the stats dataclass (e.g. `CacheStats`) as `converter_{name}_{field}_total` counters."""
+        self._stats.append((name, stats))
+
+    def add_gauge(self, name: str, documentation: str, function: Callable[[], float]) -> None:
+        """Export the value returned by the function when the metrics are rendered."""
+        self._gauges.append((name, documentation, function))
+
+    @contextmanager
+    def conversion(self, parser, project_json: dict) -> Iterator[None]:
+        """
+        Record the conversion done by the parser inside the `with` block: its outcome and time, time of its
+        stages (measured by the profiler of the parser, a temporary one is set if there is none) and size
+        of the project. Files are measured while they are rendered (see `count_bytes`).
+        """
+        if _OBSERVED.get() is parser:
+            yield
+            return
+
+        backend = parser.info["simulator"]
+        profiler = parser.profiler
+        timer = profiler if profiler is not None else StageTimer()
+        calls_before = {path: (stage["calls"], stage["seconds"]) for path, stage in timer.stages.items()}
+        parser.profiler = timer
+        token = _OBSERVED.set(parser)
+        outcome = "error"
+        start = time.perf_counter()
+        try:
+            yield
+            outcome = "ok"
+        except ConversionTimeout:
+            outcome = "timeout"
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            _OBSERVED.reset(token)
+            parser.profiler = profiler
+
+            self.conversions.inc(backend=backend, outcome=outcome)
+            self.conversion_seconds.observe(seconds, backend=backend)
+            for path, stage in list(timer.stages.items()):
+                calls, stage_seconds = calls_before.get(path, (0, 0.0))
+                if stage["calls"] > calls:
+                    self.stage_seconds.observe(stage["seconds"] - stage_seconds, backend=backend, stage=path)
+            self.observe_project(backend, project_json)
+            world_zone_sets = getattr(parser, "world_zone_sets", None)
+            if outcome == "ok" and world_zone_sets is not None:
+                self.world_zone_sets.observe(world_zone_sets, backend=backend)
+
+    def observe_project(self, backend: str, project_json: dict) -> None:
+        """Record the number of figures and zones of the project."""
+        if not isinstance(project_json, dict):
+            return
+        self.figures.observe(len(project_json.get("figureManager", {}).get("figures", [])), backend=backend)
+        self.zones.observe(len(project_json.get("zoneManager", {}).get("zones", [])), backend=backend)
+
+    def observe_files(self, backend: str, configs_json: dict) -> None:
+        """Record sizes of the files, e.g. converted in another process."""
+        for file_name, content in configs_json.items():
+            self.rendered_bytes.observe(len(content.encode("utf-8")), backend=backend, file=file_name)
+
+    def count_bytes(self, chunks: Iterator[tuple[str, str]], backend: str) -> Iterator[tuple[str, str]]:
+        """Record sizes of the files rendered as `(file name, chunk)` pairs, once all of them are rendered."""
+        sizes: dict[str, int] = {}
+        for file_name, chunk in chunks:
+            sizes[file_name] = sizes.get(file_name, 0) + len(chunk.encode("utf-8"))
+            yield file_name, chunk
+        for file_name, size in sizes.items():
+            self.rendered_bytes.observe(size, backend=backend, file=file_name)
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for name, stats in self._stats:
+            for field in fields(stats):
+                metric_name = f"converter_{name}_{field.name}_total"
+                lines.append(f"# HELP {metric_name} {type(stats).__name__}.{field.name}")
+                lines.append(f"# TYPE {metric_name} counter")
+                lines.append(f"{metric_name} {_format_value(getattr(stats, field.name))}")
+        for name, documentation, function in self._gauges:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(function())}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: Optional[Union[str, Path]] = None) -> None:
+        """Save the metrics in the text format, print them if the path is None or '-'."""
+        text = self.render()
+        if path is None or str(path) == "-":
+            print(text, end="")
+            return
+        with open(path, "w") as metrics_f:
+            metrics_f.write(text)
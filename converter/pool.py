@@ -0,0 +1,348 @@
+"""
+Pool of warm worker processes. On Linux workers are forked by the fork server, which imports all
+backends and builds their static tables once (see `FORKSERVER_PRELOAD`), so they start ready to convert
+and share those pages copy-on-write, instead of each of them starting a fresh interpreter and importing
+everything again.
+The fork server is single-threaded, so replacing workers while the pool (or a server using it) runs
+its threads is safe, unlike forking the parent.
+Workers are replaced after `max_jobs` conversions or once they use more than `max_rss_mb` of memory,
+so memory kept by a long-running worker (e.g. after converting a huge project) doesn't pile up.
+"""
+
+import importlib
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing.connection import Connection, wait
+from multiprocessing.reduction import ForkingPickler
+from typing import Callable, Optional
+
+from converter import api, deadline
+from converter.diagnostics import Diagnostics
+
+# modules imported by the fork server before it forks any worker, the last one warms up all backends
+FORKSERVER_PRELOAD = [__name__, "converter.preload"]
+
+
+def warm_up() -> None:
+    """
+    Import all built-in backends and build their static tables (particle maps are built on import),
+    so workers forked afterwards don't repeat it for their first conversion.
+    """
+    for parser_path in api.PARSERS.values():
+        importlib.import_module(parser_path.split(":")[0])
+    from converter.fluka.helper_parsers.material_parser import load_predefined_materials  # skipcq: PYL-C0415
+
+    load_predefined_materials()
+
+
+def rss_mb() -> float:
+    """Resident memory of the current process in MB (peak memory where /proc is missing, 0 if unknown)."""
+    try:
+        with open("/proc/self/statm", "r") as statm_f:
+            return int(statm_f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource  # skipcq: PYL-C0415
+    except ImportError:  # Windows
+        return 0.0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 2**10
+
+
+def convert_project(parser_type: str, input_data: dict, timeout: Optional[float] = None) -> tuple[dict, list[dict]]:
+    """
+    Convert the project in a worker, returning the files (same as `api.run_parser`) and the diagnostics
+    reported by the conversion (see `Diagnostics.to_list`).
+    """
+    collector = Diagnostics()
+    with collector.activate():
+        parser = api.get_parser_from_str(parser_type)
+    parser.diagnostics = collector
+    return api.run_parser(parser, input_data, timeout=timeout), collector.to_list()
+
+
+def _work(
+    connection: Connection,
+    max_jobs: Optional[int],
+    max_rss_mb: Optional[float],
+    cold: bool,
+    inherited: tuple = (),
+) -> None:
+    """
+    Main loop of a worker: run functions received from the pool and send back
+    `(result, exception, retire)` until the pool sends None or the worker has to be replaced.
+    """
+    # forked workers get copies of the connections of the pool, close them so others see when the pool is gone
+    for inherited_connection in inherited:
+        inherited_connection.close()
+    if cold:
+        warm_up()
+
+    jobs = 0
+    while True:
+        try:
+            task = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if task is None:
+            return
+
+        function, args, kwargs = task
+        try:
+            result, exception = function(*args, **kwargs), None
+        except BaseException as e:  # skipcq: PYL-W0703
+            result, exception = None, e
+        jobs += 1
+        retire = (max_jobs is not None and jobs >= max_jobs) or (max_rss_mb is not None and rss_mb() > max_rss_mb)
+        try:
+            connection.send((result, exception, retire))
+        except Exception as e:  # skipcq: PYL-W0703
+            # result or exception can't be pickled, nothing was sent yet
+            connection.send((None, RuntimeError(f"Result of {function.__name__} can't be sent: {e!r}"), retire))
+        if retire:
+            return
+
+
+@dataclass
+class PoolStats:
+    """Counters of a single WarmPool object."""
+
+    # workers started, including the replacements
+    started: int = 0
+    # finished jobs, including failed ones
+    completed: int = 0
+    # workers replaced after reaching `max_jobs` or `max_rss_mb`
+    recycled: int = 0
+    # workers which died, while running a job or waiting for one (e.g. killed because of memory limits)
+    crashed: int = 0
+
+
+class _Worker:
+    """Worker process and the pool side of its connection, `future` is set while it runs a job."""
+
+    def __init__(self, process: multiprocessing.process.BaseProcess, connection: Connection) -> None:
+        self.process = process
+        self.connection = connection
+        self.future: Optional[Future] = None
+
+
+class WarmPool(Executor):
+    """
+    Executor running functions in a fixed number of worker processes (number of CPUs by default).
+    Workers are started by the fork server on Linux, which is warmed up once (unless it was already started
+    by another pool with other preloaded modules), and spawned elsewhere (fork isn't safe on macOS),
+    where each of them finishes its warm up by itself. `start_method="fork"` forks the parent after `warm_up`
+    is done in it, which is only safe if no other threads of the parent hold locks when workers are
+    replaced, as replacements are forked from the thread managing the pool.
+
+    Each worker runs a single job at a time and is replaced by a new one after `max_jobs` jobs or when its
+    memory exceeds `max_rss_mb` after a job. If a worker dies, only the job it was running fails with
+    BrokenProcessPool and the pool keeps working, workers which die while idle are replaced as well.
+    Python 3.11 added `max_tasks_per_child` to ProcessPoolExecutor, this pool does the same (and more)
+    on all supported versions.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_jobs: Optional[int] = None,
+        max_rss_mb: Optional[float] = None,
+        start_method: Optional[str] = None,
+    ) -> None:
+        if workers is not None and workers < 1:
+            raise ValueError("Number of workers must be at least 1.")
+        if max_jobs is not None and max_jobs < 1:
+            raise ValueError("Number of jobs per worker must be at least 1.")
+        if start_method is None:
+            start_method = "forkserver" if sys.platform.startswith("linux") else "spawn"
+        self.workers = workers or os.cpu_count() or 1
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.stats = PoolStats()
+        self._context = multiprocessing.get_context(start_method)
+        self._forked = start_method == "fork"
+        # spawned workers start with a fresh interpreter and warm up by themselves
+        self._cold = start_method == "spawn"
+        if self._forked:
+            warm_up()
+        elif start_method == "forkserver":
+            # takes effect unless the fork server of this process is already running
+            self._context.set_forkserver_preload(FORKSERVER_PRELOAD)
+
+        self._lock = threading.Lock()
+        self._pending: deque = deque()
+        self._shutdown = False
+        self._wakeup_reader, self._wakeup_writer = multiprocessing.Pipe(duplex=False)
+        self._workers: list[_Worker] = []
+        # all workers are started before the manager thread, later ones only replace retired workers
+        for _ in range(self.workers):
+            self._workers.append(self._start_worker())
+        self._manager = threading.Thread(target=self._manage, name="WarmPoolManager", daemon=True)
+        self._manager.start()
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """Schedule the function (which has to be picklable, as well as its arguments and result)."""
+        future: Future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._pending.append((future, fn, args, kwargs))
+            self._wakeup_writer.send_bytes(b"")
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """Stop the workers once the scheduled jobs are done (cancelling the ones not started if requested)."""
+        with self._lock:
+            if not self._shutdown:
+                self._shutdown = True
+                self._wakeup_writer.send_bytes(b"")
+            if cancel_futures:
+                while self._pending:
+                    self._pending.popleft()[0].cancel()
+        if wait:
+            self._manager.join()
+
+    def convert(self, parser_type: str, input_data: dict, diagnostics: Optional[Diagnostics] = None) -> dict:
+        """
+        Convert the project in one of the workers and return its files, same as `api.run_parser`.
+        Diagnostics reported by the conversion are added to `diagnostics`. The conversion is aborted
+        at the current deadline (see `converter.deadline`), which is also how long this call waits for it.
+        """
+        future = self.submit(convert_project, parser_type, input_data, deadline.remaining())
+        try:
+            configs_json, entries = future.result(timeout=deadline.remaining())
+        except FutureTimeoutError as e:
+            # the worker stops at its next deadline check
+            future.cancel()
+            raise deadline.ConversionTimeout("Conversion took longer than its timeout.") from e
+        if diagnostics is not None:
+            diagnostics.extend(entries)
+        return configs_json
+
+    def _start_worker(self) -> _Worker:
+        """Start a worker process connected to the pool."""
+        connection, worker_connection = self._context.Pipe()
+        inherited = ()
+        if self._forked:
+            inherited = (connection, self._wakeup_reader, self._wakeup_writer) + tuple(
+                worker.connection for worker in self._workers
+            )
+        process = self._context.Process(
+            target=_work,
+            args=(worker_connection, self.max_jobs, self.max_rss_mb, self._cold, inherited),
+            name="WarmPoolWorker",
+            daemon=True,
+        )
+        process.start()
+        worker_connection.close()
+        self.stats.started += 1
+        return _Worker(process, connection)
+
+    def _replace(self, worker: _Worker) -> None:
+        """Replace the retired or dead worker by a new one."""
+        worker.process.join()
+        worker.connection.close()
+        self._workers.remove(worker)
+        self._workers.append(self._start_worker())
+
+    def _next_task(self) -> Optional[tuple]:
+        """Take the next scheduled job which was not cancelled, None if there is none."""
+        with self._lock:
+            while self._pending:
+                task = self._pending.popleft()
+                if task[0].set_running_or_notify_cancel():
+                    return task
+        return None
+
+    def _dispatch(self) -> None:
+        """Send scheduled jobs to idle workers."""
+        idle = [worker for worker in self._workers if worker.future is None]
+        while idle:
+            task = self._next_task()
+            if task is None:
+                return
+            future, function, args, kwargs = task
+            try:
+                message = ForkingPickler.dumps((function, args, kwargs))
+            except Exception as e:  # skipcq: PYL-W0703
+                # function or arguments can't be pickled
+                future.set_exception(e)
+                continue
+            worker = idle.pop()
+            while True:
+                try:
+                    worker.connection.send_bytes(message)
+                    break
+                except OSError:
+                    # worker died while waiting for a job, its replacement runs the job (already marked running)
+                    self.stats.crashed += 1
+                    self._replace(worker)
+                    worker = self._workers[-1]
+            worker.future = future
+
+    def _collect(self, worker: _Worker) -> None:
+        """Receive the result of the job run by the worker, replace the worker if it retired or died."""
+        future, worker.future = worker.future, None
+        try:
+            result, exception, retire = worker.connection.recv()
+        except (EOFError, OSError):
+            worker.process.join()
+            self.stats.crashed += 1
+            self._replace(worker)
+            future.set_exception(
+                BrokenProcessPool(f"Worker process died with exit code {worker.process.exitcode} while running a job.")
+            )
+            return
+        except Exception as e:  # skipcq: PYL-W0703
+            # result was sent but can't be unpickled
+            result, exception, retire = None, e, False
+
+        self.stats.completed += 1
+        if retire:
+            self.stats.recycled += 1
+            self._replace(worker)
+        if exception is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exception)
+
+    def _manage(self) -> None:
+        """
+        Pass jobs to the workers and their results to the futures until the pool is shut down.
+        Idle workers are watched as well, so the ones which die are replaced before they get a job.
+        """
+        while True:
+            self._dispatch()
+            busy = {worker.connection: worker for worker in self._workers if worker.future is not None}
+            idle = {worker.process.sentinel: worker for worker in self._workers if worker.future is None}
+            with self._lock:
+                if self._shutdown and not self._pending and not busy:
+                    break
+
+            for ready in wait([*busy, *idle, self._wakeup_reader]):
+                if ready is self._wakeup_reader:
+                    while self._wakeup_reader.poll():
+                        self._wakeup_reader.recv_bytes()
+                elif ready in busy:
+                    self._collect(busy[ready])
+                else:
+                    self.stats.crashed += 1
+                    self._replace(idle[ready])
+
+        for worker in self._workers:
+            try:
+                worker.connection.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            worker.process.join()
+            worker.connection.close()
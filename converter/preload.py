@@ -0,0 +1,13 @@
+"""
+Module preloaded by the fork server of `WarmPool` (see `pool.FORKSERVER_PRELOAD`). Importing it warms up
+all backends, so workers forked by the server start with the static tables built and share them copy-on-write.
+"""
+
+import os
+
+from converter.pool import warm_up
+
+warm_up()
+
+# process which built the tables, the fork server on Linux
+WARMED_UP_PID = os.getpid()
@@ -0,0 +1,196 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+
+class StageTimer:
+    """
+    Measures wall time of the conversion stages. Stages may be nested, nested stages are
+    reported under the path of their parents, e.g. "parse/geo_mat/world_zone".
+    Parsers use it only if it is set as their `profiler` attribute (see `Parser._stage`).
+    """
+
+    def __init__(self) -> None:
+        self.stages: dict[str, dict] = {}
+        self._path: list[str] = []
+
+    def _add(self, name: str, seconds: float) -> None:
+        """Add the time of a single stage run."""
+        path = "/".join([*self._path, name])
+        stage = self.stages.setdefault(path, {"calls": 0, "seconds": 0.0})
+        stage["calls"] += 1
+        stage["seconds"] += seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure time of the code inside the `with` block."""
+        self._path.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._path.pop()
+            self._add(name, seconds)
+
+    def time_chunks(self, chunks: Iterator[tuple[str, str]]) -> Iterator[tuple[str, str]]:
+        """
+        Measure rendering of `(file name, chunk)` pairs yielded by `Parser._iter_configs`, as stages
+        named after the files (number of calls is the number of chunks).
+        """
+        while True:
+            start = time.perf_counter()
+            try:
+                file_name, chunk = next(chunks)
+            except StopIteration:
+                return
+            self._add(file_name, time.perf_counter() - start)
+            yield file_name, chunk
+
+    def report(self) -> dict:
+        """Return timings of all stages, in order in which they have finished."""
+        return {
+            "stages": {
+                path: {"calls": stage["calls"], "seconds": round(stage["seconds"], 6)}
+                for path, stage in self.stages.items()
+            }
+        }
+
+    def save_report(self, path: Optional[Union[str, Path]] = None) -> None:
+        """Save the report as JSON, print it if the path is None or '-'."""
+        report = json.dumps(self.report(), indent=2)
+        if path is None or str(path) == "-":
+            print(report)
+            return
+        with open(path, "w") as report_f:
+            report_f.write(report)
+
+
+class MemoryProfiler(StageTimer):
+    """
+    Measures memory of the conversion stages besides their time, tracing allocations with tracemalloc
+    (started by the first stage, `stop` ends it), which makes the conversion a few times slower.
+    For each stage it reports the peak of memory allocated above the memory at its start (the highest of its calls)
+    and the `top` source lines holding most of the memory allocated by the stage when it ends.
+    Memory taken by the snapshots of tracemalloc is not counted in the peaks.
+    """
+
+    def __init__(self, top: int = 10) -> None:
+        super().__init__()
+        self.top = top
+        self.memory: dict[str, dict] = {}
+        # highest memory allocated since the tracing started
+        self.peak_bytes = 0
+        # [memory at the start, highest memory] of the stages in progress
+        self._frames: list[list[int]] = []
+        # memory held by the snapshots taken at the start of the stages in progress
+        self._overhead = 0
+        # memory allocated before the first stage
+        self._base: Optional[int] = None
+        self._started = False
+
+    def _start(self) -> None:
+        """Start tracing allocations, if they are not traced yet."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        if self._base is None:
+            self._base = tracemalloc.get_traced_memory()[0]
+
+    def _traced_memory(self) -> int:
+        """Pass the peak since the last call to the stages in progress and return current memory."""
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        peak -= self._overhead + self._base
+        for frame in self._frames:
+            frame[1] = max(frame[1], peak)
+        self.peak_bytes = max(self.peak_bytes, peak)
+        return current - self._overhead - self._base
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        """Snapshot of the memory allocated by the conversion."""
+        return tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        )
+
+    def _add_memory(self, path: str, peak: int, top_lines: Optional[list[dict]] = None) -> None:
+        """Keep the peak of the stage run if it is the highest one, with its top lines."""
+        memory = self.memory.setdefault(path, {"peak_bytes": 0})
+        if peak >= memory["peak_bytes"]:
+            memory["peak_bytes"] = peak
+            if top_lines is not None:
+                memory["top_lines"] = top_lines
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure time and memory of the code inside the `with` block."""
+        self._start()
+        path = "/".join([*self._path, name])
+
+        self._traced_memory()
+        before_snapshot = tracemalloc.get_traced_memory()[0]
+        start_snapshot = self._snapshot()
+        snapshot_bytes = tracemalloc.get_traced_memory()[0] - before_snapshot
+        tracemalloc.reset_peak()
+        self._overhead += snapshot_bytes
+        frame = [self._traced_memory()] * 2
+        self._frames.append(frame)
+        try:
+            with super().stage(name):
+                yield
+        finally:
+            self._traced_memory()
+            self._frames.pop()
+            statistics = self._snapshot().compare_to(start_snapshot, "lineno")
+            top_lines = [
+                {
+                    "file": statistic.traceback[0].filename,
+                    "line": statistic.traceback[0].lineno,
+                    "size_bytes": statistic.size_diff,
+                    "count": statistic.count_diff,
+                }
+                for statistic in statistics[: self.top]
+                if statistic.size_diff > 0
+            ]
+            del start_snapshot, statistics
+            self._overhead -= snapshot_bytes
+            tracemalloc.reset_peak()
+            self._add_memory(path, frame[1] - frame[0], top_lines)
+
+    def time_chunks(self, chunks: Iterator[tuple[str, str]]) -> Iterator[tuple[str, str]]:
+        """Measure time and peak memory of rendering each file, without snapshots as there are many chunks."""
+        for file_name, chunk in self._chunk_memory(super().time_chunks(chunks)):
+            yield file_name, chunk
+
+    def _chunk_memory(self, chunks: Iterator[tuple[str, str]]) -> Iterator[tuple[str, str]]:
+        """Record the peak memory of rendering each chunk under the file name."""
+        self._start()
+        while True:
+            frame = [self._traced_memory()] * 2
+            self._frames.append(frame)
+            try:
+                file_name, chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                self._traced_memory()
+                self._frames.pop()
+            self._add_memory("/".join([*self._path, file_name]), frame[1] - frame[0])
+            yield file_name, chunk
+
+    def stop(self) -> None:
+        """Stop tracing allocations, if it was started by the profiler."""
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def report(self) -> dict:
+        """Return timings and memory of all stages and the peak memory of the whole conversion."""
+        report = super().report()
+        for path, stage in report["stages"].items():
+            stage.update(self.memory.get(path, {}))
+        report["peak_bytes"] = self.peak_bytes
+        return report
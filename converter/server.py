@@ -0,0 +1,365 @@
+import http.client
+import json
+import socket
+import socketserver
+import threading
+from dataclasses import asdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Optional, Union
+
+from converter import api, deadline
+from converter.cache import ConversionCache, cache_key
+from converter.common import Parser
+from converter.deadline import ConversionTimeout
+from converter.diagnostics import Diagnostics
+from converter.metrics import CONTENT_TYPE, Metrics
+from converter.pool import WarmPool
+from converter.singleflight import SingleFlight
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class _NoFreeSlot(Exception):
+    """Raised when no conversion slot gets free within the queue timeout."""
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles conversion requests:
+
+    - `GET /health` returns `{"status": "ok"}`,
+    - `GET /stats` returns counters of coalesced conversions (and of the cache and the pool if they are used),
+    - `GET /metrics` returns conversion metrics in the Prometheus text format (see `converter.metrics`),
+    - `POST /convert` with JSON body `{"project": {...}, "simulator": "shieldhit", "output_dir": "..."}`
+      converts the project. Without `output_dir` the response is `{"files": {name: content}}`
+      (as returned by `Parser.get_configs_json`), otherwise files are saved in `output_dir` (on the
+      server side) and the response is `{"output_dir": "...", "files": [name, ...]}`.
+      Warnings and errors reported by the conversion are added as `"diagnostics": [...]`.
+      Requests for the same project and simulator made while it is converted get the same files
+      with `"coalesced": true` (and no diagnostics, as they are collected by the first request).
+      Optional `"timeout"` (in seconds) shortens the conversion timeout of the server.
+
+    Errors are returned as `{"error": "..."}` with 4xx/5xx status (with `"diagnostics"` if the conversion started).
+    """
+
+    server: "ConversionServerMixin"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        """Respond to the health check or send the statistics."""
+        if self.path == "/health":
+            self._send_json(HTTPStatus.OK, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send_json(HTTPStatus.OK, self.server.stats())
+        elif self.path == "/metrics":
+            self._send(HTTPStatus.OK, self.server.metrics.render().encode("utf-8"), CONTENT_TYPE)
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        """Convert the project sent in the request body."""
+        if self.path != "/convert":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            project = request["project"]
+            simulator = request.get("simulator", "shieldhit")
+            output_dir = Path(request["output_dir"]) if request.get("output_dir") else None
+            timeout = self.server.conversion_timeout
+            if request.get("timeout") is not None:
+                timeout = min(float(request["timeout"]), timeout or float("inf"))
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": f"Invalid request: {e!r}"})
+            return
+
+        collector = Diagnostics()
+        try:
+            with collector.activate():
+                parser = api.get_parser_from_str(simulator)
+            parser.diagnostics = collector
+            parser.metrics = self.server.metrics
+            key = cache_key(project, parser.info["simulator"])
+            with deadline.limit(timeout):
+                # requests for the project being converted wait for its files, without taking a conversion slot
+                files, coalesced = self.server.coalescer.do(key, lambda: self._convert(simulator, parser, project, key))
+            if output_dir:
+                api.save_configs_json(files, output_dir)
+        except _NoFreeSlot:
+            self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Too many concurrent conversions"})
+            return
+        except ConversionTimeout as e:
+            self._send_json(
+                HTTPStatus.GATEWAY_TIMEOUT, {"error": f"Conversion failed: {e!r}", "diagnostics": collector.to_list()}
+            )
+            return
+        except (ValueError, KeyError, TypeError, NotADirectoryError) as e:
+            self._send_json(
+                HTTPStatus.BAD_REQUEST, {"error": f"Conversion failed: {e!r}", "diagnostics": collector.to_list()}
+            )
+            return
+        except Exception as e:  # skipcq: PYL-W0703
+            self._send_json(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                {"error": f"Conversion failed: {e!r}", "diagnostics": collector.to_list()},
+            )
+            return
+
+        if output_dir:
+            self._send_json(
+                HTTPStatus.OK,
+                {
+                    "output_dir": str(output_dir),
+                    "files": list(files),
+                    "diagnostics": collector.to_list(),
+                    "coalesced": coalesced,
+                },
+            )
+        else:
+            self._send_json(HTTPStatus.OK, {"files": files, "diagnostics": collector.to_list(), "coalesced": coalesced})
+
+    def _convert(self, simulator: str, parser: Parser, project: dict, key: str) -> dict:
+        """Convert the project once one of the conversion slots is free, in a worker process if there is a pool."""
+        if not self.server.conversion_slots.acquire(timeout=self.server.queue_timeout):
+            raise _NoFreeSlot()
+        try:
+            if self.server.pool is None:
+                return api.run_parser(parser, project, cache=self.server.cache)
+
+            with self.server.metrics.conversion(parser, project):
+                configs_json = self.server.cache.get(key) if self.server.cache is not None else None
+                if configs_json is None:
+                    configs_json = self.server.pool.convert(simulator, project, parser.diagnostics)
+                    self.server.metrics.observe_files(parser.info["simulator"], configs_json)
+                    if self.server.cache is not None:
+                        self.server.cache.put(key, configs_json)
+            return configs_json
+        finally:
+            self.server.conversion_slots.release()
+
+    def address_string(self) -> str:
+        """Clients connecting through unix socket have no address."""
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix-socket"
+
+    def log_message(self, format: str, *args) -> None:  # skipcq: PYL-W0622
+        """Log requests only if the server is verbose."""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: HTTPStatus, body: dict) -> None:
+        """Send response with JSON body."""
+        self._send(status, json.dumps(body).encode("utf-8"), "application/json")
+
+    def _send(self, status: HTTPStatus, payload: bytes, content_type: str) -> None:
+        """Send response with the payload."""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class ConversionServerMixin(socketserver.ThreadingMixIn):
+    """
+    Common part of TCP and unix socket servers. Each request is handled in its own thread,
+    at most `max_concurrent` conversions run at the same time, other requests wait up to
+    `queue_timeout` seconds for a free slot. Threads are not daemonic and `server_close`
+    waits for them, so requests in progress are finished on shutdown. If `cache` is provided,
+    projects converted before are taken from it. Conversions taking more than `conversion_timeout`
+    seconds are aborted (see `converter.deadline`), so the slot is freed without killing the thread.
+    Requests for the same project and simulator arriving while it is converted wait for its files
+    (see `SingleFlight`) instead of converting it again. With a `pool` conversions run in its worker
+    processes (see `WarmPool`) instead of the request threads, so they are not limited by the GIL.
+    Conversions are recorded in `metrics`, together with the counters of the cache, coalescing and pool.
+    """
+
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(
+        self,
+        address,
+        max_concurrent: int = 4,
+        queue_timeout: float = 60.0,
+        verbose: bool = False,
+        cache: Optional[ConversionCache] = None,
+        conversion_timeout: Optional[float] = None,
+        pool: Optional[WarmPool] = None,
+    ):
+        self.cache = cache
+        self.pool = pool
+        self.metrics = Metrics()
+        self.conversion_timeout = conversion_timeout
+        self.coalescer = SingleFlight()
+        self.conversion_slots = threading.BoundedSemaphore(max_concurrent)
+        self.queue_timeout = queue_timeout
+        self.verbose = verbose
+        self.metrics.add_stats("coalescing", self.coalescer.stats)
+        self.metrics.add_gauge(
+            "converter_coalescing_in_flight",
+            "Conversions running, which other requests can wait for.",
+            self.coalescer.in_flight,
+        )
+        if cache is not None:
+            self.metrics.add_stats("cache", cache.stats)
+        if pool is not None:
+            self.metrics.add_stats("pool", pool.stats)
+        super().__init__(address, ConversionRequestHandler)
+
+    def stats(self) -> dict:
+        """Counters of coalesced conversions, of the cache and of the pool, as sent by `GET /stats`."""
+        stats = {"coalescing": {**asdict(self.coalescer.stats), "in_flight": self.coalescer.in_flight()}}
+        if self.cache is not None:
+            stats["cache"] = asdict(self.cache.stats)
+        if self.pool is not None:
+            stats["pool"] = asdict(self.pool.stats)
+        return stats
+
+
+class ConversionServer(ConversionServerMixin, HTTPServer):
+    """Conversion server listening on a TCP address (localhost by default)."""
+
+
+if hasattr(socket, "AF_UNIX"):
+
+    class UnixConversionServer(ConversionServerMixin, socketserver.UnixStreamServer):
+        """Conversion server listening on a unix socket."""
+
+        def server_bind(self) -> None:
+            """Remove socket file left by a previous server."""
+            Path(self.server_address).unlink(missing_ok=True)
+            super().server_bind()
+
+        def server_close(self) -> None:
+            """Remove the socket file after closing the server."""
+            super().server_close()
+            Path(self.server_address).unlink(missing_ok=True)
+
+
+def create_server(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Optional[Path] = None,
+    max_concurrent: int = 4,
+    queue_timeout: float = 60.0,
+    verbose: bool = False,
+    cache: Optional[ConversionCache] = None,
+    conversion_timeout: Optional[float] = None,
+    pool: Optional[WarmPool] = None,
+) -> ConversionServerMixin:
+    """Create the conversion server, listening on the unix socket if `socket_path` is provided."""
+    options = (max_concurrent, queue_timeout, verbose, cache, conversion_timeout, pool)
+    if socket_path is not None:
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Unix sockets are not supported on this platform.")
+        return UnixConversionServer(str(socket_path), *options)
+    return ConversionServer((host, port), *options)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection through a unix socket."""
+
+    def __init__(self, socket_path: Union[str, Path], timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = str(socket_path)
+
+    def connect(self) -> None:
+        """Connect to the unix socket instead of TCP address."""
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ConversionError(RuntimeError):
+    """Raised by ConversionClient when the server reports an error."""
+
+    def __init__(self, status: int, message: str, diagnostics: Optional[list] = None):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.diagnostics = diagnostics or []
+
+
+class ConversionClient:
+    """Client for the conversion server, connecting through TCP or the unix socket (if `socket_path` is set)."""
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        socket_path: Optional[Union[str, Path]] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def health(self) -> bool:
+        """Check if the server is up."""
+        return self._request("GET", "/health").get("status") == "ok"
+
+    def stats(self) -> dict:
+        """Get the counters of coalesced conversions and of the cache."""
+        return self._request("GET", "/stats")
+
+    def metrics(self) -> str:
+        """Get the conversion metrics in the Prometheus text format."""
+        connection = self._connect()
+        try:
+            connection.request("GET", "/metrics")
+            response = connection.getresponse()
+            text = response.read().decode("utf-8")
+        finally:
+            connection.close()
+        if response.status != HTTPStatus.OK:
+            raise ConversionError(response.status, text)
+        return text
+
+    def convert(
+        self,
+        project: dict,
+        simulator: str = "shieldhit",
+        output_dir: Optional[Union[str, Path]] = None,
+        conversion_timeout: Optional[float] = None,
+    ) -> Union[dict, list]:
+        """
+        Convert the project. Returns dict with file names and their content, or list of saved
+        file names if `output_dir` is provided (the directory is on the server side).
+        The server aborts the conversion after `conversion_timeout` seconds (or its own timeout if shorter).
+        """
+        request = {"project": project, "simulator": simulator}
+        if output_dir is not None:
+            request["output_dir"] = str(output_dir)
+        if conversion_timeout is not None:
+            request["timeout"] = conversion_timeout
+        return self._request("POST", "/convert", request)["files"]
+
+    def _connect(self) -> http.client.HTTPConnection:
+        """Connection to the server, through the unix socket if it is set."""
+        if self.socket_path is not None:
+            return UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, body: Optional[dict] = None) -> dict:
+        """Send request and return decoded JSON response."""
+        connection = self._connect()
+        try:
+            payload = json.dumps(body).encode("utf-8") if body is not None else None
+            headers = {"Content-Type": "application/json"} if payload is not None else {}
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            response_body = json.loads(response.read())
+        finally:
+            connection.close()
+
+        if response.status != HTTPStatus.OK:
+            raise ConversionError(response.status, response_body.get("error", ""), response_body.get("diagnostics"))
+        return response_body
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Iterator, Optional
 from converter.shieldhit.detectors import ScoringDetector, ScoringCylinder, ScoringMesh
 
 
@@ -142,19 +142,21 @@ class DetectConfig:
         ]
     )
 
-    def __str__(self):
-        return "\n".join(
-            [
-                "\n".join([str(geom) for geom in self.detectors]),
-                "\n".join([str(filter) for filter in self.filters]),
-                "\n".join(
-                    [
-                        str(quantity.settings)
-                        for output in self.outputs
-                        for quantity in output.quantities
-                        if quantity.settings
-                    ]
-                ),
-                "\n".join([str(output) for output in self.outputs]),
-            ]
+    def iter_chunks(self) -> Iterator[str]:
+        """Generate detect.dat config piece by piece (one detector, filter or output at a time)."""
+        sections = (
+            self.detectors,
+            self.filters,
+            (quantity.settings for output in self.outputs for quantity in output.quantities if quantity.settings),
+            self.outputs,
         )
+        for section_idx, section in enumerate(sections):
+            if section_idx > 0:
+                yield "\n"
+            for idx, item in enumerate(section):
+                if idx > 0:
+                    yield "\n"
+                yield str(item)
+
+    def __str__(self):
+        return "".join(self.iter_chunks())
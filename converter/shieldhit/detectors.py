@@ -1,8 +1,11 @@
 from dataclasses import dataclass
 from abc import ABC
+from typing import ClassVar
 
+from converter.compat import DATACLASS_SLOTS
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class ScoringDetector(ABC):
     """Abstract geometry dataclass for DetectConfig."""
 
@@ -10,13 +13,13 @@ class ScoringDetector(ABC):
     name: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class ScoringGlobal(ScoringDetector):
     r"""\"All\" detector. Scores on the whole defined space."""
 
     name: str
 
-    template: str = """Geometry All
+    template: ClassVar[str] = """Geometry All
     Name {name}
 """
 
@@ -24,7 +27,7 @@ class ScoringGlobal(ScoringDetector):
         return self.template.format(name=self.name)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class ScoringCylinder(ScoringDetector):
     """Cylinder detector dataclass used in DetectConfig."""
 
@@ -36,7 +39,7 @@ class ScoringCylinder(ScoringDetector):
     h_max: float = 20.0
     h_bins: int = 400
 
-    template: str = """Geometry Cyl
+    template: ClassVar[str] = """Geometry Cyl
     Name {name}
     R {r_min:g} {r_max:g} {r_bins:d}
     Z {h_min:g} {h_max:g} {h_bins:d}
@@ -54,7 +57,7 @@ class ScoringCylinder(ScoringDetector):
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class ScoringMesh(ScoringDetector):
     """Mesh detector dataclass used in DetectConfig."""
 
@@ -69,7 +72,7 @@ class ScoringMesh(ScoringDetector):
     z_max: float = 20.0
     z_bins: int = 400
 
-    template: str = """Geometry Mesh
+    template: ClassVar[str] = """Geometry Mesh
     Name {name}
     X {x_min:g} {x_max:g} {x_bins:d}
     Y {y_min:g} {y_max:g} {y_bins:d}
@@ -91,7 +94,7 @@ class ScoringMesh(ScoringDetector):
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class ScoringZone(ScoringDetector):
     """Scoring zone dataclass used un DetectConfig."""
 
@@ -100,7 +103,7 @@ class ScoringZone(ScoringDetector):
     last_zone_id: str = ""
     volume: float = 1.0
 
-    template: str = """Geometry Zone
+    template: ClassVar[str] = """Geometry Zone
     Name {name}
     Zone {first_zone} {last_zone}
     Volume {volume:f}
@@ -1,5 +1,8 @@
-from typing import Optional
-from converter.common import format_float, rotate
+from typing import ClassVar, Iterable, Iterator, Optional
+from converter import diagnostics
+from converter.common import format_float, iter_template, partial_template, rotate, rotate_vectors
+from converter.figure_table import BOX, CYLINDER, FigureTable
+from converter.compat import DATACLASS_SLOTS
 from converter.solid_figures import SolidFigure, BoxFigure, CylinderFigure, SphereFigure
 from dataclasses import dataclass, field
 from enum import IntEnum
@@ -21,23 +24,52 @@ class DefaultMaterial(IntEnum):
         return material_value in DefaultMaterial._value2member_map_
 
 
+# geometries with that many figures are rendered by `iter_table_entries`, sharing the work between figures
+FIGURE_TABLE_MIN_FIGURES = 1000
+
+# entries of figures in geo.dat, p1, p2, ... are the numbers of the entry in the order of SH12A columns
+BOX_TEMPLATE = """
+* box {name}
+* X range {p1:+#}, {p4:+#}
+* Y range {p2:+#}, {p5:+#}
+* Z range {p3:+#}, {p6:+#}
+* X, Y, Z side lengths: {x_edge_length:+#}, {y_edge_length:+#}, {z_edge_length:+#}
+  BOX {number:>4}{p1:>10}{p2:>10}{p3:>10}{p4:>10}{p5:>10}{p6:>10}
+          {p7:>10}{p8:>10}{p9:>10}{p10:>10}{p11:>10}{p12:>10}"""
+
+RCC_TEMPLATE = """
+* cylinder {name}
+* bottom center ({p1:+#}, {p2:+#}, {p3:+#}), top center ({p8:+#}, {p9:+#}, {p10:+#}),
+* spanning vector ({p4:+#}, {p5:+#}, {p6:+#}),
+* radius {p7:+#}, height {height:+#} cm
+* rotation angles: {rot_x}*, {rot_y}*, {rot_z}*
+  RCC {number:>4}{p1:>10}{p2:>10}{p3:>10}{p4:>10}{p5:>10}{p6:>10}
+          {p7:>10}"""
+
+SPH_TEMPLATE = """
+* sphere {name}
+* center ({p1:+#}, {p2:+#}, {p3:+#}), radius {p4:+#}
+  SPH {number:>4}{p1:>10}{p2:>10}{p3:>10}{p4:>10}"""
+
+
 def parse_figure(figure: SolidFigure, number: int) -> str:
     """Parse a SolidFigure into a string representation of SH12A input file."""
-    if type(figure) is BoxFigure:
-        return _parse_box(figure, number)
-    if type(figure) is CylinderFigure:
-        return _parse_cylinder(figure, number)
-    if type(figure) is SphereFigure:
-        return _parse_sphere(figure, number)
+    with diagnostics.context(figure=figure.name):
+        if type(figure) is BoxFigure:
+            return _parse_box(figure, number)
+        if type(figure) is CylinderFigure:
+            return _parse_cylinder(figure, number)
+        if type(figure) is SphereFigure:
+            return _parse_sphere(figure, number)
 
     raise ValueError(f"Unexpected solid figure type: {figure}")
 
 
 def _parse_box(box: BoxFigure, number: int) -> str:
     """Parse a BoxFigure into a str representation of SH12A input file."""
-    x_vec = rotate([box.x_edge_length, 0, 0], box.rotation)
-    y_vec = rotate([0, box.y_edge_length, 0], box.rotation)
-    z_vec = rotate([0, 0, box.z_edge_length], box.rotation)
+    x_vec, y_vec, z_vec = rotate_vectors(
+        ((box.x_edge_length, 0, 0), (0, box.y_edge_length, 0), (0, 0, box.z_edge_length)), box.rotation
+    )
     diagonal_vec = [
         x_vec[0] + y_vec[0] + z_vec[0],
         x_vec[1] + y_vec[1] + z_vec[1],
@@ -49,33 +81,17 @@ def _parse_box(box: BoxFigure, number: int) -> str:
         box.position[2] - diagonal_vec[2] / 2,
     )
 
-    box_template = """
-* box {name}
-* X range {p1:+#}, {p4:+#}
-* Y range {p2:+#}, {p5:+#}
-* Z range {p3:+#}, {p6:+#}
-* X, Y, Z side lengths: {x_edge_length:+#}, {y_edge_length:+#}, {z_edge_length:+#}
-  BOX {number:>4}{p1:>10}{p2:>10}{p3:>10}{p4:>10}{p5:>10}{p6:>10}
-          {p7:>10}{p8:>10}{p9:>10}{p10:>10}{p11:>10}{p12:>10}"""
-
-    return box_template.format(
+    x_edge_length, y_edge_length, z_edge_length = [
+        format_float(number, 16) for number in (box.x_edge_length, box.y_edge_length, box.z_edge_length)
+    ]
+    points = [format_float(number, 10) for number in (*start_position, *x_vec, *y_vec, *z_vec)]
+    return BOX_TEMPLATE.format(
         name=box.name,
-        x_edge_length=format_float(box.x_edge_length, 16),
-        y_edge_length=format_float(box.y_edge_length, 16),
-        z_edge_length=format_float(box.z_edge_length, 16),
+        x_edge_length=x_edge_length,
+        y_edge_length=y_edge_length,
+        z_edge_length=z_edge_length,
         number=number,
-        p1=format_float(start_position[0], 10),
-        p2=format_float(start_position[1], 10),
-        p3=format_float(start_position[2], 10),
-        p4=format_float(x_vec[0], 10),
-        p5=format_float(x_vec[1], 10),
-        p6=format_float(x_vec[2], 10),
-        p7=format_float(y_vec[0], 10),
-        p8=format_float(y_vec[1], 10),
-        p9=format_float(y_vec[2], 10),
-        p10=format_float(z_vec[0], 10),
-        p11=format_float(z_vec[1], 10),
-        p12=format_float(z_vec[2], 10),
+        **{f"p{index}": point for index, point in enumerate(points, start=1)},
     )
 
 
@@ -92,52 +108,99 @@ def _parse_cylinder(cylinder: CylinderFigure, number: int) -> str:
         lower_base_position[1] + height_vect[1],
         lower_base_position[2] + height_vect[2],
     )
-    rcc_template = """
-* cylinder {name}
-* bottom center ({p1:+#}, {p2:+#}, {p3:+#}), top center ({p8:+#}, {p9:+#}, {p10:+#}),
-* spanning vector ({p4:+#}, {p5:+#}, {p6:+#}),
-* radius {p7:+#}, height {height:+#} cm
-* rotation angles: {rot_x}*, {rot_y}*, {rot_z}*
-  RCC {number:>4}{p1:>10}{p2:>10}{p3:>10}{p4:>10}{p5:>10}{p6:>10}
-          {p7:>10}"""
-    return rcc_template.format(
+    height = format_float(cylinder.height, 16)
+    points = [
+        format_float(number, 10)
+        for number in (*lower_base_position, *height_vect, cylinder.radius_top, *top_base_position)
+    ]
+    return RCC_TEMPLATE.format(
         name=cylinder.name,
-        height=format_float(cylinder.height, 16),
+        height=height,
         number=number,
         rot_x=cylinder.rotation[0],
         rot_y=cylinder.rotation[1],
         rot_z=cylinder.rotation[2],
-        p1=format_float(lower_base_position[0], 10),
-        p2=format_float(lower_base_position[1], 10),
-        p3=format_float(lower_base_position[2], 10),
-        p4=format_float(height_vect[0], 10),
-        p5=format_float(height_vect[1], 10),
-        p6=format_float(height_vect[2], 10),
-        p7=format_float(cylinder.radius_top, 10),
-        p8=format_float(top_base_position[0], 10),
-        p9=format_float(top_base_position[1], 10),
-        p10=format_float(top_base_position[2], 10),
+        **{f"p{index}": point for index, point in enumerate(points, start=1)},
     )
 
 
 def _parse_sphere(sphere: SphereFigure, number: int) -> str:
     """Parse a SphereFigure into a str representation of SH12A input file."""
-    sphere_entry_template = """
-* sphere {name}
-* center ({p1:+#}, {p2:+#}, {p3:+#}), radius {p4:+#}
-  SPH {number:>4}{p1:>10}{p2:>10}{p3:>10}{p4:>10}"""
-
-    return sphere_entry_template.format(
+    points = [format_float(number, 10) for number in (*sphere.position, sphere.radius)]
+    return SPH_TEMPLATE.format(
         name=sphere.name,
         number=number,
-        p1=format_float(sphere.position[0], 10),
-        p2=format_float(sphere.position[1], 10),
-        p3=format_float(sphere.position[2], 10),
-        p4=format_float(sphere.radius, 10),
+        **{f"p{index}": point for index, point in enumerate(points, start=1)},
     )
 
 
-@dataclass
+def iter_table_entries(table: FigureTable, first_number: int = 1) -> Iterator[str]:
+    """
+    Same as `parse_figure` called for every figure of the table, numbered from `first_number`. Parts of
+    the entries which don't depend on the position are rendered once for all figures of the same shape,
+    so warnings about them are reported only for the first of these figures.
+    """
+    shapes: dict[tuple, tuple[str, tuple[float, float, float]]] = {}
+    for index, name in enumerate(table.names):
+        with diagnostics.context(figure=name):
+            shape = table.shape(index)
+            shared = shapes.get(shape)
+            if shared is None:
+                shared = shapes[shape] = _shape_template(table, index)
+            template, (half_x, half_y, half_z) = shared
+            lower_base = (table.x[index] - half_x, table.y[index] - half_y, table.z[index] - half_z)
+            if table.kinds[index] == CYLINDER:
+                height_x, height_y, height_z = half_x * 2, half_y * 2, half_z * 2
+                top_base = (lower_base[0] + height_x, lower_base[1] + height_y, lower_base[2] + height_z)
+                p1, p2, p3, p8, p9, p10 = [format_float(number, 10) for number in (*lower_base, *top_base)]
+                yield template.format(
+                    name=name, number=first_number + index, p1=p1, p2=p2, p3=p3, p8=p8, p9=p9, p10=p10
+                )
+            else:
+                p1, p2, p3 = [format_float(number, 10) for number in lower_base]
+                yield template.format(name=name, number=first_number + index, p1=p1, p2=p2, p3=p3)
+
+
+def _shape_template(table: FigureTable, index: int) -> tuple[str, tuple[float, float, float]]:
+    """
+    Return the template of entries of figures with the same shape as the given one, with all fields except
+    the name, number and position rendered, and the vector from the center to the first point of the entry.
+    """
+    kind = table.kinds[index]
+    rotation = table.rotations[table.rotation_ids[index]]
+    size1, size2, size3 = table.size1[index], table.size2[index], table.size3[index]
+    if kind == BOX:
+        x_vec, y_vec, z_vec = rotate_vectors(((size1, 0, 0), (0, size2, 0), (0, 0, size3)), rotation)
+        x_edge_length, y_edge_length, z_edge_length = [format_float(number, 16) for number in (size1, size2, size3)]
+        points = [format_float(number, 10) for number in (*x_vec, *y_vec, *z_vec)]
+        fields = {
+            "x_edge_length": x_edge_length,
+            "y_edge_length": y_edge_length,
+            "z_edge_length": z_edge_length,
+            **{f"p{index}": point for index, point in enumerate(points, start=4)},
+        }
+        half_diagonal = (
+            (x_vec[0] + y_vec[0] + z_vec[0]) / 2,
+            (x_vec[1] + y_vec[1] + z_vec[1]) / 2,
+            (x_vec[2] + y_vec[2] + z_vec[2]) / 2,
+        )
+        return partial_template(BOX_TEMPLATE, fields), half_diagonal
+    if kind == CYLINDER:
+        height_vect = rotate([0, 0, size3], rotation)
+        points = [format_float(number, 10) for number in (*height_vect, size1)]
+        fields = {
+            "height": format_float(size3, 16),
+            "rot_x": rotation[0],
+            "rot_y": rotation[1],
+            "rot_z": rotation[2],
+            **{f"p{index}": point for index, point in enumerate(points, start=4)},
+        }
+        half_height = (height_vect[0] / 2, height_vect[1] / 2, height_vect[2] / 2)
+        return partial_template(RCC_TEMPLATE, fields), half_height
+    return partial_template(SPH_TEMPLATE, {"p4": format_float(size1, 10)}), (0.0, 0.0, 0.0)
+
+
+@dataclass(**DATACLASS_SLOTS)
 class Material:
     """Dataclass mapping for SH12A materials."""
 
@@ -165,7 +228,7 @@ class Material:
         return result
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Zone:
     """Dataclass mapping for SH12A zones."""
 
@@ -176,7 +239,7 @@ class Zone:
     material: int = 0
     material_override: dict[str, str] = field(default_factory=dict)
 
-    zone_template: str = """
+    zone_template: ClassVar[str] = """
   {id:03d}       {operators}"""
 
     def __str__(self) -> str:
@@ -246,7 +309,7 @@ class GeoMatConfig:
     title: str = "Unnamed geometry"
     available_custom_stopping_power_files: dict[int, StoppingPowerFile] = field(default_factory=lambda: {})
 
-    geo_template: str = """
+    geo_template: ClassVar[str] = """
 {jdbg1:>5}{jdbg1:>5}          {title}
 {figures}
   END
@@ -273,25 +336,49 @@ class GeoMatConfig:
         ]
         return "\n".join([*zone_ids, *material_ids])
 
+    @staticmethod
+    def _skip_first_char(chunks: Iterable[str]) -> Iterator[str]:
+        """Same as `"".join(chunks)[1:]`, but chunk by chunk."""
+        skipped = False
+        for chunk in chunks:
+            if not skipped and chunk:
+                chunk = chunk[1:]
+                skipped = True
+            yield chunk
+
+    def _iter_figure_entries(self) -> Iterator[str]:
+        """Entries of all figures, big geometries are rendered in bulk from a FigureTable."""
+        if len(self.figures) >= FIGURE_TABLE_MIN_FIGURES:
+            return iter_table_entries(FigureTable.from_figures(self.figures))
+        # we increment idx because shieldhit indexes from 1 while python indexes lists from 0
+        return (parse_figure(figure, idx + 1) for idx, figure in enumerate(self.figures))
+
+    def iter_geo_chunks(self) -> Iterator[str]:
+        """Generate geo.dat config piece by piece (one figure or zone at a time)."""
+        return iter_template(
+            self.geo_template,
+            {
+                "jdbg1": self.jdbg1,
+                "jdbg2": self.jdbg2,
+                "title": self.title,
+                "figures": self._skip_first_char(self._iter_figure_entries()),
+                "zones_geometries": self._skip_first_char(str(zone) for zone in self.zones),
+                "zones_materials": self._get_zone_material_string(),
+            },
+        )
+
     def get_geo_string(self) -> str:
         """Generate geo.dat config."""
-        return self.geo_template.format(
-            jdbg1=self.jdbg1,
-            jdbg2=self.jdbg2,
-            title=self.title,
-            # we increment idx because shieldhit indexes from 1 while python indexes lists from 0
-            figures="".join([parse_figure(figure, idx + 1) for idx, figure in enumerate(self.figures)])[1:],
-            zones_geometries="".join([str(zone) for zone in self.zones])[1:],
-            zones_materials=self._get_zone_material_string(),
-        )
+        return "".join(self.iter_geo_chunks())
 
-    def get_mat_string(self) -> str:
-        """Generate mat.dat config."""
+    def iter_mat_chunks(self) -> Iterator[str]:
+        """Generate mat.dat config, one material at a time."""
         # we increment idx because shieldhit indexes from 1 while python indexes lists from 0
-        material_strings = []
         materials_filtered = filter(lambda x: not DefaultMaterial.is_default_material(x.icru), self.materials)
         for idx, material in enumerate(materials_filtered):
             material.idx = idx + 1
-            material_strings.append(str(material))
+            yield str(material)
 
-        return "".join(material_strings)
+    def get_mat_string(self) -> str:
+        """Generate mat.dat config."""
+        return "".join(self.iter_mat_chunks())
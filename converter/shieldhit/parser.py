@@ -1,9 +1,10 @@
-import itertools
-from typing import Optional
+import copy
+from typing import Iterator, Optional
 import re
 
 import converter.solid_figures as solid_figures
-from converter.common import Parser, convert_beam_energy
+from converter import deadline
+from converter.common import Parser, iter_file_chunks
 from converter.shieldhit.beam import (
     BeamConfig,
     BeamModulator,
@@ -16,6 +17,7 @@ from converter.shieldhit.beam import (
 from converter.shieldhit.detect import DetectConfig, OutputQuantity, ScoringFilter, ScoringOutput, QuantitySettings
 from converter.shieldhit.geo import DefaultMaterial, GeoMatConfig, Material, Zone, StoppingPowerFile
 from converter.shieldhit.detectors import ScoringCylinder, ScoringDetector, ScoringGlobal, ScoringMesh, ScoringZone
+from converter.shieldhit.world_zone import DEFAULT_MAX_WORLD_ZONE_SETS, calculate_world_zone_operations
 
 PARTICLE_DICT: dict[int, dict] = {
     1: {
@@ -111,12 +113,28 @@ class ShieldhitParser(Parser):
         self.beam_config = BeamConfig()
         self.detect_config = DetectConfig()
         self.geo_mat_config = GeoMatConfig()
-
-    def parse_configs(self, json: dict) -> None:
+        # limit of figure sets the world zone can be split into, see `calculate_world_zone_operations`
+        self.max_world_zone_sets = DEFAULT_MAX_WORLD_ZONE_SETS
+        # number of figure sets the world zone was split into, None until a project with the world zone is parsed
+        self.world_zone_sets: Optional[int] = None
+        # uuid -> index/object maps, built once per parse and updated whenever the lists are extended.
+        # If more than one object has the same uuid, the first one is used (as in the list scan).
+        self._zone_index_by_uuid: dict[str, int] = {}
+        self._figure_index_by_uuid: dict[str, int] = {}
+        self._material_by_uuid: dict[str, Material] = {}
+        self._material_id_by_uuid: dict[str, int] = {}
+        self._mat_dat_materials_count = 0
+        self._detector_name_by_uuid: dict[str, str] = {}
+        self._scoring_filter_name_by_uuid: dict[str, str] = {}
+
+    def _parse_configs(self, json: dict) -> None:
         """Wrapper for all parse functions"""
-        self._parse_geo_mat(json)
-        self._parse_beam(json)
-        self._parse_detect(json)
+        with self._stage("geo_mat"):
+            self._parse_geo_mat(json)
+        with self._stage("beam"):
+            self._parse_beam(json)
+        with self._stage("detect"):
+            self._parse_detect(json)
 
     def parse_modulator(self, json: dict) -> None:
         """Parses data from the input json into the beam_config property"""
@@ -206,7 +224,7 @@ class ShieldhitParser(Parser):
         input_energy_unit = json["beam"].get("energyUnit", "MeV")
         a = json["beam"]["particle"].get("a", 1)
 
-        energy, energy_unit, energy_scale_factor = convert_beam_energy(
+        energy, energy_unit, energy_scale_factor = self.project.convert_beam_energy(
             PARTICLE_DICT, particle_id, a, input_energy, input_energy_unit
         )
 
@@ -223,7 +241,15 @@ class ShieldhitParser(Parser):
     def _parse_detect(self, json: dict) -> None:
         """Parses data from the input json into the detect_config property"""
         self.detect_config.detectors = self._parse_detectors(json)
+        self._detector_name_by_uuid = {}
+        for detector in self.detect_config.detectors:
+            self._detector_name_by_uuid.setdefault(detector.uuid, detector.name)
+
         self.detect_config.filters = self._parse_filters(json)
+        self._scoring_filter_name_by_uuid = {}
+        for scoring_filter in self.detect_config.filters:
+            self._scoring_filter_name_by_uuid.setdefault(scoring_filter.uuid, scoring_filter.name)
+
         self.detect_config.outputs = self._parse_outputs(json)
 
     def _parse_detectors(self, json: dict) -> list[ScoringDetector]:
@@ -287,9 +313,8 @@ class ShieldhitParser(Parser):
 
     def _get_zone_index_by_uuid(self, zone_uuid: str) -> int:
         """Finds zone in the geo_mat_config object by its uuid and returns its simulation index."""
-        for idx, zone in enumerate(self.geo_mat_config.zones):
-            if zone.uuid == zone_uuid:
-                return idx + 1
+        if zone_uuid in self._zone_index_by_uuid:
+            return self._zone_index_by_uuid[zone_uuid]
 
         raise ValueError(f'No zone with uuid "{zone_uuid}".')
 
@@ -318,9 +343,8 @@ class ShieldhitParser(Parser):
 
     def _get_detector_by_uuid(self, detect_uuid: str) -> Optional[str]:
         """Finds detector in the detect_config object by its uuid and returns its simulation name."""
-        for detector in self.detect_config.detectors:
-            if detector.uuid == detect_uuid:
-                return detector.name
+        if detect_uuid in self._detector_name_by_uuid:
+            return self._detector_name_by_uuid[detect_uuid]
 
         raise ValueError(f"No detector with uuid {detect_uuid}")
 
@@ -401,18 +425,20 @@ class ShieldhitParser(Parser):
 
     def _get_scoring_filter_by_uuid(self, filter_uuid: str) -> str:
         """Finds scoring filter in the detect_config object by its uuid and returns its simulation name."""
-        for scoring_filter in self.detect_config.filters:
-            if scoring_filter.uuid == filter_uuid:
-                return scoring_filter.name
+        if filter_uuid in self._scoring_filter_name_by_uuid:
+            return self._scoring_filter_name_by_uuid[filter_uuid]
 
         raise ValueError(f"No scoring filter with uuid {filter_uuid} in {self.detect_config.filters}.")
 
     def _parse_geo_mat(self, json: dict) -> None:
         """Parses data from the input json into the geo_mat_config property"""
         self._parse_title(json)
-        self._parse_materials(json)
-        self._parse_figures(json)
-        self._parse_zones(json)
+        with self._stage("materials"):
+            self._parse_materials(json)
+        with self._stage("figures"):
+            self._parse_figures(json)
+        with self._stage("zones"):
+            self._parse_zones(json)
 
     def _parse_title(self, json: dict) -> None:
         """Parses data from the input json into the geo_mat_config property"""
@@ -425,6 +451,11 @@ class ShieldhitParser(Parser):
             Material(material["name"], material["sanitizedName"], material["uuid"], material["icru"])
             for material in json["materialManager"].get("materials")
         ]
+        self._material_by_uuid = {}
+        self._material_id_by_uuid = {}
+        self._mat_dat_materials_count = 0
+        for material in self.geo_mat_config.materials:
+            self._index_material(material)
 
         if json.get("physic") is not None and json["physic"].get("availableStoppingPowerFiles", False):
             for icru in json["physic"]["availableStoppingPowerFiles"]:
@@ -435,39 +466,53 @@ class ShieldhitParser(Parser):
 
     def _parse_figures(self, json: dict) -> None:
         """Parse figures from JSON"""
-        self.geo_mat_config.figures = [
-            solid_figures.parse_figure(figure_dict) for figure_dict in json["figureManager"].get("figures")
-        ]
+        self.geo_mat_config.figures = []
+        self._figure_index_by_uuid = {}
+        for figure in self.project.figures:
+            self._add_figure(figure)
+
+    def _add_figure(self, figure: solid_figures.SolidFigure) -> None:
+        """Add figure to the geo_mat_config object and index it by uuid."""
+        self._figure_index_by_uuid.setdefault(figure.uuid, len(self.geo_mat_config.figures))
+        self.geo_mat_config.figures.append(figure)
+
+    def _add_zone(self, zone: Zone) -> None:
+        """Add zone to the geo_mat_config object and index it by uuid."""
+        self.geo_mat_config.zones.append(zone)
+        # zones are numbered from 1 in SHIELD-HIT12A
+        self._zone_index_by_uuid.setdefault(zone.uuid, len(self.geo_mat_config.zones))
 
     def _add_overridden_material(self, material: Material) -> None:
         """Parse materials from JSON"""
         self.geo_mat_config.materials.append(material)
+        self._index_material(material)
+
+    def _index_material(self, material: Material) -> None:
+        """Index material (which has to be the last one in the geo_mat_config object) by uuid."""
+        # If the material is a DefaultMaterial then we need the value not its index,
+        # the _value2member_map_ returns a map of values and members that allows us to check if
+        # a given value is defined within the DefaultMaterial enum.
+        if DefaultMaterial.is_default_material(material.icru):
+            material_id = int(material.icru)
+        else:
+            # Only materials defined in mat.dat file are indexed, so we count only them.
+            self._mat_dat_materials_count += 1
+            material_id = self._mat_dat_materials_count
+
+        self._material_by_uuid.setdefault(material.uuid, material)
+        self._material_id_by_uuid.setdefault(material.uuid, material_id)
 
     def _get_material_by_uuid(self, material_uuid: str) -> Material:
         """Finds first material in the geo_mat_config object with corresponding uuid and returns it."""
-        for material in self.geo_mat_config.materials:
-            if material.uuid == material_uuid:
-                return material
+        if material_uuid in self._material_by_uuid:
+            return self._material_by_uuid[material_uuid]
 
         raise ValueError(f"No material with uuid {material_uuid}.")
 
     def _get_material_id(self, material_uuid: str) -> int:
         """Find material by uuid and return its id."""
-        offset = 0
-        for idx, material in enumerate(self.geo_mat_config.materials):
-            # If the material is a DefaultMaterial then we need the value not its index,
-            # the _value2member_map_ returns a map of values and members that allows us to check if
-            # a given value is defined within the DefaultMaterial enum.
-            if DefaultMaterial.is_default_material(material.icru):
-                if material.uuid == material_uuid:
-                    return int(material.icru)
-
-                # We need to count all DefaultMaterials prior to the searched one.
-                offset += 1
-
-            elif material.uuid == material_uuid:
-                # Only materials defined in mat.dat file are indexed.
-                return idx + 1 - offset
+        if material_uuid in self._material_id_by_uuid:
+            return self._material_id_by_uuid[material_uuid]
 
         raise ValueError(f"No material with uuid {material_uuid} in materials {self.geo_mat_config.materials}.")
 
@@ -497,10 +542,11 @@ class ShieldhitParser(Parser):
     def _parse_zones(self, json: dict) -> None:
         """Parse zones from JSON"""
         self.geo_mat_config.zones = []
+        self._zone_index_by_uuid = {}
 
         for idx, zone in enumerate(json["zoneManager"]["zones"]):
             self._parse_custom_material(zone)
-            self.geo_mat_config.zones.append(
+            self._add_zone(
                 Zone(
                     uuid=zone["uuid"],
                     # lists are numbered from 0, but shieldhit zones are numbered from 1
@@ -518,14 +564,15 @@ class ShieldhitParser(Parser):
         """Parse the world zone and add it to the zone list"""
         # Add bounding figure to figures
         world_zone = json["zoneManager"]["worldZone"]
-        world_figure = solid_figures.parse_figure(world_zone)
-        self.geo_mat_config.figures.append(world_figure)
+        self._add_figure(self.project.world_figure)
 
-        operations = self._calculate_world_zone_operations(len(self.geo_mat_config.figures))
+        with self._stage("world_zone"):
+            operations = self._calculate_world_zone_operations(len(self.geo_mat_config.figures))
+        self.world_zone_sets = len(operations)
         material = self._get_material_id(world_zone["materialUuid"])
         # add zone to zones for every operation in operations
         for operation in operations:
-            self.geo_mat_config.zones.append(
+            self._add_zone(
                 Zone(
                     uuid="",
                     id=len(self.geo_mat_config.zones) + 1,
@@ -540,7 +587,7 @@ class ShieldhitParser(Parser):
         # if the World Zone already is made of Black Hole
         if material != DefaultMaterial.BLACK_HOLE.value:
             # Add the figure that will serve as a black hole wrapper around the world zone
-            black_hole_figure = solid_figures.parse_figure(world_zone)
+            black_hole_figure = copy.deepcopy(self.project.world_figure)
 
             # Change the name to Black Hole Wrapper
             black_hole_figure.name = "Black Hole Wrapper"
@@ -549,11 +596,11 @@ class ShieldhitParser(Parser):
             black_hole_figure.expand(1.0)
 
             # Add the black hole figure to the figures list
-            self.geo_mat_config.figures.append(black_hole_figure)
+            self._add_figure(black_hole_figure)
 
             # Add the black hole wrapper zone to the zones list
             last_figure_idx = len(self.geo_mat_config.figures)
-            self.geo_mat_config.zones.append(
+            self._add_zone(
                 Zone(
                     uuid="",
                     id=len(self.geo_mat_config.zones) + 1,
@@ -572,6 +619,7 @@ class ShieldhitParser(Parser):
         list_of_operations = [item for ops in operations for item in ops]
         parsed_operations = []
         for operation in list_of_operations:
+            deadline.check()
             # lists are numbered from 0, but SHIELD-HIT12A figures are numbered from 1
             figure_id = self._get_figure_index_by_uuid(operation["objectUuid"]) + 1
             if operation["mode"] == "union":
@@ -592,55 +640,33 @@ class ShieldhitParser(Parser):
             figure_operators for zone in self.geo_mat_config.zones for figure_operators in zone.figures_operators
         ]
 
-        world_zone = [{world_zone_figure}]
-
-        for figure_set in all_zones:
-            new_world_zone = []
-            for w_figure_set in world_zone:
-                for figure in figure_set:
-                    new_world_zone.append({*w_figure_set, -figure})
-            world_zone = new_world_zone
-
-        # filter out sets containing opposite pairs of values
-        world_zone = filter(lambda x: not any(abs(i) == abs(j) for i, j in itertools.combinations(x, 2)), world_zone)
-
-        return list(world_zone)
+        return calculate_world_zone_operations(all_zones, world_zone_figure, max_sets=self.max_world_zone_sets)
 
     def _get_figure_index_by_uuid(self, figure_uuid: str) -> int:
         """Find the list index of a figure from geo_mat_config.figures by uuid. Useful when parsing CSG operations."""
-        for idx, figure in enumerate(self.geo_mat_config.figures):
-            if figure.uuid == figure_uuid:
-                return idx
+        if figure_uuid in self._figure_index_by_uuid:
+            return self._figure_index_by_uuid[figure_uuid]
 
         raise ValueError(f'No figure with uuid "{figure_uuid}".')
 
-    def get_configs_json(self) -> dict:
-        """Get JSON data for configs"""
-        configs_json = super().get_configs_json()
-        configs_json.update(
-            {
-                "beam.dat": str(self.beam_config),
-                "mat.dat": self.geo_mat_config.get_mat_string(),
-                "detect.dat": str(self.detect_config),
-                "geo.dat": self.geo_mat_config.get_geo_string(),
-            }
-        )
+    def _iter_configs(self) -> Iterator[tuple[str, str]]:
+        """Get configs piece by piece, geometry, materials and detectors are rendered one element at a time"""
+        yield from super()._iter_configs()
+        yield "beam.dat", str(self.beam_config)
+        yield from iter_file_chunks("mat.dat", self.geo_mat_config.iter_mat_chunks())
+        yield from iter_file_chunks("detect.dat", self.detect_config.iter_chunks())
+        yield from iter_file_chunks("geo.dat", self.geo_mat_config.iter_geo_chunks())
 
-        files = {}
         for icru in self.geo_mat_config.available_custom_stopping_power_files:
             file = self.geo_mat_config.available_custom_stopping_power_files[icru]
-            files[file.name] = file.content
-
-        configs_json.update(files)
+            yield file.name, file.content
 
         if self.beam_config.beam_source_type == BeamSourceType.FILE:
             filename_of_beam_source_file: str = "sobp.dat"
             if not self.beam_config.beam_source_filename:
                 filename_of_beam_source_file = str(self.beam_config.beam_source_filename)
-            configs_json[filename_of_beam_source_file] = str(self.beam_config.beam_source_file_content)
+            yield filename_of_beam_source_file, str(self.beam_config.beam_source_file_content)
 
         if self.beam_config.modulator is not None:
             filename_of_modulator_source_file: str = self.beam_config.modulator.filename
-            configs_json[filename_of_modulator_source_file] = str(self.beam_config.modulator.file_content)
-
-        return configs_json
+            yield filename_of_modulator_source_file, str(self.beam_config.modulator.file_content)
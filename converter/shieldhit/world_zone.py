@@ -0,0 +1,98 @@
+from typing import Iterable, Iterator
+
+from converter import deadline
+
+# Upper limit for the number of figure sets kept while expanding the world zone.
+# Each set becomes a separate zone in geo.dat, so exceeding it means the geometry
+# can't be reasonably simulated anyway.
+DEFAULT_MAX_WORLD_ZONE_SETS = 10000
+
+
+class WorldZoneTooComplexError(ValueError):
+    """Raised when the world zone would consist of more figure sets than allowed."""
+
+
+def calculate_world_zone_operations(
+    zones_operators: Iterable[set[int]],
+    world_zone_figure: int,
+    max_sets: int = DEFAULT_MAX_WORLD_ZONE_SETS,
+) -> list[set[int]]:
+    """
+    Calculate the world zone operations. Take the world zone figure and subtract all geometries.
+
+    The world zone is the world figure intersected with the complement of every union of figure sets,
+    written down as a union of figure sets (each set being an intersection of figures). Complement of
+    a figure set is a union of its negated figures, so each subtracted set multiplies the number of
+    resulting sets by its size. To keep that expansion manageable, while expanding we drop:
+
+    - sets containing a figure and its negation (they describe an empty space),
+    - sets containing a figure which has to be subtracted anyway (single-figure zones are always
+      subtracted, so such sets would become contradictory later on),
+    - sets identical to already kept ones,
+    - sets being supersets of other kept sets (they describe a subspace of the smaller set).
+
+    None of these change the described space. Order of the remaining sets is the same as in the
+    plain Cartesian-product expansion.
+
+    Raises WorldZoneTooComplexError if more than `max_sets` sets would have to be kept
+    and ConversionTimeout if the deadline of the conversion passes (see `converter.deadline`).
+    """
+    world_zone = [{world_zone_figure}]
+    for world_zone in iter_world_zone_expansion(zones_operators, world_zone_figure):
+        if len(world_zone) > max_sets:
+            raise WorldZoneTooComplexError(
+                f"World zone requires more than {max_sets} figure sets. "
+                "Simplify the geometry (e.g. reduce number of subtractions in zones) or raise the limit."
+            )
+
+    return world_zone
+
+
+def iter_world_zone_expansion(zones_operators: Iterable[set[int]], world_zone_figure: int) -> Iterator[list[set[int]]]:
+    """
+    Expand the world zone as described in `calculate_world_zone_operations`, yielding the kept sets after
+    subtracting each of the zones operators. Sets of the yielded lists are extended in place by the next steps.
+    """
+    zones_operators = list(zones_operators)
+    # figures which are subtracted from the world zone in every resulting set
+    always_subtracted = {next(iter(figure_set)) for figure_set in zones_operators if len(figure_set) == 1}
+
+    world_zone = [{world_zone_figure}]
+
+    for figure_set in zones_operators:
+        deadline.check()
+        # figures added to the sets when subtracting this figure set
+        negated = [-figure for figure in figure_set if -figure not in always_subtracted]
+        # Sets which already contain one of them stay as they are, other sets made from them are their
+        # supersets. As kept sets are never supersets of each other, a set made by adding a figure to
+        # another set can only be a superset of such unchanged set containing the same figure, so only
+        # these are compared. Sets made from different sets can't be identical once supersets are dropped.
+        unchanged = [not w_figure_set.isdisjoint(negated) for w_figure_set in world_zone]
+        unchanged_by_figure: dict[int, list[set[int]]] = {}
+        for w_figure_set, is_unchanged in zip(world_zone, unchanged):
+            if is_unchanged:
+                for figure in negated:
+                    if figure in w_figure_set:
+                        unchanged_by_figure.setdefault(figure, []).append(w_figure_set)
+
+        new_world_zone = []
+        for w_figure_set, is_unchanged in zip(world_zone, unchanged):
+            deadline.check()
+            if is_unchanged:
+                new_world_zone.append(w_figure_set)
+                continue
+            added = []
+            for figure in negated:
+                if -figure in w_figure_set:
+                    continue
+                subsets = unchanged_by_figure.get(figure)
+                if subsets and any(subset <= w_figure_set | {figure} for subset in subsets):
+                    continue
+                added.append(figure)
+            new_world_zone.extend({*w_figure_set, figure} for figure in added[:-1])
+            if added:
+                # the last set extends the old one in place, so sets aren't copied when they just grow
+                w_figure_set.add(added[-1])
+                new_world_zone.append(w_figure_set)
+        world_zone = new_world_zone
+        yield world_zone
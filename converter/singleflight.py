@@ -0,0 +1,96 @@
+"""
+Coalescing of identical conversions running at the same time. When many users submit the same project
+(e.g. an example during classes), only the first request converts it and the others wait for its files.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from converter import deadline
+
+
+@dataclass
+class SingleFlightStats:
+    """Counters of a single SingleFlight object."""
+
+    # calls which ran the function themselves
+    executed: int = 0
+    # calls which got the result of a call already in progress
+    coalesced: int = 0
+    # calls which failed, including coalesced calls sharing the error
+    failed: int = 0
+
+
+class _Call:
+    """Call in progress, waiting calls get its result or exception once `done` is set."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[dict] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Runs the function once for calls with the same key made while it is running, the other calls wait
+    and get the same result (or the same exception). Keys are usually made by `cache.cache_key`, so only
+    conversions of the same project with the same backend are coalesced. Safe to use from many threads.
+
+    Waiting calls respect their own deadline (see `converter.deadline`). If the running call times out,
+    waiting calls don't share the timeout, as their deadline may be later: one of them runs the function again.
+    """
+
+    def __init__(self) -> None:
+        self.stats = SingleFlightStats()
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self) -> int:
+        """Number of calls running at the moment."""
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: str, function: Callable[[], dict]) -> tuple[dict, bool]:
+        """
+        Return the result of the function, run by this call or by a call with the same key already in progress,
+        and whether the result is shared. Results are dicts (e.g. of converted files), each call gets its own copy.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+
+            if leader:
+                return self._run(key, call, function), False
+
+            if not call.done.wait(timeout=deadline.remaining()):
+                raise deadline.ConversionTimeout("Conversion took longer than its timeout.")
+            if isinstance(call.error, deadline.ConversionTimeout):
+                continue
+            with self._lock:
+                if call.error is not None:
+                    self.stats.failed += 1
+                else:
+                    self.stats.coalesced += 1
+            if call.error is not None:
+                raise call.error
+            return dict(call.result), True
+
+    def _run(self, key: str, call: _Call, function: Callable[[], dict]) -> dict:
+        """Run the function and pass its result or exception to the waiting calls."""
+        try:
+            call.result = function()
+            return dict(call.result)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.stats.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.stats.executed += 1
+                del self._calls[key]
+            call.done.set()
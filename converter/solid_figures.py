@@ -1,8 +1,11 @@
 from dataclasses import dataclass, field
 from abc import ABC
 
+from converter.compat import DATACLASS_SLOTS
+from converter.diagnostics import error
 
-@dataclass(frozen=False)
+
+@dataclass(frozen=False, **DATACLASS_SLOTS)
 class SolidFigure(ABC):
     """
     Abstract solid figure in 3D space. It is characterised by position in
@@ -20,7 +23,7 @@ class SolidFigure(ABC):
         """Expand figure by `expansion` in each dimension."""
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, **DATACLASS_SLOTS)
 class SphereFigure(SolidFigure):
     """A sphere. Its size is defined by its radius."""
 
@@ -31,7 +34,7 @@ class SphereFigure(SolidFigure):
         self.radius += margin
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, **DATACLASS_SLOTS)
 class CylinderFigure(SolidFigure):
     """
     A cylinder, a cone or a truncated cone. It's defined by the radii of both of
@@ -55,7 +58,7 @@ class CylinderFigure(SolidFigure):
         self.height += margin * 2
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, **DATACLASS_SLOTS)
 class BoxFigure(SolidFigure):
     """
     A rectangular box (cuboid). The figure can be rotated (meaning its walls don't have
@@ -110,7 +113,7 @@ def parse_figure(figure_dict: dict) -> SolidFigure:
             rotation=tuple(figure_dict["geometryData"]["rotation"]),
             radius=figure_dict["geometryData"]["parameters"]["radius"],
         )
-    print(f'Invalid geometry of type "{geometry_type}" in figure "{figure_dict.get("name")}".')
+    error(f'Invalid geometry of type "{geometry_type}" in figure "{figure_dict.get("name")}".')
     raise ValueError(
         "Geometry type must be either 'HollowCylinderGeometry', 'CylinderGeometry', 'BoxGeometry', or 'SphereGeometry'"
     )
@@ -2,6 +2,8 @@ from pathlib import Path
 import pytest
 import json
 
+from converter.benchmark.generator import generate_project
+
 
 @pytest.fixture(scope="session")
 def project_shieldhit_path() -> Path:
@@ -31,3 +33,32 @@ def project_shieldhit_json_with_sobp_dat(project_shieldhit_with_sobp_dat_path) -
     """Dictionary with project data for SHIELD-HIT12A"""
     with open(project_shieldhit_with_sobp_dat_path, "r") as file_handle:
         return json.load(file_handle)
+
+
+@pytest.fixture(scope="session")
+def project_fluka_path() -> Path:
+    """Path to Fluka project.json file, which can be converted by all simulators"""
+    return Path(__file__).parent / "fluka" / "project.json"
+
+
+@pytest.fixture(scope="session")
+def project_fluka_json(project_fluka_path) -> dict:
+    """Dictionary with project data for Fluka"""
+    with open(project_fluka_path, "r") as file_handle:
+        return json.load(file_handle)
+
+
+@pytest.fixture
+def exploding_project() -> dict:
+    """Project with no single-figure zones, so every zone doubles the number of world zone sets"""
+    project = generate_project(30, detectors=2)
+    project["zoneManager"]["zones"] = [
+        zone for zone in project["zoneManager"]["zones"] if not zone["name"].startswith("Core")
+    ]
+    return project
+
+
+@pytest.fixture(scope="session")
+def slow_project() -> dict:
+    """Project whose SHIELD-HIT12A world zone is split into a set for each object for most of the expansion"""
+    return generate_project(2000, detectors=2)
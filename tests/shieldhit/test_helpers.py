@@ -1,4 +1,9 @@
+import random
+from math import ceil, isclose, log10
+
 import pytest
+
+from converter import common
 from converter.shieldhit.geo import format_float
 
 
@@ -23,3 +28,56 @@ def test_format_float_large_example():
     """Test if format float will raise an exception when given bad arguments."""
     with pytest.raises(ValueError):
         format_float(1000000, 2)
+
+
+def reference_format_float(number: float, n: int) -> float:
+    """Formatting without the memoization table, as it was implemented before."""
+    result = number
+    if isclose(result, 0.0, rel_tol=1e-9):
+        return 0.0
+    length = n - 1
+    sign = 1
+    if number < 0:
+        result = abs(number)
+        sign = -1
+        length -= 1
+    whole_length = ceil(log10(result))
+    if whole_length > length - 1:
+        raise ValueError("Number is to big to be formatted.")
+    length -= max(whole_length, 1)
+    result = float(sign * round(result, length))
+    if not isclose(result, number):
+        print(f"WARN: number was truncated when converting: {number} -> {result}")
+    if isclose(result, 0.0, rel_tol=1e-9):
+        return 0.0
+    return result
+
+
+def test_format_float_same_as_reference(capsys: pytest.CaptureFixture) -> None:
+    """Check that results and warnings are the same as without memoization, also when formatted again"""
+    numbers_random = random.Random(0)
+    numbers = [0, -0.0, 1e-12, -1e-12, 999.99999999, -1 / 3, 1e9]
+    numbers += [numbers_random.uniform(-1, 1) * 10 ** numbers_random.randint(-12, 8) for _ in range(2000)]
+
+    for n in (5, 10, 16):
+        for number in numbers * 2:
+            try:
+                expected = repr(reference_format_float(number, n))
+            except ValueError:
+                with pytest.raises(ValueError):
+                    format_float(number, n)
+                continue
+            expected_output = capsys.readouterr().out
+            assert repr(format_float(number, n)) == expected
+            assert capsys.readouterr().out == expected_output
+
+
+def test_format_float_memo_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that the memoization table doesn't grow over the limit"""
+    monkeypatch.setattr(common, "FORMAT_FLOAT_MEMO_SIZE", 10)
+    common._FORMAT_FLOAT_MEMO.clear()
+
+    for number in range(1, 100):
+        assert format_float(number + 0.5, 10) == number + 0.5
+
+    assert len(common._FORMAT_FLOAT_MEMO) <= 10
@@ -1,4 +1,5 @@
-from converter.common import rotate
+from converter import common
+from converter.common import rotate, rotate_vectors
 from scipy.spatial.transform import Rotation
 import math
 import pytest
@@ -42,3 +43,25 @@ def test_rotate(vector: list[float], angles: list[float], degrees: bool):
     result_scipy = r.apply(vector)
 
     assert pytest.approx(result) == result_scipy
+
+
+@pytest.mark.parametrize("angles", [[0, 0, 0], [30, 45, 60], [23, -82, 213], [270, 180, 360]])
+def test_rotate_vectors(angles: list[float]):
+    """Check that rotating vectors at once gives exactly the same results as rotating them one by one."""
+    vectors = [[2.5, 0, 0], [0, 1.25, 0], [0, 0, 7], [2, 4, -7]]
+
+    assert rotate_vectors(vectors, angles) == [rotate(vector, angles) for vector in vectors]
+    r = Rotation.from_euler("xyz", angles, degrees=True)
+    for result, result_scipy in zip(rotate_vectors(vectors, angles), r.apply(vectors)):
+        assert pytest.approx(result) == result_scipy
+
+
+def test_rotation_memo_limit(monkeypatch: pytest.MonkeyPatch):
+    """Check that the table of computed rotations doesn't grow over the limit."""
+    monkeypatch.setattr(common, "ROTATION_MEMO_SIZE", 10)
+    common._ROTATION_MEMO.clear()
+
+    for angle in range(100):
+        assert rotate([1, 0, 0], [0, 0, angle], degrees=False) == rotate([1, 0, 0], [0, 0, angle], degrees=False)
+
+    assert len(common._ROTATION_MEMO) <= 10
@@ -0,0 +1,122 @@
+import copy
+import time
+
+import pytest
+
+from converter.shieldhit.geo import DefaultMaterial
+from converter.shieldhit.parser import ShieldhitParser
+
+
+def slab_project(base_project: dict, slabs_count: int) -> dict:
+    """Project with a stack of `slabs_count` box slabs, each one being a separate zone scored by a zone detector."""
+    project = copy.deepcopy(base_project)
+    water_uuid = project["zoneManager"]["zones"][0]["materialUuid"]
+    figures = [
+        {
+            "name": f"slab_{idx}",
+            "type": "BoxFigure",
+            "uuid": f"figure-{idx}",
+            "geometryData": {
+                "geometryType": "BoxGeometry",
+                "position": [0, 0, idx * 0.1 + 0.05],
+                "rotation": [0, 0, 0],
+                "parameters": {"width": 10, "height": 10, "depth": 0.1},
+            },
+        }
+        for idx in range(slabs_count)
+    ]
+    zones = [
+        {
+            "uuid": f"zone-{idx}",
+            "name": f"slab_zone_{idx}",
+            "materialUuid": water_uuid,
+            "unionOperations": [[{"mode": "union", "objectUuid": f"figure-{idx}"}]],
+        }
+        for idx in range(slabs_count)
+    ]
+    detectors = [
+        {
+            "name": f"slab_detector_{idx}",
+            "uuid": f"detector-{idx}",
+            "geometryData": {
+                "geometryType": "Zone",
+                "position": [0, 0, 0],
+                "rotation": [0, 0, 0],
+                "parameters": {"zoneUuid": f"zone-{idx}"},
+            },
+        }
+        for idx in range(slabs_count)
+    ]
+    filter_uuid = project["scoringManager"]["filters"][0]["uuid"]
+    outputs = [
+        {
+            "name": f"slab_{idx}",
+            "detectorUuid": f"detector-{idx}",
+            "quantities": [
+                {"name": "Dose", "keyword": "Dose", "modifiers": []},
+                {"name": "Fluence", "keyword": "Fluence", "filter": filter_uuid, "modifiers": []},
+                {"name": "Quantity", "keyword": "Dose", "materialUuid": water_uuid, "modifiers": []},
+            ],
+        }
+        for idx in range(slabs_count)
+    ]
+
+    project["figureManager"]["figures"] = figures
+    project["zoneManager"]["zones"] = zones
+    project["detectorManager"]["detectors"] = detectors
+    project["scoringManager"]["outputs"] = outputs
+    project["specialComponentsManager"] = {}
+    return project
+
+
+def test_material_ids(project_shieldhit_json):
+    """Check that material ids take into account default materials, which are not present in mat.dat"""
+    parser = ShieldhitParser()
+    parser.parse_configs(project_shieldhit_json)
+
+    mat_dat_idx = 0
+    for material in project_shieldhit_json["materialManager"]["materials"]:
+        if DefaultMaterial.is_default_material(material["icru"]):
+            assert parser._get_material_id(material["uuid"]) == material["icru"]
+        else:
+            mat_dat_idx += 1
+            assert parser._get_material_id(material["uuid"]) == mat_dat_idx
+        assert parser._get_material_by_uuid(material["uuid"]).name == material["name"]
+
+    with pytest.raises(ValueError, match="No material with uuid"):
+        parser._get_material_id("not-existing-uuid")
+
+
+def test_lookup_after_reparse(project_shieldhit_json):
+    """Check that lookup maps are rebuilt when the parser is reused for another project"""
+    parser = ShieldhitParser()
+    parser.parse_configs(slab_project(project_shieldhit_json, 5))
+    parser.parse_configs(project_shieldhit_json)
+
+    with pytest.raises(ValueError, match="No zone with uuid"):
+        parser._get_zone_index_by_uuid("zone-1")
+    with pytest.raises(ValueError, match="No figure with uuid"):
+        parser._get_figure_index_by_uuid("figure-1")
+    with pytest.raises(ValueError, match="No detector with uuid"):
+        parser._get_detector_by_uuid("detector-1")
+
+    first_zone = project_shieldhit_json["zoneManager"]["zones"][0]
+    assert parser._get_zone_index_by_uuid(first_zone["uuid"]) == 1
+
+
+@pytest.mark.parametrize("slabs_count", [1000, 4000])
+def test_parsing_large_project(project_shieldhit_json, slabs_count: int):
+    """Benchmark parsing of a project with thousands of figures, zones, detectors and outputs"""
+    project = slab_project(project_shieldhit_json, slabs_count)
+    parser = ShieldhitParser()
+
+    start = time.perf_counter()
+    parser.parse_configs(project)
+    elapsed = time.perf_counter() - start
+
+    assert parser._get_figure_index_by_uuid(f"figure-{slabs_count - 1}") == slabs_count - 1
+    assert parser._get_zone_index_by_uuid(f"zone-{slabs_count - 1}") == slabs_count
+    assert parser.detect_config.detectors[-1].first_zone_id == slabs_count
+    assert parser.detect_config.outputs[-1].geometry == f"slab_detector_{slabs_count - 1}"
+    # list scans in lookups called in loops used to make this quadratic in the number of slabs
+    assert elapsed < 5.0
@@ -0,0 +1,111 @@
+import itertools
+import random
+import time
+
+import pytest
+
+from converter.shieldhit.parser import ShieldhitParser
+from converter.shieldhit.world_zone import WorldZoneTooComplexError, calculate_world_zone_operations
+
+
+def cartesian_world_zone(zones_operators: list[set[int]], world_zone_figure: int) -> list[set[int]]:
+    """Reference implementation: plain Cartesian-product expansion filtered for contradictions."""
+    world_zone = [{world_zone_figure}]
+    for figure_set in zones_operators:
+        world_zone = [{*w_figure_set, -figure} for w_figure_set in world_zone for figure in figure_set]
+    return [x for x in world_zone if not any(abs(i) == abs(j) for i, j in itertools.combinations(x, 2))]
+
+
+def is_inside(figure_sets: list[set[int]], inside_figures: set[int]) -> bool:
+    """Check if a point lying inside exactly `inside_figures` belongs to the union of `figure_sets`."""
+    return any(all((op in inside_figures) if op > 0 else (-op not in inside_figures) for op in s) for s in figure_sets)
+
+
+def random_zones(rng: random.Random, figures_count: int, zones_count: int) -> list[set[int]]:
+    """Random zones in the format produced by `ShieldhitParser._parse_csg_operations`"""
+    zones = []
+    for _ in range(zones_count):
+        figures = rng.sample(range(1, figures_count + 1), rng.randint(1, 3))
+        zones.append({figures[0], *[-figure for figure in figures[1:]]})
+    return zones
+
+
+def test_project_world_zone(project_shieldhit_json):
+    """Check that the world zone of the example project is the same as with the Cartesian expansion"""
+    parser = ShieldhitParser()
+    parser.parse_configs(project_shieldhit_json)
+    world_figure = len(project_shieldhit_json["figureManager"]["figures"]) + 1
+    zones_count = len(project_shieldhit_json["zoneManager"]["zones"])
+    zones = [figure_set for zone in parser.geo_mat_config.zones[:zones_count] for figure_set in zone.figures_operators]
+    world_zone = [
+        figure_set
+        for zone in parser.geo_mat_config.zones[zones_count:]
+        for figure_set in zone.figures_operators
+        if world_figure in figure_set
+    ]
+
+    assert world_zone == cartesian_world_zone(zones, world_figure)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_world_zone_describes_the_same_space(seed: int):
+    """Check (for all figure configurations) that pruned world zone covers the same space as the reference one"""
+    rng = random.Random(seed)
+    figures_count = 5
+    world_figure = figures_count + 1
+    zones = random_zones(rng, figures_count, rng.randint(1, 6))
+
+    expected = cartesian_world_zone(zones, world_figure)
+    result = calculate_world_zone_operations(zones, world_figure)
+
+    assert len(result) <= len(expected)
+    for inside in itertools.product([False, True], repeat=world_figure):
+        inside_figures = {idx + 1 for idx, is_in in enumerate(inside) if is_in}
+        assert is_inside(result, inside_figures) == is_inside(expected, inside_figures)
+
+
+def test_world_zone_without_redundant_sets():
+    """Check that duplicated and subsumed sets are removed"""
+    # subtracting {1, -2} gives {3, -1} and {3, 2}; subtracting {2} removes the second one
+    assert calculate_world_zone_operations([{1, -2}, {2}], 3) == [{3, -1, -2}]
+    # subtracting {1, 2} twice would result in 4 sets, two of them duplicated and two redundant
+    assert calculate_world_zone_operations([{1, 2}, {1, 2}], 3) == [{3, -1}, {3, -2}]
+
+
+def test_world_zone_limit():
+    """Check that exceeding the maximal number of sets results in a clear error"""
+    # independent zones can't be simplified, so the number of sets doubles with every zone
+    zones = [{2 * idx + 1, -(2 * idx + 2)} for idx in range(6)]
+    assert len(calculate_world_zone_operations(zones, 13, max_sets=64)) == 64
+    with pytest.raises(WorldZoneTooComplexError, match="more than 63 figure sets"):
+        calculate_world_zone_operations(zones, 13, max_sets=63)
+
+
+def container_zones(objects_count: int) -> list[set[int]]:
+    """
+    Zones of a container holding hollow objects: the container zone subtracts outer figures of all objects,
+    each object has a zone subtracting its inner figure and the inner figure is a zone on its own.
+    """
+    outer_figures = range(2, 2 * objects_count + 2, 2)
+    zones = [{1, *[-figure for figure in outer_figures]}]
+    for figure in outer_figures:
+        zones += [{figure, -(figure + 1)}, {figure + 1}]
+    return zones
+
+
+@pytest.mark.parametrize("objects_count", [125, 250, 500, 1000])
+def test_world_zone_scaling(objects_count: int):
+    """Benchmark world zone construction for geometries with growing number of zones"""
+    zones = container_zones(objects_count)
+    world_figure = 2 * objects_count + 2
+
+    # subtracting the container splits the world zone into a set for each object, the objects merge them back
+    with pytest.raises(WorldZoneTooComplexError):
+        calculate_world_zone_operations(zones, world_figure, max_sets=objects_count)
+
+    start = time.perf_counter()
+    result = calculate_world_zone_operations(zones, world_figure)
+    elapsed = time.perf_counter() - start
+
+    assert result == [{world_figure, *[-figure for figure in range(1, world_figure)]}]
+    assert elapsed < 5.0
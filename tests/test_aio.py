@@ -0,0 +1,166 @@
+import asyncio
+import contextlib
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from converter import aio
+from converter.aio import AsyncConverter
+from converter.api import get_parser_from_str, run_parser
+from converter.cache import ConversionCache
+from converter.deadline import ConversionTimeout
+
+
+def test_convert(project_shieldhit_json: dict, tmp_path: Path) -> None:
+    """Check that async conversion gives the same files as the synchronous one"""
+    expected = run_parser(get_parser_from_str("shieldhit"), project_shieldhit_json)
+
+    configs_json = asyncio.run(AsyncConverter().convert("shieldhit", project_shieldhit_json, tmp_path / "output"))
+
+    assert configs_json == expected
+    for file_name, content in expected.items():
+        assert (tmp_path / "output" / file_name).read_text() == content
+
+
+def test_event_loop_responsive(project_shieldhit_json: dict, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that the event loop keeps running other tasks during many concurrent conversions"""
+    running = {"now": 0, "max": 0}
+    lock = threading.Lock()
+    convert = aio._convert
+
+    def heavy_convert(*args) -> dict:
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        # make the conversion as long as for a big project, without using big files in tests
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            pass
+        with lock:
+            running["now"] -= 1
+        return convert(*args)
+
+    monkeypatch.setattr(aio, "_convert", heavy_convert)
+    converter = AsyncConverter(max_concurrent=3)
+
+    async def convert_many() -> tuple[list[dict], int]:
+        conversions = asyncio.gather(*(converter.convert("shieldhit", project_shieldhit_json) for _ in range(12)))
+        ticks = 0
+        while not conversions.done():
+            await asyncio.sleep(0.005)
+            ticks += 1
+        return await conversions, ticks
+
+    results, ticks = asyncio.run(convert_many())
+
+    assert len(results) == 12
+    assert running["max"] == 3
+    # conversions take at least 0.8 s, a blocked loop would tick about once per conversion
+    assert ticks > 24
+
+
+def test_cancel(project_shieldhit_json: dict, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that cancelled conversions don't save files and waiting ones never start"""
+    release = threading.Event()
+    started = []
+    convert = aio._convert
+
+    def slow_convert(*args) -> dict:
+        started.append(1)
+        release.wait(timeout=30)
+        return convert(*args)
+
+    monkeypatch.setattr(aio, "_convert", slow_convert)
+    converter = AsyncConverter(max_concurrent=1)
+
+    async def cancel_conversions() -> None:
+        running = asyncio.create_task(converter.convert("shieldhit", project_shieldhit_json, tmp_path / "running"))
+        waiting = asyncio.create_task(converter.convert("shieldhit", project_shieldhit_json, tmp_path / "waiting"))
+        await asyncio.sleep(0.1)
+        running.cancel()
+        waiting.cancel()
+        for task in (running, waiting):
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        # the cancelled conversion still runs in the executor, so the next one waits for it
+        following = asyncio.create_task(converter.convert("shieldhit", project_shieldhit_json))
+        await asyncio.sleep(0.1)
+        assert len(started) == 1
+        release.set()
+        await following
+
+    asyncio.run(cancel_conversions())
+
+    assert len(started) == 2
+    assert not (tmp_path / "running").exists()
+    assert not (tmp_path / "waiting").exists()
+
+
+def test_process_executor(project_shieldhit_json: dict) -> None:
+    """Check conversion in a pool of processes"""
+    expected = run_parser(get_parser_from_str("shieldhit"), project_shieldhit_json)
+
+    async def convert_in_processes() -> list[dict]:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            converter = AsyncConverter(max_concurrent=2, executor=executor)
+            return await asyncio.gather(*(converter.convert("shieldhit", project_shieldhit_json) for _ in range(4)))
+
+    assert asyncio.run(convert_in_processes()) == [expected] * 4
+
+
+def test_process_executor_with_cache(project_shieldhit_json: dict, tmp_path: Path) -> None:
+    """Check that the cache is used around conversions in a pool of processes, and shared with run_parser"""
+    expected = run_parser(get_parser_from_str("shieldhit"), project_shieldhit_json)
+    cache = ConversionCache(tmp_path / "cache")
+
+    async def convert_twice() -> list[dict]:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            converter = AsyncConverter(executor=executor, cache=cache)
+            return [await converter.convert("shieldhit", project_shieldhit_json) for _ in range(2)]
+
+    assert asyncio.run(convert_twice()) == [expected] * 2
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.stores) == (1, 1, 1)
+    assert run_parser(get_parser_from_str("shieldhit"), project_shieldhit_json, cache=cache) == expected
+    assert cache.stats.hits == 2
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_timeout(processes: bool, slow_project: dict, project_shieldhit_json: dict) -> None:
+    """Check that a conversion running out of time is aborted, so the next one gets its turn"""
+
+    async def convert_with_timeout() -> tuple[float, dict]:
+        with ProcessPoolExecutor(max_workers=1) if processes else contextlib.nullcontext() as executor:
+            converter = AsyncConverter(max_concurrent=1, executor=executor)
+            start = time.monotonic()
+            slow = asyncio.create_task(converter.convert("shieldhit", slow_project, timeout=0.2))
+            following = asyncio.create_task(converter.convert("shieldhit", project_shieldhit_json))
+            with pytest.raises(ConversionTimeout):
+                await slow
+            elapsed = time.monotonic() - start
+            return elapsed, await following
+
+    elapsed, configs_json = asyncio.run(convert_with_timeout())
+
+    # the whole conversion takes seconds
+    assert elapsed < 2
+    assert configs_json == run_parser(get_parser_from_str("shieldhit"), project_shieldhit_json)
+
+
+def test_cancelled_conversion_stops_at_timeout(slow_project: dict, project_shieldhit_json: dict) -> None:
+    """Check that a cancelled conversion with a timeout gives its turn back once the timeout passes"""
+    converter = AsyncConverter(max_concurrent=1)
+
+    async def cancel_and_convert() -> float:
+        slow = asyncio.create_task(converter.convert("shieldhit", slow_project, timeout=0.3))
+        await asyncio.sleep(0.1)
+        slow.cancel()
+        start = time.monotonic()
+        await converter.convert("shieldhit", project_shieldhit_json)
+        return time.monotonic() - start
+
+    # the whole conversion takes seconds
+    assert asyncio.run(cancel_and_convert()) < 2
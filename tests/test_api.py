@@ -0,0 +1,236 @@
+import io
+import json
+import subprocess
+import sys
+import tarfile
+from importlib.metadata import EntryPoint
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from converter import api, common
+from converter.api import get_parser_from_str, run_parser, run_parsers, save_parser_output
+from converter.archive import write_archive
+from converter.common import Parser
+from converter.main import main
+from converter.topas.parser import TopasParser
+
+
+@pytest.mark.parametrize("parser_type", ["shieldhit", "fluka", "geant4", "topas"])
+def test_configs_rendered_once(
+    parser_type: str,
+    project_shieldhit_json: dict,
+    project_fluka_json: dict,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Check that run_parser renders the files only once, even if it prints and saves them"""
+    parser = get_parser_from_str(parser_type)
+    render_calls = []
+    render_configs = parser._render_configs
+
+    def counting_render_configs() -> dict:
+        render_calls.append(1)
+        return render_configs()
+
+    monkeypatch.setattr(parser, "_render_configs", counting_render_configs)
+    project = project_shieldhit_json if parser_type != "fluka" else project_fluka_json
+
+    configs_json = run_parser(parser, project, tmp_path, silent=False)
+
+    assert len(render_calls) == 1
+    for file_name, content in configs_json.items():
+        assert (tmp_path / file_name).read_text() == content
+
+
+def test_parse_configs_drops_rendered_configs(project_shieldhit_json: dict) -> None:
+    """Check that files are rendered again after parsing another project"""
+    parser = get_parser_from_str("topas")
+    parser.parse_configs(project_shieldhit_json)
+    number_of_particles = project_shieldhit_json["beam"]["numberOfParticles"]
+    assert f"i:So/Demo/NumberOfHistoriesInRun = {number_of_particles}" in parser.get_configs_json()["topas_config.txt"]
+
+    changed_project = dict(project_shieldhit_json, beam=dict(project_shieldhit_json["beam"], numberOfParticles=123))
+    parser.parse_configs(changed_project)
+    assert "i:So/Demo/NumberOfHistoriesInRun = 123" in parser.get_configs_json()["topas_config.txt"]
+
+
+class OverridingTopasParser(TopasParser):
+    """Parser overriding parse_configs without calling it, like parsers written before `_parse_configs`"""
+
+    def parse_configs(self, json: dict) -> None:
+        self._parse_configs(json)
+
+
+def test_overridden_parse_configs_drops_rendered_configs(project_shieldhit_json: dict) -> None:
+    """Check that files are rendered again after parsing another project, even if parse_configs is overridden"""
+    parser = OverridingTopasParser()
+    parser.parse_configs(project_shieldhit_json)
+    assert "NumberOfHistoriesInRun = 123" not in parser.get_configs_json()["topas_config.txt"]
+
+    changed_project = dict(project_shieldhit_json, beam=dict(project_shieldhit_json["beam"], numberOfParticles=123))
+    parser.parse_configs(changed_project)
+    assert "i:So/Demo/NumberOfHistoriesInRun = 123" in parser.get_configs_json()["topas_config.txt"]
+
+
+def test_rendered_configs_not_modified_by_caller(project_shieldhit_json: dict) -> None:
+    """Check that modifying the returned dict doesn't affect the files returned later"""
+    parser: Parser = get_parser_from_str("shieldhit")
+    parser.parse_configs(project_shieldhit_json)
+    parser.get_configs_json().pop("geo.dat")
+    assert "geo.dat" in parser.get_configs_json()
+
+
+def test_run_parsers(project_fluka_json: dict, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that converting for many simulators at once gives the same files as separate conversions"""
+    parsed_figures = []
+    parse_figure = common.parse_figure
+
+    def counting_parse_figure(figure_dict: dict):
+        parsed_figures.append(figure_dict["uuid"])
+        return parse_figure(figure_dict)
+
+    monkeypatch.setattr(common, "parse_figure", counting_parse_figure)
+    targets = ["shieldhit", "fluka", "geant4"]
+
+    configs_jsons = run_parsers(targets, project_fluka_json, tmp_path)
+
+    figures_count = len(project_fluka_json["figureManager"]["figures"])
+    # every figure and the world zone figure are parsed only once
+    assert len(parsed_figures) == figures_count + 1
+    for target in targets:
+        assert configs_jsons[target] == run_parser(get_parser_from_str(target), project_fluka_json)
+        for file_name, content in configs_jsons[target].items():
+            assert (tmp_path / target / file_name).read_text() == content
+
+
+def test_run_parsers_cli(project_fluka_json: dict, tmp_path: Path) -> None:
+    """Check the CLI option converting for many simulators at once"""
+    project_path = tmp_path / "project.json"
+    project_path.write_text(json.dumps(project_fluka_json))
+
+    main([str(project_path), str(tmp_path / "output"), "-s", "--targets", "fluka", "shieldhit"])
+
+    assert (tmp_path / "output" / "fluka" / "fl_sim.inp").exists()
+    assert (tmp_path / "output" / "shieldhit" / "geo.dat").exists()
+    assert not (tmp_path / "output" / "geant4").exists()
+
+
+def test_run_parsers_invalid_target(project_fluka_json: dict, tmp_path: Path) -> None:
+    """Check that nothing is converted if one of the targets is invalid"""
+    with pytest.raises(ValueError, match="Parser type must be"):
+        run_parsers(["shieldhit", "mcnp"], project_fluka_json, tmp_path / "output")
+    assert not (tmp_path / "output").exists()
+
+
+def test_parsers_imported_lazily() -> None:
+    """Check that only the requested parser is imported"""
+    code = "import sys\nfrom converter import api\napi.get_parser_from_str('topas')\nprint(' '.join(sys.modules))\n"
+    modules = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+
+    assert "converter.topas.parser" in modules
+    for module in ["converter.shieldhit.parser", "converter.fluka.parser", "converter.geant4.parser", "defusedxml"]:
+        assert module not in modules
+
+
+def test_parser_entry_points(project_shieldhit_json: dict, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that parsers registered through entry points can be used"""
+    entry_point = EntryPoint(
+        name="Plugin", value="converter.topas.parser:TopasParser", group=api.PARSERS_ENTRY_POINT_GROUP
+    )
+    monkeypatch.setattr(api, "_parser_entry_points", lambda: {"plugin": entry_point})
+
+    assert api.available_parsers() == ["shieldhit", "topas", "fluka", "geant4", "plugin"]
+    assert isinstance(get_parser_from_str("plugin"), TopasParser)
+    with pytest.raises(ValueError, match="Parser type must be one of: shieldhit, topas, fluka, geant4, plugin"):
+        get_parser_from_str("mcnp")
+
+
+@pytest.mark.parametrize("parser_type", ["shieldhit", "fluka", "geant4", "topas"])
+def test_streamed_configs(parser_type: str, project_shieldhit_json: dict, project_fluka_json: dict, tmp_path: Path):
+    """Check that files written piece by piece are the same as the rendered ones"""
+    project = project_shieldhit_json if parser_type != "fluka" else project_fluka_json
+    expected = run_parser(get_parser_from_str(parser_type), project)
+
+    parser = get_parser_from_str(parser_type)
+    file_names = save_parser_output(parser, project, tmp_path)
+
+    assert file_names == list(expected)
+    for file_name, content in expected.items():
+        assert (tmp_path / file_name).read_text() == content
+    # files were not kept in memory
+    assert parser._configs_json is None
+    chunks = list(parser.iter_configs())
+    assert {file_name for file_name, _ in chunks} == set(expected)
+
+
+def test_shieldhit_streamed_in_pieces(project_shieldhit_json: dict) -> None:
+    """Check that big SHIELD-HIT12A files are rendered one element at a time"""
+    parser = get_parser_from_str("shieldhit")
+    parser.parse_configs(project_shieldhit_json)
+
+    chunks_count = {}
+    for file_name, _ in parser.iter_configs():
+        chunks_count[file_name] = chunks_count.get(file_name, 0) + 1
+
+    assert chunks_count["geo.dat"] > len(project_shieldhit_json["figureManager"]["figures"])
+    assert chunks_count["detect.dat"] > len(project_shieldhit_json["detectorManager"]["detectors"])
+    assert chunks_count["info.json"] == 1
+
+
+class DuplicateNamesParser(Parser):
+    """Parser yielding files with names used by earlier files."""
+
+    def _parse_configs(self, json: dict) -> None:
+        pass
+
+    def _iter_configs(self) -> Iterator[tuple[str, str]]:
+        yield from super()._iter_configs()
+        yield "beam.dat", "first "
+        yield "beam.dat", "beam\n"
+        yield "sobp.dat", "sobp\n"
+        yield "beam.dat", "second beam\n"
+        yield "beam_2.dat", "third beam\n"
+        yield "sobp", "no extension\n"
+        yield "sobp", "\n"
+
+
+def test_duplicate_file_names(tmp_path: Path) -> None:
+    """Check that files with duplicate names get the same names whether they are saved, returned or archived"""
+    expected_names = ["info.json", "beam.dat", "sobp.dat", "beam_2.dat", "beam_2_2.dat", "sobp"]
+    parser = DuplicateNamesParser()
+    parser.parse_configs({})
+
+    file_names = parser.save_configs(str(tmp_path))
+    archive_f = io.BytesIO()
+    archived_names = write_archive(parser.iter_configs(), archive_f, "tar")
+    configs_json = parser.get_configs_json()
+
+    assert file_names == archived_names == list(configs_json) == expected_names
+    assert configs_json["beam.dat"] == "first beam\n"
+    assert configs_json["beam_2.dat"] == "second beam\n"
+    assert configs_json["beam_2_2.dat"] == "third beam\n"
+    for file_name, content in configs_json.items():
+        assert (tmp_path / file_name).read_text() == content
+    with tarfile.open(fileobj=io.BytesIO(archive_f.getvalue())) as tar_f:
+        assert {member.name: tar_f.extractfile(member).read().decode() for member in tar_f} == configs_json
+
+
+def test_iter_template() -> None:
+    """Check that the template rendered piece by piece is the same as formatted at once"""
+    template = "{a:>5}|{b!r}|{c}|{{escaped}}|{d:.2f}\n"
+    fields = {"a": 12, "b": "text", "c": "chunk", "d": 1 / 3}
+
+    assert "".join(common.iter_template(template, fields)) == template.format(**fields)
+    fields["c"] = iter(["ch", "", "unk"])
+    assert "".join(common.iter_template(template, fields)) == template.format(**dict(fields, c="chunk"))
+
+
+def test_partial_template() -> None:
+    """Check that the template rendered in two steps is the same as formatted at once"""
+    template = "{a:>5}|{b!r}|{c}|{{escaped}}|{d:.2f}\n"
+    fields = {"a": 12, "b": "text", "c": "{braces}", "d": 1 / 3}
+
+    partial = common.partial_template(template, {"b": "text", "c": "{braces}"})
+    assert partial.format(a=12, d=1 / 3) == template.format(**fields)
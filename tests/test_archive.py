@@ -0,0 +1,123 @@
+import io
+import json
+import subprocess
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from converter.api import get_parser_from_str, run_parser, save_parser_archive
+from converter.archive import archive_format_from_path, write_archive
+from converter.main import main
+
+
+class PipeStream(io.RawIOBase):
+    """Write-only stream which can't seek or tell, like a pipe."""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.data.extend(data)
+        return len(data)
+
+
+def read_archive(data: bytes, archive_format: str) -> dict:
+    """Return dict with file names and their content."""
+    if archive_format == "zip":
+        with zipfile.ZipFile(io.BytesIO(data)) as zip_f:
+            return {name: zip_f.read(name).decode("utf-8") for name in zip_f.namelist()}
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar_f:
+        return {member.name: tar_f.extractfile(member).read().decode("utf-8") for member in tar_f.getmembers()}
+
+
+@pytest.mark.parametrize("archive_format", ["tar", "tar.gz", "zip"])
+def test_archive_to_pipe(archive_format: str, project_shieldhit_json: dict) -> None:
+    """Check that the archive written to an unseekable stream holds the converted files"""
+    expected = run_parser(get_parser_from_str("shieldhit"), project_shieldhit_json)
+    pipe = PipeStream()
+
+    file_names = save_parser_archive(get_parser_from_str("shieldhit"), project_shieldhit_json, pipe, archive_format)
+
+    assert file_names == list(expected)
+    assert read_archive(bytes(pipe.data), archive_format) == expected
+
+
+def test_archive_to_path(project_shieldhit_json: dict, tmp_path: Path) -> None:
+    """Check that the archive is saved to a file without any other files"""
+    expected = run_parser(get_parser_from_str("shieldhit"), project_shieldhit_json)
+
+    save_parser_archive(get_parser_from_str("shieldhit"), project_shieldhit_json, tmp_path / "output.zip", "zip")
+
+    assert [path.name for path in tmp_path.iterdir()] == ["output.zip"]
+    assert read_archive((tmp_path / "output.zip").read_bytes(), "zip") == expected
+
+
+def test_archive_of_chunks() -> None:
+    """Check that chunks of each file are joined"""
+    chunks = [("a.txt", "first "), ("a.txt", "line\n"), ("b.txt", ""), ("c.txt", "c")]
+    for archive_format in ["tar", "zip"]:
+        archive_f = io.BytesIO()
+        assert write_archive(chunks, archive_f, archive_format) == ["a.txt", "b.txt", "c.txt"]
+        assert read_archive(archive_f.getvalue(), archive_format) == {
+            "a.txt": "first line\n",
+            "b.txt": "",
+            "c.txt": "c",
+        }
+
+    with pytest.raises(ValueError, match="Archive format must be"):
+        write_archive(chunks, io.BytesIO(), "rar")
+
+
+def test_archive_format_from_path() -> None:
+    """Check guessing the archive format"""
+    assert archive_format_from_path("output.tar.gz") == "tar.gz"
+    assert archive_format_from_path("output.TGZ") == "tar.gz"
+    assert archive_format_from_path(Path("output.tar")) == "tar"
+    assert archive_format_from_path("output.zip") == "zip"
+    assert archive_format_from_path("output") is None
+
+
+def test_archive_cli(project_shieldhit_json: dict, project_shieldhit_path: Path, tmp_path: Path) -> None:
+    """Check the CLI options writing the archive to a file and to the standard output"""
+    expected = run_parser(get_parser_from_str("shieldhit"), project_shieldhit_json)
+
+    main([str(project_shieldhit_path), "-s", "--archive", str(tmp_path / "output.tgz")])
+    assert read_archive((tmp_path / "output.tgz").read_bytes(), "tar.gz") == expected
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "converter.main",
+            str(project_shieldhit_path),
+            "--archive",
+            "-",
+            "--archive-format",
+            "zip",
+        ],
+        capture_output=True,
+        check=True,
+    )
+    assert read_archive(result.stdout, "zip") == expected
+
+
+def test_archive_cli_with_targets(project_shieldhit_path: Path, tmp_path: Path) -> None:
+    """Check that archive can't be used for many simulators"""
+    with pytest.raises(SystemExit):
+        main([str(project_shieldhit_path), "--targets", "shieldhit", "fluka", "--archive", str(tmp_path / "a.tar")])
+
+
+def test_archive_format_option(project_shieldhit_json: dict, tmp_path: Path) -> None:
+    """Check that the archive format is taken from the option even if the extension is different"""
+    project_path = tmp_path / "project.json"
+    project_path.write_text(json.dumps(project_shieldhit_json))
+
+    main([str(project_path), "-s", "--archive", str(tmp_path / "output.bin"), "--archive-format", "tar"])
+
+    assert "geo.dat" in read_archive((tmp_path / "output.bin").read_bytes(), "tar")
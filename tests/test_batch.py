@@ -0,0 +1,109 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from converter import batch
+from converter.main import main
+
+
+@pytest.fixture
+def projects_dir(tmp_path: Path, project_shieldhit_path: Path) -> Path:
+    """Directory with two valid projects and a broken one"""
+    projects = tmp_path / "projects"
+    projects.mkdir()
+    content = project_shieldhit_path.read_text()
+    (projects / "first.json").write_text(content)
+    (projects / "second.json").write_text(content)
+    (projects / "broken.json").write_text(json.dumps({"beam": {}}))
+    return projects
+
+
+def test_collect_input_files(projects_dir: Path, tmp_path: Path) -> None:
+    """Check that input files are collected from a directory, a glob and a manifest"""
+    from_dir = batch.collect_input_files(str(projects_dir))
+    assert [path.name for path in from_dir] == ["broken.json", "first.json", "second.json"]
+
+    from_glob = batch.collect_input_files(str(projects_dir / "*st.json"))
+    assert [path.name for path in from_glob] == ["first.json"]
+
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(f"# projects to convert\nprojects/second.json\n\n{projects_dir / 'first.json'}\n")
+    from_manifest = batch.collect_input_files(manifest=manifest)
+    assert from_manifest == [projects_dir / "second.json", projects_dir / "first.json"]
+
+
+def test_plan_jobs_with_unique_output_dirs(tmp_path: Path) -> None:
+    """Check that files with the same names get different output directories"""
+    jobs = batch.plan_jobs([Path("a/project.json"), Path("b/project.json")], tmp_path)
+    assert [job.output_dir for job in jobs] == [tmp_path / "project", tmp_path / "project_2"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch(projects_dir: Path, tmp_path: Path, workers: int) -> None:
+    """Check that failing job doesn't stop the others and is reported"""
+    output_dir = tmp_path / "output"
+    jobs = batch.plan_jobs(batch.collect_input_files(str(projects_dir)), output_dir)
+
+    results = batch.run_batch(jobs, "shieldhit", workers=workers)
+
+    assert [result.succeeded for result in results] == [False, True, True]
+    assert results[0].error.startswith("KeyError")
+    for name in ("first", "second"):
+        assert sorted(path.name for path in (output_dir / name).iterdir()) == [
+            "beam.dat",
+            "detect.dat",
+            "geo.dat",
+            "info.json",
+            "mat.dat",
+        ]
+
+
+def test_batch_cli(projects_dir: Path, tmp_path: Path) -> None:
+    """Check batch subcommand of the CLI and its report"""
+    output_dir = tmp_path / "output"
+
+    exit_code = main(
+        ["batch", str(output_dir), "shieldhit", "-i", str(projects_dir), "-j", "2", "--max-jobs-per-worker", "1"]
+    )
+
+    assert exit_code == 1
+    report = json.loads((output_dir / batch.REPORT_FILE_NAME).read_text())
+    assert report["total"] == 3
+    assert report["succeeded"] == 2
+    assert report["failed"] == 1
+    assert report["jobs"][0]["input_file"] == str(projects_dir / "broken.json")
+    assert (output_dir / "first" / "geo.dat").exists()
+
+
+def test_diagnostics_in_results(project_shieldhit_json: dict, tmp_path: Path) -> None:
+    """Check that warnings of each job are kept in its result"""
+    project = json.loads(json.dumps(project_shieldhit_json))
+    project["figureManager"]["figures"][0]["geometryData"]["position"] = [1.2345678e-12, 0.0, 0.0]
+    input_file = tmp_path / "truncated.json"
+    input_file.write_text(json.dumps(project))
+
+    result = batch.convert_job("shieldhit", batch.BatchJob(input_file, tmp_path / "output"))
+
+    assert result.succeeded
+    assert [entry["context"]["figure"] for entry in result.diagnostics] == [
+        project["figureManager"]["figures"][0]["name"]
+    ]
+
+
+def test_batch_cli_inputs(projects_dir: Path, tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Check that the batch subcommand takes either a source or a manifest and fails without input files"""
+    output_dir = tmp_path / "output"
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(f"{projects_dir / 'first.json'}\n")
+
+    assert main(["batch", str(output_dir), "shieldhit", "--manifest", str(manifest), "-j", "1"]) == 0
+    assert (output_dir / "first" / "geo.dat").exists()
+
+    with pytest.raises(SystemExit):
+        main(["batch", str(output_dir), "-i", str(projects_dir), "-m", str(manifest)])
+    with pytest.raises(SystemExit):
+        main(["batch", str(output_dir)])
+
+    assert main(["batch", str(output_dir), "-i", str(tmp_path / "missing" / "*.json")]) == 1
+    assert "No input files found" in capsys.readouterr().out
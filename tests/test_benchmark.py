@@ -0,0 +1,202 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from converter.api import get_parser_from_str, run_parser
+from converter.benchmark.generator import generate_project
+from converter.benchmark.regression import StageDiff, check_regressions, compare, format_diff_table
+from converter.benchmark import runner
+from converter.benchmark.runner import (
+    BACKENDS,
+    load_baseline,
+    measure_micro,
+    measure_object_memory,
+    normalize,
+    run_benchmarks,
+    save_baseline,
+)
+from converter.main import main
+
+
+def test_generator_deterministic() -> None:
+    """Check that the same seed gives the same project and a different one doesn't"""
+    assert generate_project(20, seed=1) == generate_project(20, seed=1)
+    assert generate_project(20, seed=1) != generate_project(20, seed=2)
+
+
+@pytest.mark.parametrize("size", [0, 1, 30])
+def test_generator_sizes(size: int) -> None:
+    """Check the number of generated objects"""
+    project = generate_project(size, detectors=4)
+
+    assert len(project["figureManager"]["figures"]) == 2 * size + 1
+    assert len(project["figureManager"]["figures"][0]["children"]) == size
+    assert len(project["zoneManager"]["zones"]) == 2 * size + 1
+    assert len(project["detectorManager"]["detectors"]) == 4
+    assert len(project["scoringManager"]["outputs"]) == 4
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_generated_project_converts(backend: str) -> None:
+    """Check that the generated project is valid for every simulator"""
+    configs_json = run_parser(get_parser_from_str(backend), generate_project(30))
+
+    assert all(configs_json.values())
+
+
+def test_shieldhit_output_scales() -> None:
+    """Check that every generated zone and detector gets to the SHIELD-HIT12A files"""
+    configs_json = run_parser(get_parser_from_str("shieldhit"), generate_project(30, detectors=6))
+
+    # zones of the objects and the world figure, then the world zone and the black hole around it
+    zones = configs_json["geo.dat"].split("END")[1].strip().splitlines()
+    assert len(zones) == 2 * 30 + 1 + 2
+    assert configs_json["detect.dat"].count("Geometry") == 6
+
+
+def test_run_benchmarks(tmp_path: Path) -> None:
+    """Check that the results of every backend and size are saved as a baseline"""
+    report = run_benchmarks(["shieldhit", "fluka"], [0, 3], repeats=1)
+    save_baseline(report, tmp_path / "baseline.json")
+
+    assert load_baseline(tmp_path / "baseline.json") == report
+    assert [(result["backend"], result["size"]) for result in report["results"]] == [
+        ("shieldhit", 0),
+        ("fluka", 0),
+        ("shieldhit", 3),
+        ("fluka", 3),
+    ]
+    for result in report["results"]:
+        assert result["seconds"] > 0
+        assert result["peak_memory"] > 0
+        assert result["output_bytes"] > 0
+        assert "parse" in result["stages"]
+
+
+def test_benchmark_cli(tmp_path: Path) -> None:
+    """Check the benchmark subcommand"""
+    assert (
+        main(
+            [
+                "benchmark",
+                "--sizes",
+                "2",
+                "--backends",
+                "topas",
+                "--repeats",
+                "1",
+                "-o",
+                str(tmp_path / "baseline.json"),
+                "--save-projects",
+                str(tmp_path / "projects"),
+            ]
+        )
+        == 0
+    )
+
+    report = json.loads((tmp_path / "baseline.json").read_text())
+    assert [result["backend"] for result in report["results"]] == ["topas"]
+    assert json.loads((tmp_path / "projects" / "synthetic_2.json").read_text()) == generate_project(2)
+
+
+def scale_times(report: dict, factor: float) -> dict:
+    """Return copy of the report with all times multiplied by the factor."""
+    report = json.loads(json.dumps(report))
+    for result in report["results"]:
+        result["seconds"] *= factor
+        for stage in result["stages"].values():
+            stage["seconds"] *= factor
+    if "micro" in report:
+        report["micro"] = {name: seconds * factor for name, seconds in report["micro"].items()}
+    return report
+
+
+def test_measure_micro() -> None:
+    """Check that the hot paths are measured"""
+    assert set(measure_micro(repeats=1)) == {"format_float", "world_zone", "geo.dat"}
+
+
+def test_stage_diff() -> None:
+    """Check that only slowdowns above both the relative threshold and the noise floor are regressions"""
+    assert StageDiff("shieldhit/10", "parse", 1.0, 1.3).is_regression(threshold=0.25, min_delta=0.01)
+    assert not StageDiff("shieldhit/10", "parse", 1.0, 1.2).is_regression(threshold=0.25, min_delta=0.01)
+    assert not StageDiff("shieldhit/10", "parse", 0.001, 0.005).is_regression(threshold=0.25, min_delta=0.01)
+    assert not StageDiff("shieldhit/10", "parse", None, 0.5).is_regression()
+    assert StageDiff("shieldhit/10", "parse", 0.2, 0.1).change == pytest.approx(-0.5)
+
+
+def test_compare_and_table() -> None:
+    """Check pairing stages of the reports and the diff table"""
+    baseline = {
+        "results": [
+            {"backend": "fluka", "size": 10, "seconds": 1.0, "stages": {"parse": {"calls": 1, "seconds": 0.5}}}
+        ],
+        "micro": {"format_float": 0.1},
+    }
+    current = {
+        "results": [{"backend": "fluka", "size": 10, "seconds": 2.5, "stages": {"render": {"calls": 1, "seconds": 1}}}],
+        "micro": {"format_float": 0.1},
+    }
+
+    diffs = compare(baseline, current)
+
+    assert [(diff.benchmark, diff.stage, diff.baseline, diff.current) for diff in diffs] == [
+        ("fluka/10", "total", 1.0, 2.5),
+        ("fluka/10", "parse", 0.5, None),
+        ("micro", "format_float", 0.1, 0.1),
+        ("fluka/10", "render", None, 1),
+    ]
+    lines = format_diff_table(diffs).splitlines()
+    assert lines[0].split() == ["benchmark", "stage", "baseline", "ms", "current", "ms", "change"]
+    assert lines[1].split() == ["fluka/10", "total", "1000.000", "2500.000", "+150.0%", "REGRESSION"]
+    assert lines[2].endswith("missing")
+    assert lines[4].endswith("new")
+
+
+def test_check_regressions() -> None:
+    """Check that the matrix of the baseline is run again and slowdowns are found"""
+    report = run_benchmarks(["shieldhit"], [3], repeats=1, micro=False)
+
+    diffs, current = check_regressions(scale_times(report, 1000), retries=0)
+    assert [(result["backend"], result["size"]) for result in current["results"]] == [("shieldhit", 3)]
+    assert "micro" not in current
+    assert not any(diff.is_regression() for diff in diffs)
+
+    diffs, _ = check_regressions(scale_times(report, 0.001), min_delta=0, retries=1)
+    assert any(diff.is_regression(min_delta=0) for diff in diffs)
+
+
+def test_calibration() -> None:
+    """Check that a baseline from a slower machine, or in calibration units, is compared at the current speed"""
+    report = run_benchmarks(["fluka"], [3], repeats=1, micro=False)
+    assert report["calibration"] > 0
+
+    normalized = normalize(report)
+    assert normalized["calibration"] == 1
+    slower_machine = runner.scale_times(report, 3)
+    for baseline in (normalized, slower_machine):
+        for diff in compare(baseline, report):
+            assert diff.baseline == pytest.approx(diff.current, rel=0.01, abs=1e-6)
+
+
+def test_benchmark_check_cli(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Check that the command fails when the conversion is slower than in the baseline"""
+    report = run_benchmarks(["fluka"], [3], repeats=1, micro=False)
+    save_baseline(scale_times(report, 1000), tmp_path / "slow.json")
+    save_baseline(scale_times(report, 0.001), tmp_path / "fast.json")
+
+    assert main(["benchmark", "--check", str(tmp_path / "slow.json"), "-o", str(tmp_path / "current.json")]) == 0
+    assert "No regressions" in capsys.readouterr().out
+    assert load_baseline(tmp_path / "current.json")["results"][0]["backend"] == "fluka"
+
+    assert main(["benchmark", "--check", str(tmp_path / "fast.json"), "--min-delta", "0", "--retries", "0"]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+def test_measure_object_memory() -> None:
+    """Check that the memory taken by objects of every figure, zone and detector class is measured"""
+    memory = measure_object_memory(count=100)
+
+    assert {"BoxFigure", "Zone", "FlukaRegion", "ScoringMesh"} <= set(memory)
+    assert all(size > 0 for size in memory.values())
@@ -0,0 +1,184 @@
+import json
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from converter.api import get_parser_from_str, run_parser
+from converter.cache import ConversionCache, cache_key
+from converter.main import main
+
+
+def store_and_load(cache_dir: Path, index: int) -> bool:
+    """Store entries shared with other processes and check they are always read complete."""
+    cache = ConversionCache(cache_dir, max_bytes=20_000)
+    content = {"geo.dat": "x" * 1000 * (index % 5 + 1)}
+    for key_index in range(20):
+        cache.put(f"{key_index:064x}", content)
+        cached = cache.get(f"{(key_index + 1):064x}")
+        if cached is not None and set(cached["geo.dat"]) != {"x"}:
+            return False
+    return True
+
+
+def test_cache_key(project_shieldhit_json: dict) -> None:
+    """Check that the key depends on the project content, the backend and the converter version only"""
+    key = cache_key(project_shieldhit_json, "shieldhit", "1.0.0")
+    reordered_project = json.loads(json.dumps(project_shieldhit_json, sort_keys=True, indent=4))
+
+    assert cache_key(reordered_project, "SHIELDHIT", "1.0.0") == key
+    assert cache_key(project_shieldhit_json, "topas", "1.0.0") != key
+    assert cache_key(project_shieldhit_json, "shieldhit", "1.0.1") != key
+    changed_project = dict(project_shieldhit_json, beam=dict(project_shieldhit_json["beam"], numberOfParticles=123))
+    assert cache_key(changed_project, "shieldhit", "1.0.0") != key
+
+
+def test_run_parser_with_cache(project_shieldhit_json: dict, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that cached files are returned and saved without parsing the project"""
+    cache = ConversionCache(tmp_path / "cache")
+    expected = run_parser(get_parser_from_str("shieldhit"), project_shieldhit_json, cache=cache)
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.stores) == (0, 1, 1)
+
+    parser = get_parser_from_str("shieldhit")
+
+    def failing_parse_configs(_json: dict) -> None:
+        raise AssertionError("project should not be parsed")
+
+    monkeypatch.setattr(parser, "parse_configs", failing_parse_configs)
+    configs_json = run_parser(parser, project_shieldhit_json, tmp_path / "output", cache=cache)
+
+    assert configs_json == expected
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.stores) == (1, 1, 1)
+    for file_name, content in expected.items():
+        assert (tmp_path / "output" / file_name).read_text() == content
+
+    # other backend is converted separately
+    run_parser(get_parser_from_str("topas"), project_shieldhit_json, cache=cache)
+    assert cache.stats.misses == 2
+
+
+def test_lru_eviction(tmp_path: Path) -> None:
+    """Check that the least recently used entries are removed when the cache is too big"""
+    cache = ConversionCache(tmp_path, max_bytes=2500)
+    content = {"geo.dat": "x" * 1000}
+    for index, key in enumerate(["a" * 64, "b" * 64]):
+        cache.put(key, content)
+        # make modification times distinct regardless of the file system resolution
+        os.utime(cache._entry_path(key), (index, index))
+    assert cache.get("a" * 64) == content
+
+    cache.put("c" * 64, content)
+
+    assert cache.stats.evictions == 1
+    assert cache.get("b" * 64) is None
+    assert cache.get("a" * 64) == content
+    assert cache.get("c" * 64) == content
+    assert cache.size() <= 2500
+
+
+def test_age_eviction(tmp_path: Path) -> None:
+    """Check that expired entries are not returned and are removed"""
+    cache = ConversionCache(tmp_path, max_age=60)
+    cache.put("a" * 64, {"geo.dat": ""})
+    cache.put("b" * 64, {"geo.dat": ""})
+    expired = time.time() - 120
+    os.utime(cache._entry_path("a" * 64), (expired, expired))
+
+    assert cache.get("a" * 64) is None
+    assert not cache._entry_path("a" * 64).exists()
+
+    os.utime(cache._entry_path("b" * 64), (expired, expired))
+    assert cache.evict() == 1
+    assert cache.size() == 0
+
+
+def test_concurrent_access(tmp_path: Path) -> None:
+    """Check that many processes can store, read and evict entries at the same time"""
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(store_and_load, [tmp_path] * 8, range(8)))
+
+    assert all(results)
+    assert not list(tmp_path.glob("*/*.tmp"))
+    # the budget holds for all processes together
+    assert ConversionCache(tmp_path).size() <= 20_000
+
+
+def test_budget_shared_by_caches(tmp_path: Path) -> None:
+    """Check that caches of one directory count the entries stored by each other"""
+    caches = [ConversionCache(tmp_path, max_bytes=10_000) for _ in range(2)]
+
+    for index in range(30):
+        caches[index % 2].put(f"{index:064x}", {"geo.dat": "x" * 1000})
+        assert caches[0].size() <= 10_000
+
+    assert caches[0].stats.evictions + caches[1].stats.evictions == 30 - caches[0].size() // 1000
+
+
+def test_pickle(tmp_path: Path) -> None:
+    """Check that the cache can be passed to other processes"""
+    cache = ConversionCache(tmp_path, max_bytes=10_000)
+    cache.put("a" * 64, {"geo.dat": ""})
+
+    copied = pickle.loads(pickle.dumps(cache))
+
+    assert copied.get("a" * 64) == {"geo.dat": ""}
+    copied.put("b" * 64, {"geo.dat": ""})
+    assert (copied.stats.hits, copied.stats.stores) == (1, 2)
+    assert cache.stats.stores == 1
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(cache.get, "b" * 64).result() == {"geo.dat": ""}
+
+
+def test_eviction_only_over_budget(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that entries are scanned only when the cache gets too big, not on every store"""
+    cache = ConversionCache(tmp_path, max_bytes=10_000)
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or entries())
+
+    for index in range(5):
+        cache.put(f"{index:064x}", {"geo.dat": "x" * 1000})
+    # the first store scans the entries to learn their size
+    assert len(scans) == 1
+
+    # entries take a bit more than 1000 bytes, so the 10th and 11th store exceed the limit
+    for index in range(5, 11):
+        cache.put(f"{index:064x}", {"geo.dat": "x" * 1000})
+    assert len(scans) == 3
+    assert cache.stats.evictions == 2
+    assert cache.size() <= 10_000
+
+
+def test_stats_from_threads(tmp_path: Path) -> None:
+    """Check that counters updated by many threads at once are not lost"""
+    cache = ConversionCache(tmp_path)
+    cache.put("a" * 64, {"geo.dat": ""})
+
+    def read() -> None:
+        for _ in range(200):
+            cache.get("a" * 64)
+            cache.get("b" * 64)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert (cache.stats.hits, cache.stats.misses) == (1600, 1600)
+
+
+def test_cache_cli(project_shieldhit_json: dict, tmp_path: Path) -> None:
+    """Check the CLI option enabling the cache"""
+    project_path = tmp_path / "project.json"
+    project_path.write_text(json.dumps(project_shieldhit_json))
+    for output_name in ["first", "second"]:
+        main([str(project_path), str(tmp_path / output_name), "-s", "--cache", str(tmp_path / "cache")])
+
+    assert len(list((tmp_path / "cache").glob("*/*.json"))) == 1
+    for file_name in ["beam.dat", "detect.dat", "geo.dat", "info.json", "mat.dat"]:
+        assert (tmp_path / "first" / file_name).read_text() == (tmp_path / "second" / file_name).read_text()
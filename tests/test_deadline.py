@@ -0,0 +1,70 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from converter import api, deadline
+from converter.archive import write_archive
+from converter.benchmark.generator import generate_project
+from converter.deadline import ConversionTimeout
+from converter.main import main
+
+
+def test_limit() -> None:
+    """Check that the deadline is set only inside the block and nested blocks can't extend it"""
+    assert deadline.remaining() is None
+    deadline.check()
+
+    with deadline.limit(60):
+        assert 59 < deadline.remaining() <= 60
+        with deadline.limit(3600):
+            assert deadline.remaining() <= 60
+        with deadline.limit(0):
+            with pytest.raises(ConversionTimeout):
+                deadline.check()
+        deadline.check()
+
+    assert deadline.remaining() is None
+
+
+def test_world_zone_timeout(exploding_project: dict) -> None:
+    """Check that the world zone expansion is aborted soon after the deadline"""
+    parser = api.get_parser_from_str("shieldhit")
+    parser.max_world_zone_sets = 10**9
+
+    start = time.monotonic()
+    with pytest.raises(ConversionTimeout):
+        api.run_parser(parser, exploding_project, timeout=0.2)
+    assert time.monotonic() - start < 5
+
+
+@pytest.mark.parametrize("simulator", ["shieldhit", "fluka"])
+def test_no_partial_files(simulator: str, tmp_path: Path) -> None:
+    """Check that files are not saved if the time runs out while they are rendered"""
+    parser = api.get_parser_from_str(simulator)
+    parser.parse_configs(generate_project(10))
+
+    with pytest.raises(ConversionTimeout), deadline.limit(0):
+        parser.save_configs(tmp_path)
+    assert not list(tmp_path.iterdir())
+
+    with pytest.raises(ConversionTimeout), deadline.limit(0):
+        write_archive(parser.iter_configs(), tmp_path / "output.tar.gz")
+    assert not list(tmp_path.iterdir())
+
+    assert parser.save_configs(tmp_path)
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(parser.get_configs_json())
+
+
+def test_timeout_cli(exploding_project: dict, tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Check that the CLI fails without writing files when the conversion times out"""
+    input_file = tmp_path / "project.json"
+    input_file.write_text(json.dumps(exploding_project))
+    output_dir = tmp_path / "output"
+
+    with pytest.raises(SystemExit):
+        main([str(input_file), str(output_dir), "fluka", "-s", "--timeout", "0"])
+
+    assert "Conversion aborted after 0.0 seconds." in capsys.readouterr().out
+    assert not output_dir.exists() or not list(output_dir.iterdir())
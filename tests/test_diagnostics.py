@@ -0,0 +1,126 @@
+import ast
+import json
+from pathlib import Path
+
+import pytest
+
+from converter import api, diagnostics
+from converter.benchmark.generator import generate_project
+from converter.diagnostics import ERROR, WARNING, Diagnostics
+from converter.main import main
+
+# too small to fit in the columns of SHIELD-HIT12A and FLUKA input files
+TINY_NUMBER = 1.2345678e-12
+
+
+@pytest.fixture
+def truncated_project() -> dict:
+    """Project with the position of the inner sphere truncated in the input files"""
+    project = generate_project(1)
+    for figure in project["figureManager"]["figures"][1:]:
+        figure["geometryData"]["position"] = [TINY_NUMBER, TINY_NUMBER, TINY_NUMBER]
+    return project
+
+
+def test_collect_and_deduplicate() -> None:
+    """Check that repeated diagnostics are counted and the context is added to them"""
+    collector = Diagnostics()
+    with collector.activate(simulator="shieldhit"):
+        for _ in range(3):
+            diagnostics.warn("number was truncated")
+        with diagnostics.context(figure="Box"):
+            diagnostics.warn("number was truncated")
+        diagnostics.error("invalid figure", card="FIGURES")
+
+    assert collector.to_list() == [
+        {"level": WARNING, "message": "number was truncated", "context": {"simulator": "shieldhit"}, "count": 3},
+        {
+            "level": WARNING,
+            "message": "number was truncated",
+            "context": {"simulator": "shieldhit", "figure": "Box"},
+            "count": 1,
+        },
+        {
+            "level": ERROR,
+            "message": "invalid figure",
+            "context": {"simulator": "shieldhit", "card": "FIGURES"},
+            "count": 1,
+        },
+    ]
+    assert len(collector.warnings) == 2
+    assert len(collector.errors) == 1
+    assert collector.to_list(figure="Box")[0]["count"] == 1
+    assert diagnostics.current() is None
+
+
+def test_max_entries() -> None:
+    """Check that diagnostics above the limit are only counted"""
+    collector = Diagnostics(max_entries=2)
+    with collector.activate():
+        for index in range(5):
+            diagnostics.warn(f"warning {index}")
+        diagnostics.warn("warning 0")
+
+    assert [entry.message for entry in collector.entries] == ["warning 0", "warning 1"]
+    assert collector.entries[0].count == 2
+    assert collector.dropped == 3
+
+
+def test_printed_without_collector(capsys: pytest.CaptureFixture) -> None:
+    """Check that diagnostics are printed as before if nothing collects them"""
+    with diagnostics.context(figure="Box"):
+        diagnostics.warn("number was truncated")
+    diagnostics.error("invalid figure")
+
+    assert capsys.readouterr().out == "WARN: number was truncated\ninvalid figure\n"
+
+
+@pytest.mark.parametrize("simulator,figure_name", [("shieldhit", "Inner_0"), ("fluka", "fig2")])
+def test_truncation_with_figure_name(
+    simulator: str, figure_name: str, truncated_project: dict, capsys: pytest.CaptureFixture
+) -> None:
+    """Check that truncated coordinates are reported once with the figure name and not printed"""
+    parser = api.get_parser_from_str(simulator)
+    parser.diagnostics = Diagnostics()
+    api.run_parser(parser, truncated_project)
+
+    assert "WARN" not in capsys.readouterr().out
+    figure_warnings = [entry for entry in parser.diagnostics.warnings if "figure" in entry.context]
+    assert len(figure_warnings) == 1
+    assert figure_warnings[0].context["figure"] == figure_name
+    assert figure_warnings[0].context["simulator"] == simulator
+    assert figure_warnings[0].count == 3
+
+
+def test_diagnostics_in_info(truncated_project: dict) -> None:
+    """Check that info.json holds the diagnostics and is the last file rendered"""
+    parser = api.get_parser_from_str("shieldhit")
+    parser.diagnostics = Diagnostics(in_info=True)
+    configs_json = api.run_parser(parser, truncated_project)
+
+    assert list(configs_json)[-1] == "info.json"
+    info = ast.literal_eval(configs_json["info.json"])
+    assert info["diagnostics"] == parser.diagnostics.to_list()
+    assert len(info["diagnostics"]) == 1
+
+
+def test_invalid_parser_type_recorded() -> None:
+    """Check that the error printed before raising is collected"""
+    collector = Diagnostics()
+    with pytest.raises(ValueError), collector.activate():
+        api.get_parser_from_str("mcnp")
+
+    assert collector.errors[0].message == 'Invalid parser type "mcnp".'
+
+
+def test_diagnostics_cli(truncated_project: dict, tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Check that the CLI writes diagnostics into info.json and prints each of them once"""
+    input_file = tmp_path / "project.json"
+    input_file.write_text(json.dumps(truncated_project))
+
+    main([str(input_file), str(tmp_path), "shieldhit", "-s", "--diagnostics-in-info"])
+
+    assert len(ast.literal_eval((tmp_path / "info.json").read_text())["diagnostics"]) == 1
+    warnings = [line for line in capsys.readouterr().out.splitlines() if line.startswith("WARN")]
+    assert len(warnings) == 1
+    assert warnings[0].endswith("[simulator=shieldhit, figure=Inner_0] (x3)")
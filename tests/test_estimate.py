@@ -0,0 +1,158 @@
+import json
+from copy import deepcopy
+from pathlib import Path
+
+import pytest
+
+from converter import api
+from converter.benchmark.generator import generate_project
+from converter.diagnostics import Diagnostics
+from converter.estimate import DOWNGRADE, Limits, ProjectTooComplexError, admit, estimate_project, scoring_bins
+from converter.main import main
+from converter.shieldhit.world_zone import DEFAULT_MAX_WORLD_ZONE_SETS, WorldZoneTooComplexError
+
+
+def test_estimate_project() -> None:
+    """Check the counts of the generated project and that the estimate grows with its size"""
+    small = estimate_project(generate_project(5, detectors=2))
+    big = estimate_project(generate_project(50, detectors=2))
+
+    assert (small.figures, small.zones, small.detectors) == (11, 11, 2)
+    # the world zone is split by each object and every other subtraction is dropped
+    assert small.world_zone_sets == 6
+    # mesh of 10x10x10 and cylinder of 10x10 bins, scored by two quantities each
+    assert small.scoring_bins == 2 * 1000 + 2 * 100
+    assert set(small.output_bytes) == set(api.PARSERS)
+    for backend in ("shieldhit", "fluka", "geant4"):
+        assert big.output_bytes[backend] > small.output_bytes[backend]
+        assert big.seconds[backend] > small.seconds[backend]
+
+
+def test_world_zone_bound(exploding_project: dict) -> None:
+    """Check that the bound is above the number of sets the world zone expansion fails on"""
+    assert estimate_project(exploding_project).world_zone_sets > 2**30
+
+    parser = api.get_parser_from_str("shieldhit")
+    with pytest.raises(ProjectTooComplexError):
+        api.run_parser(parser, exploding_project, limits=Limits(max_world_zone_sets=10000))
+    # other simulators don't expand the world zone
+    api.run_parser(api.get_parser_from_str("fluka"), exploding_project, limits=Limits(max_world_zone_sets=10000))
+
+
+def onion_project(layers: int) -> dict:
+    """Project of nested spheres, each zone is a sphere with the next smaller one subtracted"""
+    project = generate_project(1)
+    world, template_figure = project["figureManager"]["figures"][:2]
+    world_zone, template_zone = project["zoneManager"]["zones"][:2]
+    world["children"] = []
+    figures, zones = [world], [world_zone]
+    for layer in range(1, layers + 1):
+        figure = deepcopy(template_figure)
+        figure.update(uuid=f"sphere-{layer}", name=f"Sphere_{layer}", type="SphereFigure", children=[])
+        figure["geometryData"].update(
+            geometryType="SphereGeometry", position=[0, 0, 0], parameters={"radius": layer / 10}
+        )
+        figures.append(figure)
+        operations = [{"mode": "union", "objectUuid": figure["uuid"]}]
+        if layer > 1:
+            operations.append({"mode": "subtraction", "objectUuid": f"sphere-{layer - 1}"})
+        zones.append(dict(deepcopy(template_zone), uuid=f"layer-{layer}", unionOperations=[operations]))
+    world_zone["unionOperations"] = [
+        [{"mode": "union", "objectUuid": world["uuid"]}, {"mode": "subtraction", "objectUuid": f"sphere-{layers}"}]
+    ]
+    project["figureManager"]["figures"] = figures
+    project["zoneManager"]["zones"] = zones
+    return project
+
+
+def test_world_zone_of_nested_zones() -> None:
+    """Check that the world zone sets of nested zones are counted exactly, so they are not rejected"""
+    project = onion_project(30)
+    limits = Limits(max_world_zone_sets=10000, max_seconds=1)
+
+    estimate = estimate_project(project, ["shieldhit"])
+    # the world zone is split into the space around the world figure and the space around the outer sphere
+    assert estimate.world_zone_sets == 2
+    assert estimate.seconds["shieldhit"] < 0.01
+    assert admit(project, "shieldhit", limits) is project
+
+    parser = api.get_parser_from_str("shieldhit")
+    api.run_parser(parser, project, limits=Limits(max_world_zone_sets=estimate.world_zone_sets))
+    assert parser.world_zone_sets == 1
+    with pytest.raises(ProjectTooComplexError):
+        api.run_parser(parser, project, limits=Limits(max_world_zone_sets=estimate.world_zone_sets - 1))
+
+
+@pytest.mark.parametrize("size", [10, 100])
+def test_world_zone_bound_calibration(size: int) -> None:
+    """Check that the bound is the number of sets the expansion of nested objects actually reaches"""
+    project = generate_project(size)
+    bound = estimate_project(project, ["shieldhit"]).world_zone_sets
+
+    api.run_parser(api.get_parser_from_str("shieldhit"), project, limits=Limits(max_world_zone_sets=bound))
+    with pytest.raises(WorldZoneTooComplexError):
+        parser = api.get_parser_from_str("shieldhit")
+        parser.max_world_zone_sets = bound - 1
+        api.run_parser(parser, project)
+
+
+def test_world_zone_limit_restored(tmp_path: Path) -> None:
+    """Check that the limit of the world zone sets applies only to the conversion it is passed to"""
+    project = generate_project(10)
+    parser = api.get_parser_from_str("shieldhit")
+
+    api.run_parser(parser, project, limits=Limits(max_world_zone_sets=50))
+    assert parser.max_world_zone_sets == DEFAULT_MAX_WORLD_ZONE_SETS
+    api.save_parser_output(parser, project, tmp_path, limits=Limits(max_world_zone_sets=50))
+    assert parser.max_world_zone_sets == DEFAULT_MAX_WORLD_ZONE_SETS
+
+
+def test_reject() -> None:
+    """Check that the exceeded limits are reported before raising"""
+    project = generate_project(5, detectors=2)
+    collector = Diagnostics()
+
+    with pytest.raises(ProjectTooComplexError, match="scoring bins: 2200 estimated, 1000 allowed"):
+        with collector.activate():
+            admit(project, "fluka", Limits(max_scoring_bins=1000, max_seconds=10))
+
+    assert "too complex" in collector.errors[0].message
+    assert admit(project, "fluka", Limits(max_scoring_bins=2200)) is project
+
+
+def test_downgrade() -> None:
+    """Check that bins of meshes are reduced to fit the limit without changing the original project"""
+    project = generate_project(5, detectors=2)
+    parser = api.get_parser_from_str("shieldhit")
+    parser.diagnostics = Diagnostics()
+
+    configs_json = api.run_parser(parser, project, limits=Limits(max_scoring_bins=300, action=DOWNGRADE))
+
+    assert scoring_bins(project) == 2200
+    # 10 segments scaled by 300 / 2200 in every dimension
+    assert "X -10 0 5" in configs_json["detect.dat"]
+    assert "R 0 5 3" in configs_json["detect.dat"]
+    assert parser.diagnostics.warnings[0].message == "Scoring bins reduced from 2200 to 268 to fit the limit of 300."
+    assert parser.diagnostics.warnings[0].context == {"simulator": "shieldhit"}
+
+
+def test_invalid_action() -> None:
+    """Check that only known actions are accepted"""
+    with pytest.raises(ValueError):
+        Limits(action="ignore")
+
+
+def test_estimate_cli(exploding_project: dict, tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Check that the estimate is printed without converting and the limits make the conversion fail"""
+    input_file = tmp_path / "project.json"
+    input_file.write_text(json.dumps(exploding_project))
+
+    assert main([str(input_file), str(tmp_path), "--estimate", "-t", "shieldhit", "topas"]) == 0
+    estimate = json.loads(capsys.readouterr().out)
+    assert list(estimate["seconds"]) == ["shieldhit", "topas"]
+    assert not (tmp_path / "geo.dat").exists()
+
+    with pytest.raises(SystemExit):
+        main([str(input_file), str(tmp_path), "shieldhit", "-s", "--max-seconds", "60"])
+    assert "seconds of conversion" in capsys.readouterr().out
+    assert not (tmp_path / "geo.dat").exists()
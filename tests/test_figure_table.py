@@ -0,0 +1,76 @@
+import pytest
+
+from converter import solid_figures
+from converter.benchmark.generator import generate_project
+from converter.figure_table import BOX, CYLINDER, SPHERE, FigureTable
+from converter.fluka.cards import figure_card
+from converter.fluka.helper_parsers.figure_parser import convert_figures
+from converter.shieldhit import geo
+
+FIGURES = [
+    solid_figures.BoxFigure("1", "box", (1, 2.5, -3.25), (0, 0, 0), 2, 4.5, 1.0),
+    solid_figures.BoxFigure("2", "rotated box", (0.1, 0.2, 0.3), (30, 45, 60), 2, 4.5, 1.0),
+    solid_figures.CylinderFigure("3", "cylinder", (5, 0, 0), (90, 0, 0), 2.0, 2.0, 10.0),
+    solid_figures.SphereFigure("4", "sphere", (1.2345678e-12, 0, 7.5), (0, 0, 0), 3.5),
+    solid_figures.BoxFigure("5", "same box", (-1, -2.5, 3.25), (0, 0, 0), 2, 4.5, 1.0),
+    solid_figures.CylinderFigure("6", "same cylinder", (0.123456789, 1, 2), (90, 0, 0), 2.0, 2.0, 10.0),
+]
+
+
+def test_from_json(project_shieldhit_json: dict) -> None:
+    """Check that the table keeps the same figures as parsed one by one"""
+    figures_json = generate_project(5)["figureManager"]["figures"] + project_shieldhit_json["figureManager"]["figures"]
+
+    table = FigureTable.from_json(figures_json)
+
+    assert len(table) == len(figures_json)
+    assert table.to_figures() == [solid_figures.parse_figure(figure_dict) for figure_dict in figures_json]
+    assert set(table.kinds) <= {BOX, CYLINDER, SPHERE}
+    assert len(table.rotations) < len(table)
+
+
+def test_from_json_invalid_geometry() -> None:
+    """Check that unknown geometry types are rejected as in `solid_figures.parse_figure`"""
+    figure_dict = {"uuid": "1", "name": "cone", "geometryData": {"geometryType": "ConeGeometry"}}
+
+    with pytest.raises(ValueError, match="Geometry type must be"):
+        FigureTable.from_json([figure_dict])
+
+
+def test_shared_shapes() -> None:
+    """Check that figures differing only by the position have the same shape"""
+    table = FigureTable.from_figures(FIGURES)
+
+    assert table.shape(0) == table.shape(4)
+    assert table.shape(2) == table.shape(5)
+    assert table.shape(0) != table.shape(1)
+
+
+def test_shieldhit_entries() -> None:
+    """Check that entries rendered from the table are the same as rendered one by one"""
+    table = FigureTable.from_figures(FIGURES)
+
+    assert list(geo.iter_table_entries(table, first_number=3)) == [
+        geo.parse_figure(figure, number) for number, figure in enumerate(FIGURES, start=3)
+    ]
+
+
+def test_geo_dat_of_big_geometry(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that geo.dat of geometries rendered from the table doesn't change"""
+    config = geo.GeoMatConfig(figures=FIGURES * 3)
+    expected = config.get_geo_string()
+
+    monkeypatch.setattr(geo, "FIGURE_TABLE_MIN_FIGURES", len(FIGURES))
+
+    assert config.get_geo_string() == expected
+
+
+def test_fluka_entries() -> None:
+    """Check that bodies rendered from the table are the same as the FIGURES card"""
+    figures = [figure for figure in FIGURES if figure.name != "rotated box"]
+    table = FigureTable.from_figures(figures)
+
+    assert "\n".join(figure_card.iter_table_entries(table)) == str(figure_card.FiguresCard(convert_figures(figures)))
+
+    with pytest.raises(ValueError, match="Rotation of box"):
+        list(figure_card.iter_table_entries(FigureTable.from_figures(FIGURES)))
@@ -0,0 +1,29 @@
+import re
+import subprocess
+import sys
+
+# time (in seconds) in which the CLI module has to be imported, it's several times more than needed,
+# so the test fails only if something heavy (like all simulator backends) is imported on start
+CLI_IMPORT_TIME_BUDGET = 0.5
+
+
+def import_times(module: str) -> dict[str, float]:
+    """Cumulative import time (in seconds) of every module imported with `module`, as reported by -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)", line)
+        if match:
+            times[match.group(2)] = int(match.group(1)) / 1e6
+    return times
+
+
+def test_cli_import_time() -> None:
+    """Check that starting the CLI doesn't import the simulator backends and fits in the time budget"""
+    times = import_times("converter.main")
+
+    assert not [module for module in times if module.endswith(".parser") and module.startswith("converter.")]
+    assert "defusedxml" not in times
+    assert times["converter.main"] < CLI_IMPORT_TIME_BUDGET
@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from converter import api
+from converter.cache import ConversionCache
+from converter.deadline import ConversionTimeout
+from converter.main import main
+from converter.metrics import Counter, Histogram, Metrics
+
+
+def test_text_format() -> None:
+    """Check that counters and histograms are rendered in the Prometheus text format"""
+    counter = Counter("requests_total", "Requests.", ("path",))
+    counter.inc(path='/a"b')
+    counter.inc(2, path='/a"b')
+    histogram = Histogram("size_bytes", "Sizes.", ("file",), buckets=(10, 100))
+    for value in (5, 10, 50, 500):
+        histogram.observe(value, file="geo.dat")
+
+    assert list(counter.samples()) == ['requests_total{path="/a\\"b"} 3']
+    assert list(histogram.samples()) == [
+        'size_bytes_bucket{file="geo.dat",le="10"} 2',
+        'size_bytes_bucket{file="geo.dat",le="100"} 3',
+        'size_bytes_bucket{file="geo.dat",le="+Inf"} 4',
+        'size_bytes_sum{file="geo.dat"} 565',
+        'size_bytes_count{file="geo.dat"} 4',
+    ]
+
+
+def test_conversion_metrics(project_shieldhit_json: dict) -> None:
+    """Check that time, stages, file sizes and project size of the conversion are recorded"""
+    metrics = Metrics()
+    parser = api.get_parser_from_str("shieldhit")
+    parser.metrics = metrics
+
+    configs_json = api.run_parser(parser, project_shieldhit_json)
+
+    assert parser.profiler is None
+    assert metrics.conversions.value(backend="shieldhit", outcome="ok") == 1
+    assert metrics.conversion_seconds.count(backend="shieldhit") == 1
+    assert metrics.stage_seconds.count(backend="shieldhit", stage="parse/geo_mat/zones/world_zone") == 1
+    assert metrics.rendered_bytes.sum(backend="shieldhit", file="geo.dat") == len(configs_json["geo.dat"])
+    assert metrics.world_zone_sets.sum(backend="shieldhit") == parser.world_zone_sets > 0
+    figures = len(project_shieldhit_json["figureManager"]["figures"])
+    assert metrics.figures.sum(backend="shieldhit") == figures
+
+    text = metrics.render()
+    assert "# TYPE converter_conversion_seconds histogram" in text
+    assert 'converter_rendered_bytes_count{backend="shieldhit",file="geo.dat"} 1' in text
+
+
+def test_cached_conversion(project_fluka_json: dict, tmp_path: Path) -> None:
+    """Check that a conversion calling another one is recorded once, files from the cache are not measured"""
+    metrics = Metrics()
+    cache = ConversionCache(tmp_path / "cache")
+    metrics.add_stats("cache", cache.stats)
+
+    for _ in range(2):
+        parser = api.get_parser_from_str("fluka")
+        parser.metrics = metrics
+        api.save_parser_output(parser, project_fluka_json, tmp_path / "output", cache=cache)
+
+    assert metrics.conversions.value(backend="fluka", outcome="ok") == 2
+    assert metrics.rendered_bytes.count(backend="fluka", file="fl_sim.inp") == 1
+    assert "converter_cache_hits_total 1\n" in metrics.render()
+
+
+def test_failed_conversions(exploding_project: dict) -> None:
+    """Check that timeouts and errors are counted separately"""
+    metrics = Metrics()
+
+    for project, timeout, exception in ((exploding_project, 0.1, ConversionTimeout), ({}, None, KeyError)):
+        parser = api.get_parser_from_str("shieldhit")
+        parser.max_world_zone_sets = 10**9
+        parser.metrics = metrics
+        with pytest.raises(exception):
+            api.run_parser(parser, project, timeout=timeout)
+
+    assert metrics.conversions.value(backend="shieldhit", outcome="timeout") == 1
+    assert metrics.conversions.value(backend="shieldhit", outcome="error") == 1
+    assert metrics.world_zone_sets.count(backend="shieldhit") == 0
+
+
+def test_metrics_cli(project_shieldhit_json: dict, tmp_path: Path) -> None:
+    """Check that the CLI saves the metrics of the conversion"""
+    input_file = tmp_path / "project.json"
+    input_file.write_text(json.dumps(project_shieldhit_json))
+    metrics_file = tmp_path / "metrics.prom"
+
+    main([str(input_file), str(tmp_path), "topas", "-s", "--metrics", str(metrics_file)])
+
+    text = metrics_file.read_text()
+    assert 'converter_conversions_total{backend="topas",outcome="ok"} 1' in text
+    assert 'converter_rendered_bytes_count{backend="topas",file="topas_config.txt"} 1' in text
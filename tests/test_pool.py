@@ -0,0 +1,139 @@
+import os
+import signal
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from converter import api, deadline
+from converter.benchmark.generator import generate_project
+from converter.deadline import ConversionTimeout
+from converter.diagnostics import Diagnostics
+from converter.fluka.helper_parsers.material_parser import load_predefined_materials
+from converter.pool import WarmPool, rss_mb, warm_up
+
+
+def test_warm_up() -> None:
+    """Check that all backends are imported and static tables are built once"""
+    warm_up()
+
+    for parser_path in api.PARSERS.values():
+        assert parser_path.split(":")[0] in sys.modules
+    assert load_predefined_materials() is load_predefined_materials()
+    assert rss_mb() > 0
+
+
+def test_submit() -> None:
+    """Check that results and exceptions of the workers are passed to the futures"""
+    with WarmPool(2) as pool:
+        assert list(pool.map(abs, [-1, -2, -3])) == [1, 2, 3]
+        with pytest.raises(ValueError):
+            pool.submit(int, "x").result()
+        # lambdas can't be pickled, the worker stays usable
+        with pytest.raises(Exception):
+            pool.submit(lambda: 1).result()
+        assert pool.submit(abs, -4).result(timeout=30) == 4
+
+    with pytest.raises(RuntimeError):
+        pool.submit(abs, -1)
+    assert (pool.stats.started, pool.stats.completed) == (2, 5)
+
+
+@pytest.mark.parametrize("limits", [{"max_jobs": 2}, {"max_rss_mb": 1}])
+def test_recycling(limits: dict) -> None:
+    """Check that workers are replaced after the number of jobs or when they take too much memory"""
+    with WarmPool(1, **limits) as pool:
+        pids = [pool.submit(os.getpid).result(timeout=30) for _ in range(4)]
+
+    jobs_per_worker = limits.get("max_jobs", 1)
+    assert len(set(pids)) == 4 // jobs_per_worker
+    assert pool.stats.recycled == 4 // jobs_per_worker
+    assert os.getpid() not in pids
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="forking the parent is only safe on Linux")
+def test_fork() -> None:
+    """Check that workers forked from the warmed up parent are replaced as well"""
+    with WarmPool(1, max_jobs=1, start_method="fork") as pool:
+        pids = [pool.submit(os.getpid).result(timeout=30) for _ in range(2)]
+
+    assert len(set(pids)) == 2
+    assert (pool.stats.started, pool.stats.recycled) == (3, 2)
+
+
+def test_crashed_worker() -> None:
+    """Check that only the job of a dead worker fails and the worker is replaced"""
+    with WarmPool(1) as pool:
+        with pytest.raises(BrokenProcessPool, match="exit code 3"):
+            pool.submit(os._exit, 3).result(timeout=30)
+        assert pool.submit(abs, -1).result(timeout=30) == 1
+
+    assert (pool.stats.started, pool.stats.crashed) == (2, 1)
+
+
+@pytest.mark.parametrize("wait_for_replacement", [True, False])
+def test_idle_worker_killed(wait_for_replacement: bool) -> None:
+    """
+    Check that a worker killed while waiting for a job is replaced and the next jobs still run,
+    whether the pool noticed its death before the next job or only when sending the job.
+    """
+    with WarmPool(1) as pool:
+        assert pool.submit(abs, -1).result(timeout=30) == 1
+        process = pool._workers[0].process
+        os.kill(process.pid, signal.SIGKILL)
+        process.join(timeout=30)
+        if wait_for_replacement:
+            deadline_time = time.monotonic() + 30
+            while pool.stats.started < 2 and time.monotonic() < deadline_time:
+                time.sleep(0.01)
+            assert pool.stats.started == 2
+
+        assert pool.submit(abs, -2).result(timeout=30) == 2
+        assert pool.submit(abs, -3).result(timeout=30) == 3
+
+    assert (pool.stats.started, pool.stats.crashed) == (2, 1)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="the fork server is used only on Linux")
+def test_forkserver_warmed_up() -> None:
+    """Check that workers forked by the fork server start with the tables built by the server"""
+    code = (
+        "(__import__('os').getpid(), __import__('converter.preload').preload.WARMED_UP_PID,"
+        " __import__('converter.fluka.helper_parsers.material_parser', fromlist=['_'])"
+        ".load_predefined_materials.cache_info()[:])"
+    )
+    with WarmPool(2) as pool:
+        results = [pool.submit(eval, code).result(timeout=30) for _ in range(2)]
+
+    for pid, warmed_up_pid, (hits, _, _, currsize) in results:
+        assert warmed_up_pid not in (pid, os.getpid())
+        # tables were built by the server, the worker didn't even look them up again
+        assert (currsize, hits) == (1, 0)
+
+
+def test_convert(project_shieldhit_json: dict) -> None:
+    """Check that conversion in a worker gives the same files and passes its diagnostics"""
+    project = generate_project(10)
+    collector = Diagnostics()
+
+    with WarmPool(1) as pool:
+        assert pool.convert("shieldhit", project_shieldhit_json) == api.run_parser(
+            api.get_parser_from_str("shieldhit"), project_shieldhit_json
+        )
+        configs_json = pool.convert("fluka", project, collector)
+
+    parser = api.get_parser_from_str("fluka")
+    parser.diagnostics = Diagnostics()
+    assert configs_json == api.run_parser(parser, project)
+    assert collector.to_list() == parser.diagnostics.to_list()
+
+
+def test_convert_timeout(slow_project: dict) -> None:
+    """Check that the deadline of the caller is passed to the worker, which is free afterwards"""
+    with WarmPool(1) as pool:
+        start = time.monotonic()
+        with pytest.raises(ConversionTimeout), deadline.limit(0.2):
+            pool.convert("shieldhit", slow_project)
+        assert time.monotonic() - start < 5
+        assert pool.submit(abs, -1).result(timeout=30) == 1
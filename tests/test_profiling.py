@@ -0,0 +1,127 @@
+import json
+import pstats
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from converter import common
+from converter.api import get_parser_from_str, run_parser, run_parsers
+from converter.main import main
+from converter.benchmark.generator import generate_project
+from converter.profiling import MemoryProfiler, StageTimer
+
+EXPECTED_STAGES = {
+    "shieldhit": [
+        "parse/geo_mat/materials",
+        "parse/geo_mat/figures",
+        "parse/geo_mat/zones/world_zone",
+        "parse/beam",
+        "parse/detect",
+        "render/geo.dat",
+        "render/detect.dat",
+        "save",
+    ],
+    "fluka": ["parse/figures", "parse/regions", "parse/scorings", "parse/materials", "parse/beam", "render/fl_sim.inp"],
+    "geant4": ["parse/gdml", "parse/macro", "render/geometry.gdml", "render/run.mac"],
+}
+
+
+@pytest.mark.parametrize("parser_type", EXPECTED_STAGES)
+def test_parser_stages(parser_type: str, project_fluka_json: dict, tmp_path: Path) -> None:
+    """Check that stages of each parser are measured"""
+    parser = get_parser_from_str(parser_type)
+    parser.profiler = StageTimer()
+
+    run_parser(parser, project_fluka_json, tmp_path)
+
+    stages = parser.profiler.report()["stages"]
+    for stage in EXPECTED_STAGES[parser_type] + ["parse", "render"]:
+        assert stages[stage]["calls"] >= 1
+    assert stages["parse"]["seconds"] >= sum(
+        stage["seconds"] for path, stage in stages.items() if path.count("/") == 1 and path.startswith("parse/")
+    )
+
+
+def test_run_parsers_stages(project_fluka_json: dict) -> None:
+    """Check that stages of many parsers are reported under the parser types"""
+    profiler = StageTimer()
+
+    run_parsers(["shieldhit", "fluka"], project_fluka_json, profiler=profiler)
+
+    stages = profiler.report()["stages"]
+    assert "shieldhit/parse/geo_mat" in stages
+    assert "fluka/render/fl_sim.inp" in stages
+
+
+def test_disabled_profiling_overhead() -> None:
+    """Check that disabled hooks don't measure anything and cost next to nothing"""
+    parser = get_parser_from_str("shieldhit")
+    assert parser._stage("parse") is common._NO_STAGE
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        with parser._stage("parse"):
+            pass
+    # around a microsecond per hook on a slow machine, while a stage takes at least tens of microseconds
+    assert time.perf_counter() - start < 0.5
+
+
+def test_profile_cli(project_shieldhit_path: Path, tmp_path: Path) -> None:
+    """Check the CLI options saving the timing report and cProfile statistics"""
+    main(
+        [
+            str(project_shieldhit_path),
+            str(tmp_path),
+            "-s",
+            "--profile",
+            str(tmp_path / "profile.json"),
+            "--cprofile",
+            str(tmp_path / "profile.prof"),
+        ]
+    )
+
+    report = json.loads((tmp_path / "profile.json").read_text())
+    assert "parse/geo_mat/zones" in report["stages"]
+    assert "save/geo.dat" in report["stages"]
+    assert pstats.Stats(str(tmp_path / "profile.prof")).total_calls > 0
+
+
+def test_memory_profiler() -> None:
+    """Check that peaks of nested stages are measured without the memory of the snapshots"""
+    profiler = MemoryProfiler()
+    objects = [[] for _ in range(100_000)]
+
+    with profiler.stage("outer"):
+        with profiler.stage("empty"):
+            pass
+        with profiler.stage("allocating"):
+            buffer = bytearray(10**7)
+            del buffer
+        kept = [str(number) for number in range(10_000)]
+    profiler.stop()
+
+    report = json.loads(json.dumps(profiler.report()))
+    stages = report["stages"]
+    assert stages["outer/empty"]["peak_bytes"] < 10**4
+    assert 10**7 <= stages["outer/allocating"]["peak_bytes"] < 10**7 + 10**4
+    assert stages["outer"]["peak_bytes"] >= stages["outer/allocating"]["peak_bytes"]
+    assert stages["outer"]["top_lines"][0]["line"] == test_memory_profiler.__code__.co_firstlineno + 11
+    assert report["peak_bytes"] >= stages["outer"]["peak_bytes"]
+    assert not tracemalloc.is_tracing()
+    assert len(objects) > len(kept)
+
+
+def test_memory_profile_cli(tmp_path: Path) -> None:
+    """Check that the memory report points to the world zone expansion of a project with many objects"""
+    input_file = tmp_path / "project.json"
+    input_file.write_text(json.dumps(generate_project(30)))
+
+    main([str(input_file), str(tmp_path), "-s", "--memory-profile", str(tmp_path / "memory.json")])
+
+    stages = json.loads((tmp_path / "memory.json").read_text())["stages"]
+    world_zone = stages["parse/geo_mat/zones/world_zone"]
+    assert world_zone["peak_bytes"] > 0
+    assert world_zone["top_lines"][0]["file"].endswith("world_zone.py")
+    assert stages["save/geo.dat"]["peak_bytes"] > 0
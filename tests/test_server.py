@@ -0,0 +1,272 @@
+import json
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pytest
+
+from converter import api, server
+from converter.cache import ConversionCache
+from converter.pool import WarmPool
+from converter.server import ConversionClient, ConversionError
+
+
+def start_server(**kwargs) -> tuple[server.ConversionServerMixin, threading.Thread]:
+    """Start the server in a background thread."""
+    conversion_server = server.create_server(**kwargs)
+    thread = threading.Thread(target=conversion_server.serve_forever)
+    thread.start()
+    return conversion_server, thread
+
+
+def stop_server(conversion_server: server.ConversionServerMixin, thread: threading.Thread) -> None:
+    """Stop the server and wait for requests in progress."""
+    conversion_server.shutdown()
+    conversion_server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def tcp_server() -> Iterator[server.ConversionServerMixin]:
+    """Server listening on a random localhost port"""
+    conversion_server, thread = start_server(host="127.0.0.1", port=0, max_concurrent=2, queue_timeout=0.1)
+    yield conversion_server
+    stop_server(conversion_server, thread)
+
+
+@pytest.fixture
+def client(tcp_server: server.ConversionServerMixin) -> ConversionClient:
+    """Client of the tcp_server"""
+    return ConversionClient(port=tcp_server.server_address[1], timeout=30)
+
+
+@pytest.fixture
+def slow_conversions(monkeypatch: pytest.MonkeyPatch) -> threading.Event:
+    """Make conversions wait until the returned event is set"""
+    release = threading.Event()
+    run_parser = api.run_parser
+
+    def slow_run_parser(*args, **kwargs) -> dict:
+        release.wait(timeout=30)
+        return run_parser(*args, **kwargs)
+
+    monkeypatch.setattr(api, "run_parser", slow_run_parser)
+    return release
+
+
+def test_health(client: ConversionClient) -> None:
+    """Check that the server responds"""
+    assert client.health()
+
+
+def test_convert(client: ConversionClient, project_shieldhit_json: dict) -> None:
+    """Check that the server returns the same files as a direct conversion"""
+    expected = api.run_parser(api.get_parser_from_str("shieldhit"), project_shieldhit_json)
+    assert client.convert(project_shieldhit_json, "shieldhit") == expected
+
+
+def test_metrics(client: ConversionClient, project_shieldhit_json: dict) -> None:
+    """Check that conversions and coalescing counters are exported in the text format"""
+    client.convert(project_shieldhit_json, "shieldhit")
+    with pytest.raises(ConversionError):
+        client.convert({}, "fluka")
+
+    text = client.metrics()
+    assert 'converter_conversions_total{backend="shieldhit",outcome="ok"} 1' in text
+    assert 'converter_conversions_total{backend="fluka",outcome="error"} 1' in text
+    assert 'converter_rendered_bytes_count{backend="shieldhit",file="geo.dat"} 1' in text
+    assert "converter_coalescing_executed_total 2" in text
+    assert "converter_coalescing_in_flight 0" in text
+
+
+def test_convert_to_directory(client: ConversionClient, project_shieldhit_json: dict, tmp_path: Path) -> None:
+    """Check that the server saves files in the requested directory"""
+    files = client.convert(project_shieldhit_json, "shieldhit", output_dir=tmp_path / "output")
+
+    assert sorted(files) == ["beam.dat", "detect.dat", "geo.dat", "info.json", "mat.dat"]
+    for file_name in files:
+        assert (tmp_path / "output" / file_name).exists()
+
+
+def test_invalid_requests(client: ConversionClient, project_shieldhit_json: dict) -> None:
+    """Check that errors are reported to the client and don't break the server"""
+    with pytest.raises(ConversionError, match="Parser type must be") as error:
+        client.convert(project_shieldhit_json, "mcnp")
+    assert error.value.status == 400
+
+    with pytest.raises(ConversionError, match="KeyError") as error:
+        client.convert({"beam": {}}, "shieldhit")
+    assert error.value.status == 400
+
+    assert client.health()
+
+
+def test_diagnostics_in_response(client: ConversionClient, project_shieldhit_json: dict) -> None:
+    """Check that warnings of the conversion and errors before failing are sent to the client"""
+    project = json.loads(json.dumps(project_shieldhit_json))
+    project["figureManager"]["figures"][0]["geometryData"]["position"] = [1.2345678e-12, 0.0, 0.0]
+
+    response = client._request("POST", "/convert", {"project": project, "simulator": "shieldhit"})
+    assert response["diagnostics"][0]["level"] == "warning"
+    assert response["diagnostics"][0]["context"]["figure"] == project["figureManager"]["figures"][0]["name"]
+
+    with pytest.raises(ConversionError) as error:
+        client.convert(project, "mcnp")
+    assert error.value.diagnostics[0]["message"] == 'Invalid parser type "mcnp".'
+
+
+def test_conversion_timeout(client: ConversionClient, slow_project: dict, tmp_path: Path) -> None:
+    """Check that a conversion exceeding its timeout is aborted without saving files and frees the slot"""
+    with pytest.raises(ConversionError, match="ConversionTimeout") as error:
+        client.convert(slow_project, "shieldhit", output_dir=tmp_path / "output", conversion_timeout=0)
+    assert error.value.status == 504
+    assert not list((tmp_path / "output").glob("*"))
+
+    assert client.convert(slow_project, "fluka", conversion_timeout=60)
+
+
+def test_concurrency_limit(
+    client: ConversionClient, project_shieldhit_json: dict, slow_conversions: threading.Event
+) -> None:
+    """Check that requests exceeding the concurrency limit are rejected after waiting for a free slot"""
+    results = []
+    # conversions of the same project for the same simulator would be coalesced
+    running = [
+        threading.Thread(
+            target=lambda simulator=simulator: results.append(client.convert(project_shieldhit_json, simulator))
+        )
+        for simulator in ("shieldhit", "topas")
+    ]
+    for thread in running:
+        thread.start()
+    time.sleep(0.2)
+
+    with pytest.raises(ConversionError, match="Too many concurrent conversions") as error:
+        client.convert(project_shieldhit_json, "geant4")
+    assert error.value.status == 503
+
+    slow_conversions.set()
+    for thread in running:
+        thread.join()
+    assert len(results) == 2
+
+
+def test_coalescing(
+    client: ConversionClient,
+    project_shieldhit_json: dict,
+    tmp_path: Path,
+    slow_conversions: threading.Event,
+) -> None:
+    """Check that identical requests made during a conversion wait for its files without taking a slot"""
+    responses = []
+
+    def convert(output_dir: Optional[Path] = None) -> None:
+        """Send the conversion request and keep the whole response."""
+        request = {"project": project_shieldhit_json, "simulator": "shieldhit"}
+        if output_dir is not None:
+            request["output_dir"] = str(output_dir)
+        responses.append(client._request("POST", "/convert", request))
+
+    requests = [threading.Thread(target=convert) for _ in range(3)]
+    requests.append(threading.Thread(target=convert, args=(tmp_path / "output",)))
+    for thread in requests:
+        thread.start()
+    time.sleep(0.2)
+    slow_conversions.set()
+    for thread in requests:
+        thread.join()
+
+    assert sorted(response["coalesced"] for response in responses) == [False, True, True, True]
+    expected = api.run_parser(api.get_parser_from_str("shieldhit"), project_shieldhit_json)
+    assert all(response["files"] == expected for response in responses if "output_dir" not in response)
+    assert (tmp_path / "output" / "geo.dat").read_text() == expected["geo.dat"]
+    assert client.stats()["coalescing"] == {"executed": 1, "coalesced": 3, "failed": 0, "in_flight": 0}
+
+
+def test_graceful_shutdown(project_shieldhit_json: dict, slow_conversions: threading.Event) -> None:
+    """Check that conversion in progress is finished when the server is shut down"""
+    conversion_server, thread = start_server(host="127.0.0.1", port=0)
+    client = ConversionClient(port=conversion_server.server_address[1], timeout=30)
+    results = []
+    request = threading.Thread(target=lambda: results.append(client.convert(project_shieldhit_json)))
+    request.start()
+    time.sleep(0.2)
+
+    stopping = threading.Thread(target=stop_server, args=(conversion_server, thread))
+    stopping.start()
+    time.sleep(0.2)
+    assert stopping.is_alive()
+
+    slow_conversions.set()
+    request.join()
+    stopping.join()
+    assert "geo.dat" in results[0]
+    with pytest.raises(ConnectionError):
+        client.health()
+
+
+def test_worker_pool(project_shieldhit_json: dict, slow_project: dict, tmp_path: Path) -> None:
+    """Check that conversions in the worker processes are cached, time out and report diagnostics"""
+    project = json.loads(json.dumps(project_shieldhit_json))
+    project["figureManager"]["figures"][0]["geometryData"]["position"] = [1.2345678e-12, 0.0, 0.0]
+    pool = WarmPool(1)
+    conversion_server, thread = start_server(port=0, cache=ConversionCache(tmp_path / "cache"), pool=pool)
+    try:
+        client = ConversionClient(port=conversion_server.server_address[1], timeout=30)
+        response = client._request("POST", "/convert", {"project": project, "simulator": "shieldhit"})
+        assert response["files"] == api.run_parser(api.get_parser_from_str("shieldhit"), project)
+        assert response["diagnostics"][0]["level"] == "warning"
+        assert client.convert(project) == response["files"]
+
+        with pytest.raises(ConversionError, match="ConversionTimeout"):
+            client.convert(slow_project, "shieldhit", conversion_timeout=0.2)
+
+        # the request times out before the worker notices it, wait until the worker reports back
+        wait_until = time.monotonic() + 30
+        while client.stats()["pool"]["completed"] < 2 and time.monotonic() < wait_until:
+            time.sleep(0.05)
+        stats = client.stats()
+        assert (stats["cache"]["hits"], stats["cache"]["stores"]) == (1, 1)
+        assert stats["pool"]["completed"] == 2
+        text = client.metrics()
+        assert 'converter_conversions_total{backend="shieldhit",outcome="ok"} 2' in text
+        assert 'converter_conversions_total{backend="shieldhit",outcome="timeout"} 1' in text
+        assert 'converter_rendered_bytes_count{backend="shieldhit",file="geo.dat"} 1' in text
+        assert "converter_pool_completed_total 2" in text
+    finally:
+        stop_server(conversion_server, thread)
+        pool.shutdown()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets are not supported")
+def test_unix_socket(project_shieldhit_json: dict, tmp_path: Path) -> None:
+    """Check conversion through the unix socket"""
+    socket_path = tmp_path / "converter.sock"
+    conversion_server, thread = start_server(socket_path=socket_path)
+    try:
+        client = ConversionClient(socket_path=socket_path, timeout=30)
+        assert client.health()
+        assert "geo.dat" in client.convert(project_shieldhit_json)
+    finally:
+        stop_server(conversion_server, thread)
+    assert not socket_path.exists()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGTERM can't be handled on Windows")
+def test_serve_cli(project_shieldhit_json: dict) -> None:
+    """Check that the serve subcommand converts projects and stops gracefully on SIGTERM"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "converter.main", "serve", "--port", "0"], stdout=subprocess.PIPE, text=True
+    )
+    try:
+        listening_line = process.stdout.readline()
+        port = int(listening_line.rsplit(":", 1)[1])
+        assert "geo.dat" in ConversionClient(port=port, timeout=30).convert(project_shieldhit_json)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=30) == 0
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+from converter import api, deadline
+from converter.deadline import ConversionTimeout
+from converter.singleflight import SingleFlight
+
+
+def run_concurrently(count: int, target) -> list:
+    """Call the target in that many threads at once and return the results (or raised exceptions)."""
+    results = []
+    lock = threading.Lock()
+
+    def call() -> None:
+        try:
+            result = target()
+        except Exception as e:  # skipcq: PYL-W0703
+            result = e
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_coalesced_calls() -> None:
+    """Check that concurrent calls with the same key run the function once and get copies of its result"""
+    coalescer = SingleFlight()
+    calls = []
+
+    def convert() -> dict:
+        calls.append(1)
+        time.sleep(0.2)
+        return {"geo.dat": "content"}
+
+    results = run_concurrently(5, lambda: coalescer.do("key", convert))
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(files == {"geo.dat": "content"} for files, _ in results)
+    assert len({id(files) for files, _ in results}) == 5
+    assert (coalescer.stats.executed, coalescer.stats.coalesced, coalescer.in_flight()) == (1, 4, 0)
+
+    # once the call is finished, the function is run again
+    coalescer.do("key", convert)
+    assert len(calls) == 2
+
+
+def test_shared_error() -> None:
+    """Check that waiting calls get the exception of the running call"""
+    coalescer = SingleFlight()
+
+    def fail() -> dict:
+        time.sleep(0.2)
+        raise ValueError("Invalid project")
+
+    results = run_concurrently(3, lambda: coalescer.do("key", fail))
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert (coalescer.stats.executed, coalescer.stats.failed) == (1, 3)
+
+
+def test_timeouts() -> None:
+    """Check that waiting calls respect their deadline and don't share the timeout of the running call"""
+    coalescer = SingleFlight()
+    started = threading.Event()
+    calls = []
+
+    def slow() -> dict:
+        calls.append(1)
+        started.set()
+        end = time.monotonic() + 0.3
+        while time.monotonic() < end:
+            deadline.check()
+            time.sleep(0.01)
+        return {"geo.dat": "content"}
+
+    results = {}
+
+    def call(name: str, timeout: float) -> None:
+        """Call the function with the timeout, the leader starts first."""
+        if name != "leader":
+            started.wait()
+        try:
+            with deadline.limit(timeout):
+                results[name] = coalescer.do("key", slow)
+        except ConversionTimeout as e:
+            results[name] = e
+
+    threads = [
+        threading.Thread(target=call, args=(name, timeout))
+        for name, timeout in (("leader", 0.1), ("patient", 5), ("impatient", 0.05))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert isinstance(results["leader"], ConversionTimeout)
+    assert isinstance(results["impatient"], ConversionTimeout)
+    # the patient call runs the function again
+    assert results["patient"] == ({"geo.dat": "content"}, False)
+    assert len(calls) == 2
+
+
+def test_run_parser(project_shieldhit_json: dict, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that concurrent conversions of the same project are coalesced by run_parser"""
+    coalescer = SingleFlight()
+    parsers = []
+
+    def convert() -> dict:
+        parser = api.get_parser_from_str("shieldhit")
+        parser_get_configs_json = parser.get_configs_json
+
+        def slow_get_configs_json() -> dict:
+            time.sleep(0.2)
+            return parser_get_configs_json()
+
+        monkeypatch.setattr(parser, "get_configs_json", slow_get_configs_json)
+        parsers.append(parser)
+        return api.run_parser(parser, project_shieldhit_json, coalescer=coalescer)
+
+    results = run_concurrently(3, convert)
+
+    assert results[0] == results[1] == results[2]
+    assert "geo.dat" in results[0]
+    assert (coalescer.stats.executed, coalescer.stats.coalesced) == (1, 2)
+    assert sum(parser.project is not None for parser in parsers) == 1
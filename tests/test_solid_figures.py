@@ -1,5 +1,13 @@
+import copy
+import sys
+from dataclasses import fields
+
 import pytest
 from converter import solid_figures
+from converter.fluka.helper_parsers.figure_parser import FlukaCylinder
+from converter.fluka.helper_parsers.region_parser import FlukaRegion
+from converter.shieldhit.detectors import ScoringMesh
+from converter.shieldhit.geo import GeoMatConfig, Material, Zone
 
 
 @pytest.fixture(scope="module")
@@ -26,3 +34,41 @@ def test_cylinder_figure(cylinder_figure_dict):
     assert cylinder_figure_obj.position[0] == cylinder_figure_dict["geometryData"]["position"][0]
     assert cylinder_figure_obj.position[1] == cylinder_figure_dict["geometryData"]["position"][1]
     assert cylinder_figure_obj.position[2] == cylinder_figure_dict["geometryData"]["position"][2]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="dataclasses with __slots__ need Python 3.10")
+@pytest.mark.parametrize(
+    "instance",
+    [
+        solid_figures.BoxFigure(),
+        solid_figures.CylinderFigure(),
+        solid_figures.SphereFigure(),
+        Zone(uuid=""),
+        Material("", "", "", 276),
+        FlukaCylinder(),
+        FlukaRegion(),
+        ScoringMesh(""),
+    ],
+)
+def test_objects_without_dict(instance):
+    """Test that objects created for every figure, zone or detector don't have per-instance __dict__"""
+    assert not hasattr(instance, "__dict__")
+
+
+def test_templates_are_not_fields():
+    """Test that templates are class constants, while the fields keep their defaults and behaviour"""
+    assert [field.name for field in fields(Zone)] == [
+        "uuid",
+        "id",
+        "figures_operators",
+        "material",
+        "material_override",
+    ]
+    assert "geo_template" not in [field.name for field in fields(GeoMatConfig)]
+    assert [field.name for field in fields(ScoringMesh)][-1] == "z_bins"
+
+    box = solid_figures.BoxFigure(name="box", x_edge_length=2.0)
+    box.expand(0.5)
+    assert box == solid_figures.BoxFigure(name="box", x_edge_length=3.0, y_edge_length=2.0, z_edge_length=2.0)
+    assert copy.deepcopy(box) == box
+    assert str(Zone(uuid="", id=2, figures_operators=[{-1}, {2}])) == "\n  002          -1OR   +2"